@@ -4,6 +4,7 @@ from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 
 from aiagent.models.ai_token import AiToken
+from aiagent.security.token_auth import invalidate_token_cache
 from app.schemas.base import Fail, Success, SuccessExtra
 
 token_router = APIRouter()
@@ -36,6 +37,7 @@ async def create_token(req: TokenCreate):
     import secrets
     token_val = "sk-" + secrets.token_hex(16)
     obj = await AiToken.create(name=req.name, token=token_val, description=req.description, allow_write=req.allow_write)
+    await invalidate_token_cache()
     return Success(data={"id": obj.id, "token": token_val})
 
 @token_router.post("/update")
@@ -49,6 +51,7 @@ async def update_token(req: TokenUpdate):
     for k, v in update_data.items():
         setattr(obj, k, v)
     await obj.save()
+    await invalidate_token_cache()
     return Success(msg="更新成功")
 
 @token_router.post("/delete")
@@ -57,6 +60,7 @@ async def delete_token(req: TokenDelete):
     if not obj:
         return Fail(msg="Token 不存在")
     await obj.delete()
+    await invalidate_token_cache()
     return Success(msg="删除成功")
 
 @token_router.get("/mcp_tools")
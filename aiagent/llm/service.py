@@ -4,11 +4,18 @@ import time
 from openai import APIConnectionError, APITimeoutError, AuthenticationError
 
 from aiagent.llm.client import LLMClient
+from aiagent.log_writer import ai_log_writer
 from aiagent.models.ai_llm_call_log import AiLlmCallLog
 from aiagent.models.ai_token import AiToken
 
 logger = logging.getLogger(__name__)
 
+
+async def _submit_call_log(**data):
+    """调用日志入队批量写入，不等待管理库写入"""
+    await ai_log_writer.put(data, model=AiLlmCallLog)
+
+
 async def llm_ask_stream(
     system_prompt: str,
     user_message: str,
@@ -41,7 +48,7 @@ async def llm_ask_stream(
 
         duration_ms = int((time.time() - start_time) * 1000)
         # 流式调用暂无法直接获取 token usage，可做粗略计算或单独请求，这里简单记录
-        await AiLlmCallLog.create(
+        await _submit_call_log(
             llm_config_id=client.config_id,
             provider=client.provider,
             model_name=client.model_name,
@@ -53,7 +60,7 @@ async def llm_ask_stream(
         )
     except APITimeoutError as e:
         logger.error(f"LLM 调用超时: provider={client.provider}, model={client.model_name}, base_url={client.base_url}, error={e}")
-        await AiLlmCallLog.create(
+        await _submit_call_log(
             llm_config_id=client.config_id,
             provider=client.provider,
             model_name=client.model_name,
@@ -67,7 +74,7 @@ async def llm_ask_stream(
         yield {"type": "text", "delta": "\n\n[生成失败：大模型调用超时，请检查服务端日志或稍后重试]"}
     except APIConnectionError as e:
         logger.error(f"LLM 连接失败: provider={client.provider}, model={client.model_name}, base_url={client.base_url}, error={e}")
-        await AiLlmCallLog.create(
+        await _submit_call_log(
             llm_config_id=client.config_id,
             provider=client.provider,
             model_name=client.model_name,
@@ -81,7 +88,7 @@ async def llm_ask_stream(
         yield {"type": "text", "delta": f"\n\n[生成失败：无法连接到大模型服务，请检查 base_url={client.base_url} 是否可达]"}
     except AuthenticationError as e:
         logger.error(f"LLM 鉴权失败: provider={client.provider}, model={client.model_name}, error={e}")
-        await AiLlmCallLog.create(
+        await _submit_call_log(
             llm_config_id=client.config_id,
             provider=client.provider,
             model_name=client.model_name,
@@ -95,7 +102,7 @@ async def llm_ask_stream(
         yield {"type": "text", "delta": "\n\n[生成失败：API Key 无效或未配置，请检查大模型配置]"}
     except Exception as e:
         logger.error(f"LLM Stream Error: provider={client.provider}, model={client.model_name}, base_url={client.base_url}, error={e}", exc_info=True)
-        await AiLlmCallLog.create(
+        await _submit_call_log(
             llm_config_id=client.config_id,
             provider=client.provider,
             model_name=client.model_name,
@@ -0,0 +1,18 @@
+"""
+AI 调用日志（工具调用、大模型调用）异步批量写入 - 复用审计日志的队列与攒批实现，参数独立配置（ai_log），
+工具/大模型调用路径通过 put 入队，不等待管理库写入；写操作类工具调用的日志不丢弃
+"""
+from app.services.audit_writer import OVERFLOW_DROP_NEW, AuditLogWriter
+from app.settings.config import settings
+
+ai_log_writer = AuditLogWriter(
+    batch_size=settings.AI_LOG_BATCH_SIZE,
+    flush_interval_ms=settings.AI_LOG_FLUSH_INTERVAL_MS,
+    max_queue=settings.AI_LOG_MAX_QUEUE,
+    # 同步 submit 队列满时丢弃新记录，不挤掉已入队的写操作日志
+    overflow=OVERFLOW_DROP_NEW,
+    name="AI调用日志",
+    time_field="timestamp",
+    put_timeout=settings.AI_LOG_PUT_TIMEOUT_MS / 1000,
+    shutdown_timeout=settings.AI_LOG_SHUTDOWN_TIMEOUT,
+)
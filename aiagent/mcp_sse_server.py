@@ -26,9 +26,11 @@ import aiagent.tools.order_tools
 import aiagent.tools.report_tools
 import aiagent.tools.sql_tools
 import aiagent.tools.wms_tools  # noqa: F401
+from aiagent.log_writer import ai_log_writer
 from aiagent.models.ai_tool_call_log import AiToolCallLog
 from aiagent.security.permission_checker import check_tool_permission
 from aiagent.security.token_auth import verify_token
+from aiagent.security.token_usage import token_usage
 from aiagent.tools.base import TOOL_REGISTRY
 
 # 每个请求的 Token 上下文变量（用于在工具调用时获取当前 token）
@@ -41,7 +43,10 @@ async def lifespan(app: FastAPI):
     from app.settings.database import get_tortoise_config
     db_config = get_tortoise_config()
     await Tortoise.init(config=db_config)
+    ai_log_writer.start()
     yield
+    await ai_log_writer.stop()
+    await token_usage.stop()
     await Tortoise.close_connections()
 
 
@@ -106,8 +111,9 @@ async def handle_call_tool(
         out = [types.TextContent(type="text", text=f"工具执行异常: {e}")]
 
     duration = int((time.time() - start) * 1000)
-    try:
-        await AiToolCallLog.create(
+    # 日志入队后由后台批量写入，写入失败不影响工具结果返回
+    await ai_log_writer.put(
+        dict(
             ai_token_id=token_obj.id,
             tool_name=name,
             tool_input=arguments,
@@ -117,9 +123,10 @@ async def handle_call_tool(
             error_message=error,
             caller_ip="mcp-sse",
             is_write_op=entry.get("is_write", False),
-        )
-    except Exception:
-        pass  # 日志失败不影响工具结果返回
+        ),
+        model=AiToolCallLog,
+        keep=entry.get("is_write", False),
+    )
 
     return out
 
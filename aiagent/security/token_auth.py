@@ -1,8 +1,36 @@
-from datetime import datetime
+import copy
 
 from fastapi import HTTPException
 
 from aiagent.models.ai_token import AiToken
+from aiagent.security.token_usage import token_usage
+from app.services.cache_version import SharedVersion
+from app.settings.config import settings
+from app.utils.cache import AsyncTTLCache, model_from_row
+
+# Token 更新/删除时 bump，MCP SSE 服务等其他进程在 version_check_seconds 内感知
+token_version = SharedVersion("ai_token", check_interval=settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
+
+_token_cache = AsyncTTLCache(
+    "ai_token",
+    maxsize=settings.AI_TOKEN_CACHE_MAXSIZE,
+    ttl=settings.AI_TOKEN_CACHE_TTL_SECONDS,
+    negative_ttl=settings.AI_TOKEN_NEGATIVE_TTL_SECONDS,
+)
+
+
+async def _get_enabled_token(token_value: str) -> AiToken | None:
+    if settings.AI_TOKEN_CACHE_TTL_SECONDS <= 0:
+        return await AiToken.filter(token=token_value, enabled=True).first()
+
+    async def load():
+        return await AiToken.filter(token=token_value, enabled=True).first().values()
+
+    row = await _token_cache.get_or_load((token_value, await token_version.current()), load)
+    if not row:
+        return None
+    # 每次返回新的模型实例（JSON 字段深拷贝），调用方之间不共享可变对象
+    return model_from_row(AiToken, {**row, "allow_tools": copy.deepcopy(row["allow_tools"])})
 
 
 async def verify_token(token_value: str) -> AiToken:
@@ -10,10 +38,16 @@ async def verify_token(token_value: str) -> AiToken:
     if not token_value:
         raise HTTPException(status_code=401, detail="缺少 X-AI-Token 请求头")
 
-    token_obj = await AiToken.filter(token=token_value, enabled=True).first()
+    token_obj = await _get_enabled_token(token_value)
     if not token_obj:
         raise HTTPException(status_code=401, detail="无效或已禁用的 Token")
 
-    # 更新最后使用时间
-    await AiToken.filter(id=token_obj.id).update(last_used_at=datetime.now())
+    # 更新最后使用时间（合并后批量回写）
+    token_usage.touch(token_obj.id)
     return token_obj
+
+
+async def invalidate_token_cache():
+    """Token 新增、更新或删除后调用"""
+    _token_cache.clear()
+    await token_version.bump()
@@ -0,0 +1,87 @@
+"""
+AI Token 最后使用时间合并回写 - 调用路径只记内存，由后台任务按间隔 bulk_update
+"""
+import asyncio
+import contextlib
+import logging
+from datetime import datetime
+
+from aiagent.models.ai_token import AiToken
+from app.settings.config import settings
+from app.utils.cache import model_from_row
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUsageRecorder:
+    """
+    防抖写入 last_used_at
+
+    - touch 为同步调用，同一 Token 在一个间隔内多次调用只保留最后一次时间；首次调用时自动启动后台任务
+    - 后台任务每 flush_seconds 把待写入的时间一次 bulk_update 落库
+    - stop 会把尚未写入的时间全部落库
+    """
+
+    def __init__(self, flush_seconds: float | None = None):
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.AI_TOKEN_LAST_USED_FLUSH_SECONDS
+        self._pending: dict[int, datetime] = {}
+        self._task: asyncio.Task | None = None
+        self.touched = 0
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="ai-token-usage")
+
+    def touch(self, token_id: int, used_at: datetime | None = None):
+        if not self.running:
+            self.start()
+        self._pending[token_id] = used_at or datetime.now()
+        self.touched += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            # 写入屏蔽取消，关闭时不会中断进行中的 UPDATE
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await AiToken.bulk_update(
+                [model_from_row(AiToken, {"id": token_id, "last_used_at": used_at}) for token_id, used_at in pending.items()],
+                fields=["last_used_at"],
+            )
+            self.written += len(pending)
+        except Exception as e:
+            self.failed += len(pending)
+            logger.error(f"[AI Token] 最后使用时间回写失败，丢弃 {len(pending)} 条: {e}")
+
+    async def stop(self):
+        """停止后台任务并将剩余记录落库"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "flush_seconds": self.flush_seconds,
+            "touched": self.touched,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+token_usage = TokenUsageRecorder()
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Header, HTTPException, Request
 from pydantic import BaseModel
 
 # 引入工具确保装饰器执行，注册工具
+from aiagent.log_writer import ai_log_writer
 from aiagent.models.ai_tool_call_log import AiToolCallLog
 from aiagent.security.permission_checker import check_tool_permission
 from aiagent.security.token_auth import verify_token
@@ -53,16 +54,20 @@ async def call_tool(
     duration = int((time.time() - start) * 1000)
 
     # 记录调用日志
-    await AiToolCallLog.create(
-        ai_token_id=token_obj.id,
-        tool_name=req.tool,
-        tool_input=req.arguments,
-        tool_output_summary=str(result)[:500],
-        duration_ms=duration,
-        status=status,
-        error_message=error,
-        caller_ip=request.client.host if request.client else "unknown",
-        is_write_op=entry.get("is_write", False),
+    await ai_log_writer.put(
+        dict(
+            ai_token_id=token_obj.id,
+            tool_name=req.tool,
+            tool_input=req.arguments,
+            tool_output_summary=str(result)[:500],
+            duration_ms=duration,
+            status=status,
+            error_message=error,
+            caller_ip=request.client.host if request.client else "unknown",
+            is_write_op=entry.get("is_write", False),
+        ),
+        model=AiToolCallLog,
+        keep=entry.get("is_write", False),
     )
 
     return {"content": result}
@@ -4,8 +4,9 @@ from fastapi import APIRouter, Query
 from tortoise.expressions import Q
 
 from app.models.admin import AuditLog
-from app.schemas import SuccessExtra
+from app.schemas import Success, SuccessExtra
 from app.schemas.apis import *
+from app.services.audit_writer import audit_writer
 
 router = APIRouter()
 
@@ -44,3 +45,8 @@ async def get_audit_log_list(
     total = await AuditLog.filter(q).count()
     data = [await audit_log.to_dict() for audit_log in audit_log_objs]
     return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
+
+
+@router.get("/writer-stats", summary="查看审计日志写入状态")
+async def get_audit_writer_stats():
+    return Success(data=audit_writer.stats())
@@ -9,9 +9,10 @@ from app.models.admin import Api, Menu, Role, User
 from app.schemas.base import Fail, Success
 from app.schemas.login import *
 from app.schemas.users import UpdatePassword
+from app.services.auth_cache import invalidate_auth_cache
 from app.settings import settings
 from app.utils.jwt import create_access_token
-from app.utils.password import get_password_hash, verify_password
+from app.utils.password import get_password_hash_async, verify_password_async
 
 router = APIRouter()
 
@@ -121,9 +122,10 @@ async def get_user_api():
 async def update_user_password(req_in: UpdatePassword):
     user_id = CTX_USER_ID.get()
     user = await user_controller.get(user_id)
-    verified = verify_password(req_in.old_password, user.password)
+    verified = await verify_password_async(req_in.old_password, user.password)
     if not verified:
         return Fail(msg="旧密码验证错误！")
-    user.password = get_password_hash(req_in.new_password)
+    user.password = await get_password_hash_async(req_in.new_password)
     await user.save()
+    await invalidate_auth_cache()
     return Success(msg="修改成功")
@@ -2,7 +2,6 @@
 Excel导入任务API接口
 """
 import os
-import re
 import uuid
 from datetime import datetime
 
@@ -17,7 +16,7 @@ from app.schemas.base import Success
 from app.schemas.imptask import ImpTaskOut
 from app.services.celery_dispatcher import dispatch_excelimp_execute, revoke_celery_task
 from app.services.conn_permission_service import ensure_conn_access
-from app.services.excelimp_service import get_progress
+from app.services.excelimp_service import get_progress, get_sql_file_path
 from app.services.imptask_processor import (
     cancel_local_imptask_execute,
     cancel_local_imptask_process,
@@ -25,28 +24,20 @@ from app.services.imptask_processor import (
     submit_imptask_execute,
 )
 from app.services.sql_apply_service import calc_sha256
+from app.utils.upload import UploadSizeError, save_upload_file
 
 router = APIRouter()
 
 # 文件存储目录
 UPLOAD_DIR = "data/excel_import"
 SQL_DIR = "data/sql_files"
+UPLOAD_MAX_SIZE = 100 * 1024 * 1024  # 100MB
 
 # 确保目录存在
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(SQL_DIR, exist_ok=True)
 
 
-def _extract_temp_table_name(sql_text: str) -> str | None:
-    """从SQL内容中提取临时表名。"""
-    if not sql_text:
-        return None
-    match = re.search(r"CREATE\s+TABLE\s+([a-zA-Z0-9_]+)\s*\(", sql_text, flags=re.IGNORECASE)
-    if match:
-        return match.group(1)
-    return None
-
-
 @router.get("/list", summary="获取Excel导入任务列表")
 async def get_task_list(
     page: int = Query(1, ge=1, description="页码"),
@@ -63,16 +54,6 @@ async def get_task_list(
     items_out = []
     for item in items:
         item_dict = await item.to_dict()
-        temp_table_name = None
-        sql_file_path = item_dict.get("sql_file_path")
-        if sql_file_path and os.path.exists(sql_file_path):
-            try:
-                with open(sql_file_path, encoding="utf-8") as f:
-                    sql_text = f.read()
-                temp_table_name = _extract_temp_table_name(sql_text)
-            except Exception:
-                temp_table_name = None
-        item_dict["temp_table_name"] = temp_table_name
         items_out.append(ImpTaskOut(**item_dict))
 
     return Success(data={
@@ -99,20 +80,6 @@ async def create_task(
     if not file.filename.lower().endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="仅支持 .xlsx 和 .xls 格式的Excel文件")
 
-    # 读取文件内容
-    content = await file.read()
-
-    # 验证文件大小
-    max_size = 100 * 1024 * 1024  # 100MB
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=400,
-            detail=f"文件大小超过限制（最大100MB），当前文件大小: {len(content) / 1024 / 1024:.2f}MB"
-        )
-
-    if len(content) == 0:
-        raise HTTPException(status_code=400, detail="文件内容为空")
-
     conn_info = None
     if target_conn_id:
         await ensure_conn_access(current_user, target_conn_id, "使用该目标连接")
@@ -136,16 +103,18 @@ async def create_task(
     file_id = str(uuid.uuid4())
     file_path = os.path.join(UPLOAD_DIR, f"{file_id}.{file_ext}")
 
-    # 保存文件
-    with open(file_path, 'wb') as f:
-        f.write(content)
+    # 分块写入磁盘，边写边校验大小，避免整文件读入内存
+    try:
+        saved = await save_upload_file(file, file_path, max_size=UPLOAD_MAX_SIZE)
+    except UploadSizeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # 创建任务记录
     task = await imptask_controller.create({
         "task_name": task_name,
         "filename": file.filename,
         "file_path": file_path,
-        "file_size": len(content),
+        "file_size": saved["size"],
         "db_type": db_type,
         "target_conn_id": target_conn_id,
         "target_conn_name": conn_info.get("name") if conn_info else None,
@@ -221,12 +190,14 @@ async def execute_task_sql(
             raise HTTPException(status_code=400, detail="target_conn_id不能为空")
         await ensure_conn_access(current_user, int(target_conn_id), "使用该目标连接")
 
-        progress = get_progress(file_key)
+        progress = await get_progress(file_key)
         if not progress or progress.get("stage") != "done":
             raise HTTPException(status_code=400, detail="该临时任务未完成，不能执行")
-        sql_text = progress.get("sql")
-        if not sql_text:
+        sql_file = await get_sql_file_path(file_key)
+        if not sql_file:
             raise HTTPException(status_code=400, detail="未找到可执行SQL内容")
+        with open(sql_file, encoding="utf-8") as file_obj:
+            sql_text = file_obj.read()
 
         # 防篡改：校验缓存中的sql摘要
         current_sha = calc_sha256(sql_text)
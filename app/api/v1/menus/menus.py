@@ -8,6 +8,7 @@ from app.controllers.menu import menu_controller
 from app.models.admin import Api, Menu, MenuApi
 from app.schemas.base import Fail, Success, SuccessExtra
 from app.schemas.menus import *
+from app.services.auth_cache import invalidate_permission_cache
 
 logger = logging.getLogger(__name__)
 
@@ -128,6 +129,7 @@ async def delete_menu(
     # 删除菜单时同时删除关联的menu_api记录
     await MenuApi.filter(menu_id=id).delete()
     await menu_controller.remove(id=id)
+    await invalidate_permission_cache()
     return Success(msg="Deleted Success")
 
 
@@ -172,6 +174,7 @@ async def update_menu_apis(
         api = await Api.filter(id=api_id).first()
         if api:
             await ensure_menu_api(menu_id, api_id)
+    await invalidate_permission_cache()
 
     return Success(msg="更新成功")
 
@@ -333,6 +336,7 @@ async def _do_refresh_menu_api_relations(mode: str = "increment"):
         _refresh_task_status["result"] = f"刷新失败: {e!s}"
         logger.error(_refresh_task_status["result"])
     finally:
+        await invalidate_permission_cache()
         _refresh_task_status["running"] = False
 
 
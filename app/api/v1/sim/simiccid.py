@@ -1,4 +1,6 @@
 import asyncio
+import os
+import uuid
 
 from fastapi import APIRouter, File, Query, Request, UploadFile
 from pydantic import BaseModel
@@ -6,19 +8,31 @@ from pydantic import BaseModel
 from app.core.dependency import AuthControl
 from app.models.admin import User
 from app.schemas.base import Fail, Success
-from app.services.sim_service import sim_service
+from app.services.sim_service import SIM_UPLOAD_DIR, SIM_UPLOAD_MAX_SIZE, sim_service, sim_upload_extension
 from app.utils.audit_log import create_operation_audit_log
+from app.utils.upload import save_upload_file
 
 router = APIRouter()
 
 
+async def _save_upload(file: UploadFile, file_key: str) -> str:
+    """校验文件类型后分块保存上传文件，返回落盘路径"""
+    ext = sim_upload_extension(file.filename or "upload.xlsx")
+    if ext is None:
+        raise ValueError("仅支持.xlsx或.csv文件")
+    file_path = os.path.join(SIM_UPLOAD_DIR, f"{file_key}.{ext}")
+    await save_upload_file(file, file_path, max_size=SIM_UPLOAD_MAX_SIZE)
+    return file_path
+
+
 @router.post("/upload", summary="上传SIM-ICCID Excel并写入临时表")
 async def upload_sim_iccid(req: Request, file: UploadFile = File(...)):
     """上传文件并写入临时表"""
     try:
-        content = await file.read()
         filename = file.filename or "upload.xlsx"
-        file_key = await sim_service.upload_excel(content, filename)
+        file_key = str(uuid.uuid4())
+        file_path = await _save_upload(file, file_key)
+        await sim_service.upload_excel(file_path, filename, stamp=file_key)
         try:
             token = req.headers.get("token")
             user_obj: User = None
@@ -91,14 +105,13 @@ async def process_sim_iccid(req: Request, body: ProcessBody):
 async def submit_sim_iccid(req: Request, file: UploadFile = File(...)):
     """上传Excel并立即处理（异步），返回本次导入的临时标识"""
     try:
-        content = await file.read()
         filename = file.filename or "upload.xlsx"
-        # 预生成批次号并启动后台任务
-        import uuid
+        # 预生成批次号，文件落盘后启动后台任务
         file_key = str(uuid.uuid4())
+        file_path = await _save_upload(file, file_key)
         async def _runner():
             try:
-                await sim_service.submit_and_process(content, filename, stamp=file_key)
+                await sim_service.submit_and_process(file_path, filename, stamp=file_key)
             except Exception:
                 return
         asyncio.create_task(_runner())
@@ -134,5 +147,5 @@ async def submit_sim_iccid(req: Request, file: UploadFile = File(...)):
 @router.get("/progress", summary="查询SIM-ICCID导入进度")
 async def progress_sim_iccid(file_key: str = Query(..., description="导入批次号")):
     """查询导入任务进度"""
-    data = sim_service.get_progress(file_key)
+    data = await sim_service.get_progress(file_key)
     return Success(data=data)
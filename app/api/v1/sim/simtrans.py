@@ -67,6 +67,6 @@ async def sync_sim_cards(req: Request, body: SyncRequest):
 @router.get("/sync/status", summary="查询SIM卡同步任务状态")
 async def get_sync_status(task_id: str = Query(..., description="同步任务ID")):
     try:
-        return Success(data=get_simtrans_sync_status(task_id), msg="OK")
+        return Success(data=await get_simtrans_sync_status(task_id), msg="OK")
     except Exception as e:
         return Fail(code=500, msg=f"查询同步状态失败: {e!s}")
@@ -4,6 +4,7 @@ import uuid
 from typing import Literal
 
 from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
 
 from app.controllers.conn import conn_controller
 from app.core.dependency import DependAuth
@@ -11,12 +12,22 @@ from app.models.admin import User
 from app.schemas.base import Success
 from app.services.celery_dispatcher import dispatch_excelimp_generate
 from app.services.conn_permission_service import ensure_conn_access
-from app.services.excelimp_service import EXCELIMP_TASK_DIR, generate_sql, generate_sql_file_task, get_progress
+from app.services.cpu_pool import CpuPoolBusyError, run_cpu_bound
+from app.services.excelimp_service import (
+    EXCELIMP_TASK_DIR,
+    generate_sql,
+    generate_sql_file_task,
+    get_progress,
+    get_sql_file_path,
+)
 from app.services.formatter_service import format_sql
 from app.utils.audit_log import create_operation_audit_log
+from app.utils.upload import UploadSizeError, read_upload_limited, save_upload_file
 
 router = APIRouter(tags=["日常工具"])
 
+SUBMIT_MAX_SIZE = 100 * 1024 * 1024  # 100MB
+
 
 @router.post("/excelimp/generate", summary="生成Excel临时表SQL")
 async def generate_excel_sql(
@@ -41,29 +52,27 @@ async def generate_excel_sql(
         raise HTTPException(status_code=400, detail="仅支持 .xlsx 和 .xls 格式的Excel文件")
 
     try:
-        # 读取文件内容
-        content = await file.read()
-
-        # 验证文件大小（最大10MB）
-        max_size = 10 * 1024 * 1024  # 100MB
-        if len(content) > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"文件大小超过限制（最大10MB），当前文件大小: {len(content) / 1024 / 1024:.2f}MB"
-            )
+        # 分块读取文件内容，超过大小限制（最大10MB）立即中止
+        max_size = 10 * 1024 * 1024
+        try:
+            content = await read_upload_limited(file, max_size=max_size)
+        except UploadSizeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         # 验证文件不为空
         if len(content) == 0:
             raise HTTPException(status_code=400, detail="文件内容为空")
 
-        # 生成SQL
-        sql_result = generate_sql(content, file.filename, db_type)
+        # 生成SQL（在进程池中解析，避免阻塞事件循环）
+        sql_result = await run_cpu_bound(generate_sql, content, file.filename, db_type)
 
         return Success(data={"sql": sql_result})
 
     except HTTPException:
         # 原样重新抛出HTTP异常
         raise
+    except CpuPoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         # 使用友好的消息处理Excel解析错误
         error_msg = str(e)
@@ -105,21 +114,6 @@ async def submit_excel_sql(
         raise HTTPException(status_code=400, detail="仅支持 .xlsx 和 .xls 格式的Excel文件")
 
     try:
-        # 读取文件内容
-        content = await file.read()
-
-        # 验证文件大小（最大100MB）
-        max_size = 100 * 1024 * 1024  # 100MB
-        if len(content) > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"文件大小超过限制（最大100MB），当前文件大小: {len(content) / 1024 / 1024:.2f}MB"
-            )
-
-        # 验证文件不为空
-        if len(content) == 0:
-            raise HTTPException(status_code=400, detail="文件内容为空")
-
         # 配置连接时由连接决定db_type；未配置时使用默认mysql生成SQL
         if target_conn_id:
             await ensure_conn_access(current_user, target_conn_id, "使用该目标连接")
@@ -136,8 +130,10 @@ async def submit_excel_sql(
         file_key = str(uuid.uuid4())
         file_ext = file.filename.split(".")[-1].lower()
         file_path = os.path.join(EXCELIMP_TASK_DIR, f"{file_key}.{file_ext}")
-        with open(file_path, "wb") as f:
-            f.write(content)
+        try:
+            await save_upload_file(file, file_path, max_size=SUBMIT_MAX_SIZE)
+        except UploadSizeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         celery_task_id = dispatch_excelimp_generate(file_path, file.filename, db_type, file_key)
         if not celery_task_id:
@@ -182,12 +178,31 @@ async def get_excel_progress(file_key: str = Query(..., description="任务标
         file_key: 任务标识
     
     返回:
-        任务进度信息，包括阶段、状态、SQL结果等
+        任务进度信息，包括阶段、状态等；SQL正文通过 /excelimp/download 获取
     """
-    data = get_progress(file_key)
+    data = await get_progress(file_key)
     return Success(data=data)
 
 
+@router.get("/excelimp/download", summary="下载Excel临时表SQL文件")
+async def download_excel_sql(file_key: str = Query(..., description="任务标识")):
+    """
+    流式下载已生成的SQL文件，避免在进度轮询中返回整段SQL
+
+    参数:
+        file_key: 任务标识
+    """
+    sql_file = await get_sql_file_path(file_key)
+    if not sql_file:
+        raise HTTPException(status_code=404, detail="SQL尚未生成完成或文件不存在")
+
+    return FileResponse(
+        path=sql_file,
+        filename=f"excel_import_{file_key}.sql",
+        media_type="application/octet-stream",
+    )
+
+
 @router.post("/formatter/format", summary="格式化SQL语句")
 async def format_sql_statement(
     sql: str = Form(...),
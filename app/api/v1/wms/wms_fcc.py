@@ -28,7 +28,7 @@ async def parse_input(body: FccParseIn):
     - 示例：J202512250009:ZD20260325153906B413D18,ZD202603251538028DCFA89;
     """
     try:
-        result = fcc_relation_service.parse_input_text(body.input_text)
+        result = await fcc_relation_service.parse_input(body.input_text)
         return Success(data=result)
     except Exception as e:
         logger.error(f"解析失败: {e}")
@@ -103,7 +103,7 @@ async def get_task_status(task_id: str):
     查询异步任务的执行状态和结果
     """
     try:
-        result = fcc_relation_service.query_task_status(task_id)
+        result = await fcc_relation_service.query_task_status(task_id)
         if not result:
             return Fail(code=404, msg="任务不存在")
         return Success(data=result)
@@ -2,9 +2,11 @@ from fastapi.routing import APIRoute, _IncludedRouter, _EffectiveRouteContext
 from tortoise import connections
 
 from app.core.crud import CRUDBase
+from app.core.route_index import route_index
 from app.log import logger
 from app.models.admin import Api
 from app.schemas.apis import ApiCreate, ApiUpdate
+from app.services.auth_cache import invalidate_permission_cache
 
 
 def collect_api_routes(routes) -> list[_EffectiveRouteContext]:
@@ -24,6 +26,20 @@ class ApiController(CRUDBase[Api, ApiCreate, ApiUpdate]):
     def __init__(self):
         super().__init__(model=Api)
 
+    async def create(self, obj_in: ApiCreate) -> Api:
+        obj = await super().create(obj_in=obj_in)
+        await invalidate_permission_cache()
+        return obj
+
+    async def update(self, id: int, obj_in: ApiUpdate) -> Api:
+        obj = await super().update(id=id, obj_in=obj_in)
+        await invalidate_permission_cache()
+        return obj
+
+    async def remove(self, id: int) -> None:
+        await super().remove(id=id)
+        await invalidate_permission_cache()
+
     async def sync_api_sequence(self):
         """同步PostgreSQL自增序列，避免手工插入ID后刷新API主键冲突。"""
         try:
@@ -46,6 +62,7 @@ class ApiController(CRUDBase[Api, ApiCreate, ApiUpdate]):
     async def refresh_api(self):
         from app.main import app
 
+        route_index.build(app.routes)
         api_routes = collect_api_routes(app.routes)
 
         all_api_list = []
@@ -74,6 +91,7 @@ class ApiController(CRUDBase[Api, ApiCreate, ApiUpdate]):
             else:
                 logger.debug(f"API Created {method} {path}")
                 await Api.create(**dict(method=method, path=path, summary=summary, tags=tags))
+        await invalidate_permission_cache()
 
 
 api_controller = ApiController()
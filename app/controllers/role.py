@@ -3,6 +3,7 @@ from app.core.crud import CRUDBase
 from app.log import logger
 from app.models.admin import Menu, MenuApi, Role
 from app.schemas.roles import RoleCreate, RoleUpdate
+from app.services.auth_cache import invalidate_auth_cache, invalidate_permission_cache
 
 
 class RoleController(CRUDBase[Role, RoleCreate, RoleUpdate]):
@@ -12,6 +13,18 @@ class RoleController(CRUDBase[Role, RoleCreate, RoleUpdate]):
     async def is_exist(self, name: str) -> bool:
         return await self.model.filter(name=name).exists()
 
+    async def update(self, id: int, obj_in: RoleUpdate) -> Role:
+        obj = await super().update(id=id, obj_in=obj_in)
+        # 角色名称决定是否按管理员处理连接权限
+        await invalidate_auth_cache()
+        return obj
+
+    async def remove(self, id: int) -> None:
+        await super().remove(id=id)
+        # 删除角色同时解除了用户绑定与菜单授权
+        await invalidate_auth_cache()
+        await invalidate_permission_cache()
+
     async def update_roles(self, role: Role, menu_ids: list[int]) -> None:
         """
         更新角色权限
@@ -48,6 +61,7 @@ class RoleController(CRUDBase[Role, RoleCreate, RoleUpdate]):
         # 由于Role模型不再有apis字段，我们需要直接操作role_menu_api表
         # 但实际上我们改用另一种方式：在权限检查时动态计算
 
+        await invalidate_permission_cache()
         logger.info(f"角色 {role.name} 权限更新完成: {len(valid_menu_ids)} 个菜单, 关联 {len(api_ids)} 个API")
 
 
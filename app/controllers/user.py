@@ -8,7 +8,9 @@ from app.models.admin import User
 from app.models.conn import DBConnection
 from app.schemas.login import CredentialsSchema
 from app.schemas.users import UserCreate, UserUpdate
-from app.utils.password import get_password_hash, verify_password
+from app.services.auth_cache import invalidate_auth_cache
+from app.services.conn_permission_service import invalidate_conn_permission_cache
+from app.utils.password import get_password_hash_async, verify_password_async
 
 from .role import role_controller
 
@@ -25,10 +27,19 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
 
     async def create_user(self, obj_in: UserCreate) -> User:
         obj_dict = obj_in.create_dict()
-        obj_dict["password"] = get_password_hash(password=obj_in.password)
+        obj_dict["password"] = await get_password_hash_async(obj_in.password)
         obj = await self.create(obj_dict)
         return obj
 
+    async def update(self, id: int, obj_in: UserUpdate | dict) -> User:
+        obj = await super().update(id=id, obj_in=obj_in)
+        await invalidate_auth_cache()
+        return obj
+
+    async def remove(self, id: int) -> None:
+        await super().remove(id=id)
+        await invalidate_auth_cache()
+
     async def update_last_login(self, id: int) -> None:
         user = await self.model.get(id=id)
         user.last_login = datetime.now()
@@ -45,7 +56,7 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.model.filter(username=credentials.username).first()
         if not user:
             return None, "无效的用户名"
-        verified = verify_password(credentials.password, user.password)
+        verified = await verify_password_async(credentials.password, user.password)
         if not verified:
             return None, "密码错误"
         if not user.is_active:
@@ -57,25 +68,30 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         for role_id in role_ids:
             role_obj = await role_controller.get(id=role_id)
             await user.roles.add(role_obj)
+        await invalidate_auth_cache()
 
     async def update_conn_permissions(self, user: User, conn_ids: list[int]) -> None:
         await user.conn_permissions.clear()
-        if not conn_ids:
-            return
-        conn_objs = await DBConnection.filter(id__in=conn_ids).all()
-        found_ids = {conn.id for conn in conn_objs}
-        input_ids = {int(conn_id) for conn_id in conn_ids}
-        if found_ids != input_ids:
-            missing_ids = sorted(list(input_ids - found_ids))
-            raise HTTPException(status_code=400, detail=f"连接不存在: {missing_ids}")
-        await user.conn_permissions.add(*conn_objs)
+        try:
+            if not conn_ids:
+                return
+            conn_objs = await DBConnection.filter(id__in=conn_ids).all()
+            found_ids = {conn.id for conn in conn_objs}
+            input_ids = {int(conn_id) for conn_id in conn_ids}
+            if found_ids != input_ids:
+                missing_ids = sorted(list(input_ids - found_ids))
+                raise HTTPException(status_code=400, detail=f"连接不存在: {missing_ids}")
+            await user.conn_permissions.add(*conn_objs)
+        finally:
+            await invalidate_conn_permission_cache()
 
     async def reset_password(self, user_id: int):
         user_obj = await self.get(id=user_id)
         if user_obj.is_superuser:
             raise HTTPException(status_code=403, detail="不允许重置超级管理员密码")
-        user_obj.password = get_password_hash(password="123456")
+        user_obj.password = await get_password_hash_async("123456")
         await user_obj.save()
+        await invalidate_auth_cache()
 
 
 user_controller = UserController()
@@ -1,48 +1,63 @@
 import time
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.controllers.auditlog import AuditLogController
-from app.core.ctx import get_current_user
+from app.core.dependency import AuthControl
+from app.log import logger
+from app.services.audit_writer import audit_writer
 
 
-class AuditLogMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
+class AuditLogMiddleware:
+    """仅记录状态码与耗时的轻量审计中间件（纯 ASGI，不读取请求/响应体）"""
+
+    SKIP_PATHS = frozenset({"/docs", "/redoc", "/openapi.json"})
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Skip audit logging for some paths
-        if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in self.SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-        start_time = time.time()
-        response = await call_next(request)
+        start_time = time.perf_counter()
+        status = 500
+        scope.setdefault("state", {})
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
         # Calculate response time
-        response_time = int((time.time() - start_time) * 1000)  # Convert to milliseconds
+        response_time = int((time.perf_counter() - start_time) * 1000)  # Convert to milliseconds
 
         try:
-            # Get current user from context
-            current_user = await get_current_user()
-            user_id = current_user.id if current_user else 0
-            username = current_user.username if current_user else ""
+            token = Headers(scope=scope).get("token")
+            current_user = await AuthControl.is_authed(token, Request(scope)) if token else None
 
             # Get module name from path
-            path = request.url.path
+            path = scope["path"]
             module = path.split("/")[2] if len(path.split("/")) > 2 else ""
 
-            # Create audit log
-            controller = AuditLogController()
-            await controller.create_log(
-                user_id=user_id,
-                username=username,
-                module=module,
-                summary=request.url.path,
-                method=request.method,
-                path=request.url.path,
-                status=response.status_code,
-                response_time=response_time,
+            audit_writer.submit(
+                {
+                    "user_id": current_user.id if current_user else 0,
+                    "username": current_user.username if current_user else "",
+                    "module": module,
+                    "summary": path,
+                    "method": scope["method"],
+                    "path": path,
+                    "status": status,
+                    "response_time": response_time,
+                }
             )
         except Exception as e:
             # Log the error but don't interrupt the response
-            print(f"Error creating audit log: {e!s}")
-
-        return response
+            logger.warning(f"Error creating audit log: {e!s}")
@@ -101,6 +101,80 @@ class RedisConfig(BaseModel):
     url: str = "redis://127.0.0.1:6379/0"
 
 
+class ProgressStoreConfig(BaseModel):
+    """任务进度存储配置"""
+    backend: str = "auto"  # auto/redis: 优先Redis，不可用时回退文件存储; file; memory: 仅进程内（单Worker）
+    ttl_seconds: int = Field(default=86400, description="进度记录过期时间(秒)")
+    file_dir: str = Field(default="data/progress", description="文件存储目录（同一主机的各进程共享）")
+
+
+class CpuPoolConfig(BaseModel):
+    """CPU密集任务进程池配置（Excel解析、SQL生成等）"""
+    max_workers: int = Field(default=2, description="进程数，0表示不使用进程池（退化为线程执行）")
+    max_queue: int = Field(default=8, description="进程全部繁忙时允许排队的任务数，超出直接拒绝")
+
+
+class PasswordHashConfig(BaseModel):
+    """密码哈希（argon2）线程池配置"""
+    pool_size: int = Field(default=4, ge=1, description="并发执行密码校验/哈希的线程数，argon2 计算期间释放GIL")
+
+
+class UserCacheConfig(BaseModel):
+    """OA用户信息缓存配置（按 UserCenterUserId 缓存）"""
+    maxsize: int = Field(default=10000, ge=1, description="最多缓存的用户数")
+    ttl_seconds: int = Field(default=300, ge=0, description="命中记录的过期时间(秒)，0 表示不缓存")
+    negative_ttl_seconds: int = Field(default=60, ge=0, description="查无此人记录的过期时间(秒)，0 表示不缓存")
+    search_ttl_seconds: int = Field(default=30, ge=0, description="关键字搜索结果的过期时间(秒)，0 表示不缓存")
+
+
+class FccRelationConfig(BaseModel):
+    """FCC报销单关联配置"""
+    concurrency: int = Field(default=4, ge=1, description="关联任务并发处理的关系数（每路占用FCC与仓储各一个连接）")
+    stale_seconds: int = Field(default=600, ge=60, description="处理中任务超过该时长无进度更新视为已中断")
+
+
+class AuthCacheConfig(BaseModel):
+    """登录身份与权限缓存配置（用户/角色/菜单变更时按版本号失效）"""
+    maxsize: int = Field(default=5000, ge=1, description="最多缓存的用户数")
+    user_ttl_seconds: int = Field(default=60, ge=0, description="用户身份缓存时长（秒），0 表示不缓存")
+    permission_ttl_seconds: int = Field(default=300, ge=0, description="角色权限表缓存时长（秒），0 表示不缓存")
+    version_check_seconds: float = Field(default=2, ge=0, description="检查其他Worker失效通知的间隔（秒）")
+
+
+class AiTokenConfig(BaseModel):
+    """MCP Token 校验缓存与最后使用时间批量回写配置"""
+    maxsize: int = Field(default=1000, ge=1, description="最多缓存的 Token 数")
+    cache_ttl_seconds: int = Field(default=60, ge=0, description="有效 Token 缓存时长（秒），0 表示不缓存")
+    negative_ttl_seconds: int = Field(default=5, ge=0, description="无效 Token 缓存时长（秒），0 表示不缓存")
+    last_used_flush_seconds: float = Field(default=30, ge=0.1, description="最后使用时间批量回写间隔（秒）")
+
+
+class AuditLogConfig(BaseModel):
+    """HTTP审计日志异步批量写入配置"""
+    batch_size: int = Field(default=200, ge=1, description="单次批量写入的最大条数")
+    flush_interval_ms: int = Field(default=500, ge=10, description="未攒满一批时最长等待时间（毫秒）")
+    max_queue: int = Field(default=10000, ge=1, description="内存队列上限")
+    overflow: str = Field(default="drop_oldest", description="队列满时的策略：drop_oldest 丢弃最早一条；drop_new 丢弃新记录")
+    shutdown_timeout: float = Field(default=10, ge=0, description="应用关闭时等待剩余日志落库的最长秒数")
+
+
+class AiLogConfig(BaseModel):
+    """AI 工具调用/大模型调用日志异步批量写入配置"""
+    batch_size: int = Field(default=200, ge=1, description="单次批量写入的最大条数")
+    flush_interval_ms: int = Field(default=500, ge=10, description="未攒满一批时最长等待时间（毫秒）")
+    max_queue: int = Field(default=10000, ge=1, description="内存队列上限")
+    put_timeout_ms: int = Field(default=200, ge=0, description="队列满时等待入队的最长时间（毫秒），超时丢弃该条；写操作日志一直等待")
+    shutdown_timeout: float = Field(default=10, ge=0, description="应用关闭时等待剩余日志落库的最长秒数")
+
+
+class SimTransConfig(BaseModel):
+    """SIM卡同步配置"""
+    sync_strategy: str = Field(
+        default="probe",
+        description="存在性过滤方式：probe 分表IN查询后逐行写入；staging 会话临时表+反连接批量写入",
+    )
+
+
 class CeleryConfig(BaseModel):
     """Celery 配置"""
     enabled: bool = True
@@ -151,6 +225,16 @@ class Config(BaseModel):
     report: ReportConfig
     redis: RedisConfig = Field(default_factory=RedisConfig)
     celery: CeleryConfig = Field(default_factory=CeleryConfig)
+    progress_store: ProgressStoreConfig = Field(default_factory=ProgressStoreConfig)
+    cpu_pool: CpuPoolConfig = Field(default_factory=CpuPoolConfig)
+    password_hash: PasswordHashConfig = Field(default_factory=PasswordHashConfig)
+    simtrans: SimTransConfig = Field(default_factory=SimTransConfig)
+    audit_log: AuditLogConfig = Field(default_factory=AuditLogConfig)
+    ai_log: AiLogConfig = Field(default_factory=AiLogConfig)
+    auth_cache: AuthCacheConfig = Field(default_factory=AuthCacheConfig)
+    ai_token: AiTokenConfig = Field(default_factory=AiTokenConfig)
+    fcc_relation: FccRelationConfig = Field(default_factory=FccRelationConfig)
+    user_cache: UserCacheConfig = Field(default_factory=UserCacheConfig)
     oss: OSSConfig = Field(default_factory=OSSConfig)
     gfs_sync: GfsSyncConfig = Field(default_factory=GfsSyncConfig)
 
@@ -4,13 +4,22 @@ import jwt
 from fastapi import Depends, Header, HTTPException, Request
 
 from app.core.ctx import CTX_USER_ID
-from app.models import MenuApi, Role, User
+from app.models import User
+from app.services.auth_cache import get_auth_user, get_permission_map, get_user_role_ids
 from app.settings import settings
 
 
 class AuthControl:
     @classmethod
-    async def is_authed(cls, token: str = Header(..., description="token验证")) -> Any | None:
+    async def is_authed(
+        cls, token: str = Header(..., description="token验证"), request: Request = None
+    ) -> Any | None:
+        # 同一请求内已解析过（如接口依赖之后审计中间件再次解析）直接复用
+        state = request.state if request is not None else None
+        if state is not None and getattr(state, "auth_token", None) == token:
+            user = state.auth_user
+            CTX_USER_ID.set(int(user.id))
+            return user
         try:
             if token == "dev":
                 user = await User.filter().first()
@@ -18,10 +27,13 @@ class AuthControl:
             else:
                 decode_data = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.JWT_ALGORITHM)
                 user_id = decode_data.get("user_id")
-            user = await User.filter(id=user_id).first()
+            user = await get_auth_user(user_id)
             if not user:
                 raise HTTPException(status_code=401, detail="Authentication failed")
             CTX_USER_ID.set(int(user_id))
+            if state is not None:
+                state.auth_token = token
+                state.auth_user = user
             return user
         except jwt.DecodeError:
             raise HTTPException(status_code=401, detail="无效的Token")
@@ -38,40 +50,27 @@ class PermissionControl:
             return
         method = request.method
         path = request.url.path
-        roles: list[Role] = await current_user.roles
-        if not roles:
+        role_ids = await get_user_role_ids(current_user.id)
+        if not role_ids:
             raise HTTPException(status_code=403, detail="The user is not bound to a role")
 
-        # 获取用户所有角色的菜单ID
-        menu_ids = set()
-        for role in roles:
-            role_menus = await role.menus.all()
-            for menu in role_menus:
-                menu_ids.add(menu.id)
+        # 预编译的角色权限表，命中时只做集合查找
+        permissions = await get_permission_map()
+        if permissions.allows(role_ids, method, path):
+            return
 
-        # 通过menu_api表获取菜单对应的API
-        if menu_ids:
-            menu_api_relations = await MenuApi.filter(menu_id__in=menu_ids).prefetch_related("api")
-            permission_apis = set()
-            for relation in menu_api_relations:
-                if relation.api:
-                    permission_apis.add((relation.api.method, relation.api.path))
+        # 提供更详细的错误信息
+        menu_ids = set().union(*(permissions.role_menus.get(role_id, ()) for role_id in role_ids))
+        permission_apis = set().union(*(permissions.role_apis.get(role_id, ()) for role_id in role_ids))
+        if (method, path) not in permissions.all_apis:
+            detail = f"API not found in database: {method} {path}. Please refresh API table."
+        elif not menu_ids:
+            detail = "User has no menu permissions. Please assign menus to user's roles."
+        elif not permission_apis:
+            detail = "Menus have no API mappings. Please configure menu-API relations in menu management."
         else:
-            permission_apis = set()
-
-        if (method, path) not in permission_apis:
-            # 提供更详细的错误信息
-            from app.models.admin import Api
-            api_exists = await Api.filter(method=method, path=path).exists()
-            if not api_exists:
-                detail = f"API not found in database: {method} {path}. Please refresh API table."
-            elif not menu_ids:
-                detail = "User has no menu permissions. Please assign menus to user's roles."
-            elif not permission_apis:
-                detail = "Menus have no API mappings. Please configure menu-API relations in menu management."
-            else:
-                detail = f"Permission denied: {method} {path}. Please add this API to user's menu permissions."
-            raise HTTPException(status_code=403, detail=detail)
+            detail = f"Permission denied: {method} {path}. Please add this API to user's menu permissions."
+        raise HTTPException(status_code=403, detail=detail)
 
 
 DependAuth = Depends(AuthControl.is_authed)
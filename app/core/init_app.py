@@ -1,3 +1,4 @@
+import asyncio
 import shutil
 
 from aerich import Command
@@ -21,9 +22,12 @@ from app.core.exceptions import (
     ResponseValidationError,
     ResponseValidationHandle,
 )
+from app.core.route_index import route_index
 from app.log import logger
 from app.models.admin import Api, Menu, MenuApi, Role
 from app.schemas.menus import MenuType
+from app.services.auth_cache import invalidate_permission_cache
+from app.services.imptask_processor import backfill_imptask_metadata
 from app.services.task_scheduler import scheduler
 from app.settings.config import settings
 from app.settings.database import get_tortoise_config, load_dynamic_connections
@@ -208,6 +212,7 @@ async def ensure_oa_menus():
         relation_exists = await MenuApi.filter(menu_id=menu_id, api_id=api_obj.id).exists()
         if not relation_exists:
             await MenuApi.create(menu_id=menu_id, api_id=api_obj.id)
+    await invalidate_permission_cache()
 
 async def init_apis():
     apis = await api_controller.model.exists()
@@ -261,6 +266,18 @@ async def init_task_scheduler():
         logger.error(f"启动任务调度器时发生错误: {e!s}")
 
 
+async def _run_imptask_backfill():
+    try:
+        await backfill_imptask_metadata()
+    except Exception as e:
+        logger.error(f"导入任务元数据回填失败: {e!s}")
+
+
+def init_imptask_backfill():
+    """后台回填历史导入任务元数据，不阻塞启动"""
+    asyncio.create_task(_run_imptask_backfill())
+
+
 async def init_dynamic_connections():
     """
     初始化动态数据库连接池
@@ -293,6 +310,7 @@ async def reinit_tortoise_with_dynamic_connections():
 
 
 async def init_app(app: FastAPI):
+    route_index.build(app.routes)
     await init_database(app)
     await init_superuser()
     await init_apis()
@@ -301,6 +319,7 @@ async def init_app(app: FastAPI):
     await init_dynamic_connections()
     await reinit_tortoise_with_dynamic_connections()
     await init_task_scheduler()
+    init_imptask_backfill()
 
     return app
 
@@ -1,25 +1,28 @@
 import re
-from datetime import datetime
+import time
 
 from fastapi import FastAPI
-from fastapi.responses import Response
-from fastapi.routing import APIRoute
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.datastructures import Headers
 from starlette.requests import Request
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.dependency import AuthControl
-from app.models.admin import AuditLog, User
+from app.core.route_index import route_index
+from app.models.admin import User
+from app.services.audit_writer import audit_writer
 from app.utils.audit_log import (
+    MAX_AUDIT_BODY_LEN,
+    decode_captured_body,
     should_skip_request_body,
     should_skip_response_body,
-    truncate_body_text,
 )
 
 from .bgtask import BgTasks
 
 
-class SimpleBaseMiddleware:
+class BackGroundTaskMiddleware:
+    """为每个请求初始化后台任务容器，响应发送完毕后执行（纯 ASGI）"""
+
     def __init__(self, app: ASGIApp) -> None:
         self.app = app
 
@@ -28,103 +31,83 @@ class SimpleBaseMiddleware:
             await self.app(scope, receive, send)
             return
 
-        request = Request(scope, receive=receive)
-
-        response = await self.before_request(request) or self.app
-        await response(request.scope, request.receive, send)
-        await self.after_request(request)
-
-    async def before_request(self, request: Request):
-        return self.app
+        await BgTasks.init_bg_tasks_obj()
+        await self.app(scope, receive, send)
+        await BgTasks.execute_tasks()
 
-    async def after_request(self, request: Request):
-        return None
 
+class _BodyCapture:
+    """流式截取消息体：只保留前 limit 字节，同时累计总字节数"""
 
-class BackGroundTaskMiddleware(SimpleBaseMiddleware):
-    async def before_request(self, request):
-        await BgTasks.init_bg_tasks_obj()
+    __slots__ = ("buffer", "total", "limit")
 
-    async def after_request(self, request):
-        await BgTasks.execute_tasks()
+    def __init__(self, limit: int = MAX_AUDIT_BODY_LEN):
+        self.buffer = bytearray()
+        self.total = 0
+        self.limit = limit
 
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.total += len(chunk)
+        remaining = self.limit - len(self.buffer)
+        if remaining > 0:
+            self.buffer.extend(chunk[:remaining])
 
-class HttpAuditLogMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, methods: list, exclude_paths: list):
-        super().__init__(app)
-        self.methods = methods
-        self.exclude_paths = exclude_paths
+    def text(self) -> str:
+        return decode_captured_body(bytes(self.buffer), self.total)
 
-    @staticmethod
-    def _wrap_request_with_body(request: Request, body: bytes) -> Request:
-        async def receive():
-            return {"type": "http.request", "body": body, "more_body": False}
 
-        return Request(request.scope, receive)
+class HttpAuditLogMiddleware:
+    """
+    HTTP审计日志中间件（纯 ASGI）
 
-    @staticmethod
-    async def _read_request_body(request: Request) -> tuple[Request, str]:
-        if should_skip_request_body(request):
-            return request, ""
+    包装 receive/send 旁路截取请求体与响应体的前 MAX_AUDIT_BODY_LEN 字节，
+    消息原样立即透传，不缓冲完整响应，流式下载的首字节时间不受影响
+    """
 
-        body_bytes = await request.body()
-        request = HttpAuditLogMiddleware._wrap_request_with_body(request, body_bytes)
-        if not body_bytes:
-            return request, ""
-        try:
-            return request, body_bytes.decode("utf-8")
-        except UnicodeDecodeError:
-            return request, ""
-
-    @staticmethod
-    async def _read_response_body(response: Response) -> tuple[Response, str]:
-        body_chunks: list[bytes] = []
-        async for chunk in response.body_iterator:
-            body_chunks.append(chunk)
-        body_bytes = b"".join(body_chunks)
-        new_response = Response(
-            content=body_bytes,
-            status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.media_type,
+    def __init__(self, app: ASGIApp, methods: list, exclude_paths: list):
+        self.app = app
+        self.methods = methods
+        self.exclude_paths = exclude_paths
+        # 多个排除规则合并为一个正则，每个请求只匹配一次
+        self._exclude_re = (
+            re.compile("|".join(f"(?:{path})" for path in exclude_paths), re.IGNORECASE)
+            if exclude_paths
+            else None
         )
-        if not body_bytes:
-            return new_response, ""
-        try:
-            return new_response, body_bytes.decode("utf-8")
-        except UnicodeDecodeError:
-            return new_response, ""
 
-    async def get_request_log(
-        self, request: Request, response: Response, request_body: str, response_body: str
-    ) -> dict:
+    def _should_audit(self, scope: Scope) -> bool:
+        if scope["method"] not in self.methods:
+            return False
+        return self._exclude_re is None or self._exclude_re.search(scope["path"]) is None
+
+    async def get_request_log(self, request: Request, status: int, request_body: str, response_body: str) -> dict:
         """
-        根据request和response对象获取对应的日志记录数据
+        根据request和响应状态获取对应的日志记录数据
         """
         data: dict = {
             "path": request.url.path,
-            "status": response.status_code,
+            "status": status,
             "method": request.method,
-            "request_body": truncate_body_text(request_body),
-            "response_body": truncate_body_text(response_body),
+            "request_body": request_body,
+            "response_body": response_body,
         }
 
         # 路由信息
-        app: FastAPI = request.app
-        for route in app.routes:
-            if (
-                isinstance(route, APIRoute)
-                and route.path_regex.match(request.url.path)
-                and request.method in route.methods
-            ):
-                data["module"] = ",".join(route.tags)
-                data["summary"] = route.summary
+        app: FastAPI | None = request.scope.get("app")
+        route_info = route_index.match(request.method, request.url.path, app.routes if app else None)
+        if route_info is not None:
+            tags, summary = route_info
+            data["module"] = ",".join(tags)
+            data["summary"] = summary
         # 获取用户信息
         try:
             token = request.headers.get("token")
             user_obj = None
             if token:
-                user_obj: User = await AuthControl.is_authed(token)
+                # 接口鉴权时已解析的用户记录在 request.state 中，此处直接复用
+                user_obj: User = await AuthControl.is_authed(token, request)
             data["user_id"] = user_obj.id if user_obj else 0
             data["username"] = user_obj.username if user_obj else ""
         except Exception:
@@ -132,43 +115,62 @@ class HttpAuditLogMiddleware(BaseHTTPMiddleware):
             data["username"] = ""
         return data
 
-    async def before_request(self, request: Request):
-        pass
-
     async def after_request(
         self,
         request: Request,
-        response: Response,
+        status: int,
         process_time: int,
         request_body: str,
         response_body: str,
     ):
-        if request.method in self.methods:
-            for path in self.exclude_paths:
-                if re.search(path, request.url.path, re.IGNORECASE) is not None:
-                    return
-            data: dict = await self.get_request_log(
-                request=request,
-                response=response,
-                request_body=request_body,
-                response_body=response_body,
-            )
-            data["response_time"] = process_time
-            await AuditLog.create(**data)
-
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        start_time: datetime = datetime.now()
-        await self.before_request(request)
-
-        request, request_body = await self._read_request_body(request)
-        response = await call_next(request)
-
-        if should_skip_response_body(request, response):
-            response_body = ""
-        else:
-            response, response_body = await self._read_response_body(response)
-
-        end_time: datetime = datetime.now()
-        process_time = int((end_time.timestamp() - start_time.timestamp()) * 1000)
-        await self.after_request(request, response, process_time, request_body, response_body)
-        return response
+        data: dict = await self.get_request_log(
+            request=request,
+            status=status,
+            request_body=request_body,
+            response_body=response_body,
+        )
+        data["response_time"] = process_time
+        # 入队后由后台任务批量落库，响应不再等待审计日志写入
+        audit_writer.submit(data)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_audit(scope):
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        # 先建立 state，使下游接口依赖写入的鉴权结果对本中间件可见
+        scope.setdefault("state", {})
+        request = Request(scope)
+        request_capture = None if should_skip_request_body(request) else _BodyCapture()
+        response_capture: _BodyCapture | None = None
+        status: int | None = None
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if request_capture is not None and message["type"] == "http.request":
+                request_capture.feed(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_capture
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if not should_skip_response_body(request, Headers(raw=message.get("headers", []))):
+                    response_capture = _BodyCapture()
+            elif message["type"] == "http.response.body" and response_capture is not None:
+                response_capture.feed(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive_wrapper if request_capture is not None else receive, send_wrapper)
+
+        if status is None:
+            return
+        process_time = int((time.perf_counter() - start_time) * 1000)
+        await self.after_request(
+            request,
+            status,
+            process_time,
+            request_capture.text() if request_capture is not None else "",
+            response_capture.text() if response_capture is not None else "",
+        )
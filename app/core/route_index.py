@@ -0,0 +1,80 @@
+"""
+路由索引 - 审计日志按 (method, path) 解析接口所属模块与描述，避免每个请求遍历全部路由
+"""
+import threading
+from collections import OrderedDict
+
+from fastapi.routing import APIRoute, _IncludedRouter
+
+RouteInfo = tuple[tuple[str, ...], str | None]
+
+
+def iter_effective_routes(routes):
+    """展开 include_router 嵌套，按注册顺序产出带完整路径与合并后 tags 的路由。"""
+    for route in routes:
+        if isinstance(route, _IncludedRouter):
+            yield from route.effective_route_contexts()
+        elif isinstance(route, APIRoute):
+            yield route
+
+
+class RouteIndex:
+    """
+    (method, path) -> (tags, summary) 索引
+
+    - 无路径参数的路由放入字典，精确命中 O(1)
+    - 带参数的路由按方法分组保留正则，匹配结果（含未命中）写入 LRU
+    - 启动时与刷新接口列表时调用 build 重建；未 build 时首次 match 会按传入的 routes 自动构建
+    """
+
+    def __init__(self, lru_size: int = 2048):
+        self.lru_size = lru_size
+        self._static: dict[tuple[str, str], RouteInfo] = {}
+        self._dynamic: dict[str, list[tuple[object, RouteInfo]]] = {}
+        self._lru: OrderedDict[tuple[str, str], RouteInfo | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.built = False
+
+    def build(self, routes):
+        static: dict[tuple[str, str], RouteInfo] = {}
+        dynamic: dict[str, list[tuple[object, RouteInfo]]] = {}
+        for route in iter_effective_routes(routes):
+            info: RouteInfo = (tuple(route.tags or ()), route.summary)
+            is_static = not route.param_convertors
+            for method in route.methods or ():
+                if is_static:
+                    # 与路由分发一致：先注册者优先（含先注册的参数路由已能匹配该路径的情况）
+                    path = route.path_format
+                    if not any(regex.match(path) for regex, _ in dynamic.get(method, ())):
+                        static.setdefault((method, path), info)
+                else:
+                    dynamic.setdefault(method, []).append((route.path_regex, info))
+        with self._lock:
+            self._static, self._dynamic = static, dynamic
+            self._lru = OrderedDict()
+            self.built = True
+
+    def match(self, method: str, path: str, routes=None) -> RouteInfo | None:
+        if not self.built and routes is not None:
+            self.build(routes)
+        key = (method, path)
+        info = self._static.get(key)
+        if info is not None:
+            return info
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+        info = None
+        for path_regex, candidate in self._dynamic.get(method, ()):
+            if path_regex.match(path):
+                info = candidate
+                break
+        with self._lock:
+            self._lru[key] = info
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return info
+
+
+route_index = RouteIndex()
@@ -3,9 +3,14 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from tortoise import Tortoise
 
+from aiagent.log_writer import ai_log_writer
+from aiagent.security.token_usage import token_usage
 from app.core.exceptions import SettingNotFound
 from app.core.init_app import init_app, make_middlewares, register_exceptions, register_routers
+from app.services.audit_writer import audit_writer
+from app.services.cpu_pool import cpu_pool
 from app.services.task_scheduler import scheduler
+from app.utils.password import shutdown_password_pool
 
 try:
     from app.settings.config import settings
@@ -17,8 +22,15 @@ except ImportError:
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     await init_app(app)
+    audit_writer.start()
+    ai_log_writer.start()
     yield
     await scheduler.shutdown()
+    cpu_pool.shutdown()
+    shutdown_password_pool()
+    await audit_writer.stop()
+    await ai_log_writer.stop()
+    await token_usage.stop()
     await Tortoise.close_connections()
 
 
@@ -37,6 +37,11 @@ class ImpTask(BaseModel, TimestampMixin):
     sql_file_size = fields.BigIntField(null=True, description="SQL文件大小(字节)")
     sql_sha256 = fields.CharField(max_length=64, null=True, description="SQL文件SHA256摘要")
 
+    # 生成元数据（列表页直接读取，无需解析SQL文件）
+    temp_table_name = fields.CharField(max_length=64, null=True, description="临时表名", index=True)
+    row_count = fields.BigIntField(null=True, description="数据行数")
+    columns_meta = fields.JSONField(null=True, description="列信息[{column, field, type}]")
+
     # 执行信息
     execute_status = fields.CharField(
         max_length=20,
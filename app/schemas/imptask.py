@@ -19,6 +19,7 @@ class ImpTaskOut(BaseModel):
     target_conn_id: int | None = None
     target_conn_name: str | None = None
     temp_table_name: str | None = None
+    row_count: int | None = None
     status: str
     progress: int
     message: str | None = None
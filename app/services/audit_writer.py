@@ -0,0 +1,209 @@
+"""
+审计类日志异步批量写入 - 请求路径只入队，由后台任务攒批 bulk_create 落库
+"""
+import asyncio
+import contextlib
+from typing import Any
+
+from tortoise import timezone
+from tortoise.models import Model
+
+from app.log import logger
+from app.models.admin import AuditLog
+from app.settings.config import settings
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEW = "drop_new"
+
+
+class AuditLogWriter:
+    """
+    有界内存队列 + 后台批量写入
+
+    - submit 为同步非阻塞调用，不等待数据库；首次提交时自动启动后台任务
+    - put 为 submit 的异步版本，供协程中的生产者使用：队列满时最多等待 put_timeout 秒，
+      超时只丢弃当前记录（不挤掉队列中已有的记录）；keep=True 的记录一直等到入队，不会丢弃
+    - 后台任务攒满 batch_size 条或距本批第一条超过 flush_interval_ms 即 bulk_create 一次
+    - 队列满时按 overflow 策略丢弃（drop_oldest 丢最早一条，drop_new 丢当前记录）并计数
+    - stop 会等待正在写入的批次完成，并把队列剩余记录全部落库
+    - 同一个写入器可承载多张日志表（submit 时指定 model，默认 AuditLog），写入时按表分组
+    """
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        flush_interval_ms: int | None = None,
+        max_queue: int | None = None,
+        overflow: str | None = None,
+        name: str = "审计日志",
+        time_field: str = "created_at",
+        put_timeout: float = 0,
+        shutdown_timeout: float | None = None,
+    ):
+        self.batch_size = batch_size if batch_size is not None else settings.AUDIT_LOG_BATCH_SIZE
+        self.flush_interval_ms = (
+            flush_interval_ms if flush_interval_ms is not None else settings.AUDIT_LOG_FLUSH_INTERVAL_MS
+        )
+        self.max_queue = max_queue if max_queue is not None else settings.AUDIT_LOG_MAX_QUEUE
+        self.overflow = overflow if overflow is not None else settings.AUDIT_LOG_OVERFLOW
+        self.put_timeout = put_timeout
+        self.shutdown_timeout = (
+            shutdown_timeout if shutdown_timeout is not None else settings.AUDIT_LOG_SHUTDOWN_TIMEOUT
+        )
+        self.name = name
+        # 入队时写入的时间字段，记录产生时间而非落库时间
+        self.time_field = time_field
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._writing: asyncio.Task | None = None
+        # 已出队但尚未写入的记录，后台任务被取消时由 stop 补写
+        self._batch: list[tuple[type[Model], dict[str, Any]]] = []
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        # 队列绑定当前事件循环，重新启动（如测试中多次 asyncio.run）时重建
+        if self._loop is not loop:
+            pending = self._drain_queue()
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._loop = loop
+            for data in pending:
+                self._queue.put_nowait(data)
+        self._task = loop.create_task(self._run(), name=f"log-writer-{self.name}")
+
+    def submit(self, data: dict[str, Any], model: type[Model] | None = None) -> bool:
+        """提交一条日志，返回是否入队"""
+        if not self.running:
+            self.start()
+        data.setdefault(self.time_field, timezone.now())
+        if self._queue.full():
+            self.dropped += 1
+            if self.overflow == OVERFLOW_DROP_NEW:
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(f"[{self.name}] 队列已满({self.max_queue})，丢弃新记录，累计丢弃 {self.dropped} 条")
+                return False
+            self._queue.get_nowait()
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"[{self.name}] 队列已满({self.max_queue})，丢弃最早记录，累计丢弃 {self.dropped} 条")
+        self._queue.put_nowait((model or AuditLog, data))
+        self.enqueued += 1
+        return True
+
+    async def put(self, data: dict[str, Any], model: type[Model] | None = None, keep: bool = False) -> bool:
+        """异步提交一条日志，返回是否入队；keep=True 时等待到入队为止"""
+        if not self.running:
+            self.start()
+        data.setdefault(self.time_field, timezone.now())
+        item = (model or AuditLog, data)
+        try:
+            if keep:
+                await self._queue.put(item)
+            else:
+                async with asyncio.timeout(self.put_timeout):
+                    await self._queue.put(item)
+        except TimeoutError:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(
+                    f"[{self.name}] 队列已满({self.max_queue})且等待 {self.put_timeout}s 超时，"
+                    f"丢弃新记录，累计丢弃 {self.dropped} 条"
+                )
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = self.flush_interval_ms / 1000
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + interval
+            while len(self._batch) < self.batch_size:
+                # 队列中已有的记录直接取走，不再等待
+                if not self._queue.empty():
+                    self._batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            # 写入放在独立任务中并屏蔽取消，关闭时不会中断进行中的 INSERT
+            self._writing = loop.create_task(self._write(batch))
+            await asyncio.shield(self._writing)
+
+    async def _write(self, batch: list[tuple[type[Model], dict[str, Any]]]):
+        grouped: dict[type[Model], list[dict[str, Any]]] = {}
+        for model, data in batch:
+            grouped.setdefault(model, []).append(data)
+        for model, rows in grouped.items():
+            try:
+                await model.bulk_create([model(**data) for data in rows])
+                self.written += len(rows)
+            except Exception as e:
+                self.failed += len(rows)
+                logger.error(f"[{self.name}] 批量写入失败，丢弃 {len(rows)} 条: {e}")
+        self.batches += 1
+
+    def _drain_queue(self) -> list[tuple[type[Model], dict[str, Any]]]:
+        items: list[tuple[type[Model], dict[str, Any]]] = []
+        while self._queue is not None and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def flush(self):
+        """立即写入已出队与队列中的全部记录（仅在后台任务停止后调用）"""
+        pending, self._batch = self._batch + self._drain_queue(), []
+        for start in range(0, len(pending), self.batch_size):
+            await self._write(pending[start:start + self.batch_size])
+
+    async def stop(self, timeout: float | None = None):
+        """停止后台任务并将剩余记录落库"""
+        timeout = self.shutdown_timeout if timeout is None else timeout
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        try:
+            async with asyncio.timeout(timeout):
+                if self._writing is not None and not self._writing.done():
+                    await self._writing
+                await self.flush()
+        except TimeoutError:
+            remaining = len(self._batch) + (self._queue.qsize() if self._queue else 0)
+            logger.error(f"[{self.name}] 关闭时写入超时，未落库 {remaining} 条")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval_ms,
+            "overflow": self.overflow,
+            "put_timeout": self.put_timeout,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+audit_writer = AuditLogWriter()
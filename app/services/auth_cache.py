@@ -0,0 +1,118 @@
+"""
+登录身份与权限缓存 - token 解码后按用户ID读取用户信息、按角色预编译可访问接口集合，
+鉴权不再逐请求查询 user/role/menu_api 表
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.models.admin import Api, MenuApi, Role, User
+from app.services.cache_version import SharedVersion
+from app.settings.config import settings
+from app.utils.cache import AsyncTTLCache, model_from_row
+
+# 用户信息、角色绑定变更时 bump，其他 Worker 在 version_check_seconds 内感知
+auth_version = SharedVersion("auth", check_interval=settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
+
+# 角色的菜单、菜单-API关系、API表变更时 bump
+permission_version = SharedVersion("permission", check_interval=settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
+
+_user_cache = AsyncTTLCache(
+    "auth_user",
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+    ttl=settings.AUTH_CACHE_USER_TTL_SECONDS,
+)
+_user_roles_cache = AsyncTTLCache(
+    "auth_user_roles",
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+    ttl=settings.AUTH_CACHE_USER_TTL_SECONDS,
+)
+_permission_cache = AsyncTTLCache("auth_permission", maxsize=4, ttl=settings.AUTH_CACHE_PERMISSION_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class PermissionMap:
+    """预编译的权限表：角色 -> 菜单ID集合 / (method, path) 集合，以及全部已登记的接口"""
+
+    role_menus: dict[int, frozenset[int]] = field(default_factory=dict)
+    role_apis: dict[int, frozenset[tuple[str, str]]] = field(default_factory=dict)
+    all_apis: frozenset[tuple[str, str]] = frozenset()
+
+    def allows(self, role_ids, method: str, path: str) -> bool:
+        key = (method, path)
+        return any(key in self.role_apis.get(role_id, ()) for role_id in role_ids)
+
+
+async def get_auth_user(user_id: int) -> User | None:
+    """
+    按用户ID获取用户（缓存字段值，每次返回新的模型实例，请求间不共享可变对象）
+
+    缓存键包含当前版本号：失效后旧版本条目不再命中，也不会被失效前发起的加载写回
+    """
+    if settings.AUTH_CACHE_USER_TTL_SECONDS <= 0:
+        return await User.filter(id=user_id).first()
+
+    user_id = int(user_id)
+
+    async def load() -> dict[str, Any] | None:
+        return await User.filter(id=user_id).first().values()
+
+    row = await _user_cache.get_or_load((user_id, await auth_version.current()), load)
+    return model_from_row(User, row) if row else None
+
+
+async def get_user_role_ids(user_id: int) -> tuple[int, ...]:
+    """用户绑定的角色ID（随身份缓存一起按 auth 版本失效）"""
+
+    async def load() -> tuple[int, ...]:
+        return tuple(await Role.filter(user_roles__id=user_id).values_list("id", flat=True))
+
+    if settings.AUTH_CACHE_USER_TTL_SECONDS <= 0:
+        return await load()
+    return await _user_roles_cache.get_or_load((int(user_id), await auth_version.current()), load)
+
+
+async def _load_permission_map() -> PermissionMap:
+    role_menus: dict[int, set[int]] = {}
+    for role_id, menu_id in await Role.all().values_list("id", "menus__id"):
+        menus = role_menus.setdefault(role_id, set())
+        if menu_id is not None:
+            menus.add(menu_id)
+
+    menu_apis: dict[int, set[tuple[str, str]]] = {}
+    for menu_id, method, path in await MenuApi.all().values_list("menu_id", "api__method", "api__path"):
+        if path is not None:
+            menu_apis.setdefault(menu_id, set()).add((str(method), path))
+
+    all_apis = frozenset((str(method), path) for method, path in await Api.all().values_list("method", "path"))
+    return PermissionMap(
+        role_menus={role_id: frozenset(menus) for role_id, menus in role_menus.items()},
+        role_apis={
+            role_id: frozenset(api for menu_id in menus for api in menu_apis.get(menu_id, ()))
+            for role_id, menus in role_menus.items()
+        },
+        all_apis=all_apis,
+    )
+
+
+async def get_permission_map() -> PermissionMap:
+    """全部角色的权限表整体加载（3 次查询），按 permission 版本号与 TTL 失效"""
+    if settings.AUTH_CACHE_PERMISSION_TTL_SECONDS <= 0:
+        return await _load_permission_map()
+    return await _permission_cache.get_or_load(await permission_version.current(), _load_permission_map)
+
+
+async def invalidate_auth_cache():
+    """用户信息、密码或角色绑定变更后调用"""
+    _user_cache.clear()
+    _user_roles_cache.clear()
+    await auth_version.bump()
+
+
+async def invalidate_permission_cache():
+    """角色菜单、菜单-API关系或API表变更后调用"""
+    _permission_cache.clear()
+    await permission_version.bump()
+
+
+def auth_cache_stats() -> list[dict[str, Any]]:
+    return [_user_cache.stats(), _user_roles_cache.stats(), _permission_cache.stats()]
@@ -0,0 +1,50 @@
+"""
+跨进程缓存版本号 - 数据变更时 bump，各 Worker 发现版本变化后丢弃本地缓存
+"""
+import time
+import uuid
+
+from app.services.progress_store import ProgressStore
+
+VERSION_TTL = 30 * 24 * 3600
+
+_store = ProgressStore("cache_version", ttl=VERSION_TTL)
+
+
+class SharedVersion:
+    """
+    共享版本号（借用进度存储：Redis 或文件存储跨 Worker 共享，显式配置 memory 时仅本进程有效）
+
+    - bump 在本进程立即生效，并写入共享存储
+    - current 最多每 check_interval 秒读取一次共享存储，其他 Worker 的变更在该间隔内被感知
+    - 共享存储在线程中读取，不阻塞事件循环；同一间隔内只有一个请求发起读取，其余直接使用本地版本，
+      存储无响应时请求也不会排队等待
+    - 版本号为随机串，只比较是否相等
+    """
+
+    def __init__(self, name: str, check_interval: float = 2.0, store: ProgressStore | None = None):
+        self.name = name
+        self.check_interval = check_interval
+        self._store = store or _store
+        self._version: str | None = None
+        self._checked_at = float("-inf")
+        self._bumps = 0
+
+    async def current(self) -> str | None:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            bumps = self._bumps
+            data = await self._store.aget(self.name)
+            # 读取失败时保留本地版本；读取期间本进程 bump 过则以 bump 的版本为准
+            if data and bumps == self._bumps:
+                self._version = data.get("v")
+        return self._version
+
+    async def bump(self) -> str:
+        version = uuid.uuid4().hex
+        self._bumps += 1
+        self._version = version
+        self._checked_at = time.monotonic()
+        await self._store.aupdate(self.name, v=version)
+        return version
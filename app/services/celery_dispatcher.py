@@ -106,6 +106,14 @@ def dispatch_simtrans_sync(receipt_numbers_text: str) -> str | None:
     return _safe_delay("dbadmin.simtrans.sync", sync_simtrans_task, receipt_numbers_text)
 
 
+def dispatch_fcc_relation(task_id: str, relations: list[dict]) -> str | None:
+    if not settings.CELERY_ENABLED or not _has_active_worker():
+        return None
+    from app.tasks.celery_tasks import execute_fcc_relation_task
+
+    return _safe_delay("dbadmin.fcc.relation", execute_fcc_relation_task, task_id, relations)
+
+
 def revoke_celery_task(task_id: str, terminate: bool = True) -> bool:
     if not task_id:
         return False
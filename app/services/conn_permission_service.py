@@ -2,9 +2,23 @@ from fastapi import HTTPException
 from tortoise.expressions import Q
 
 from app.models.admin import User
+from app.services import auth_cache
+from app.services.cache_version import SharedVersion
+from app.settings.config import settings
+from app.utils.cache import AsyncTTLCache
 
 ADMIN_ROLE_NAMES = {"admin", "管理员"}
 
+# 用户连接授权变更时 bump；角色绑定/角色名称变更沿用 auth 版本号
+conn_permission_version = SharedVersion("conn_permission", check_interval=settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
+
+# 缓存值为 (是否管理员, 授权连接ID集合)
+_authz_cache = AsyncTTLCache(
+    "conn_permission",
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+    ttl=settings.AUTH_CACHE_USER_TTL_SECONDS,
+)
+
 
 async def is_admin_user(user: User) -> bool:
     if not user:
@@ -15,11 +29,34 @@ async def is_admin_user(user: User) -> bool:
     return any((name or "").strip().lower() == "admin" or name in ADMIN_ROLE_NAMES for name in role_names)
 
 
-async def get_authorized_conn_ids(user: User):
+async def _load_authorization(user: User) -> tuple[bool, frozenset[int]]:
     if await is_admin_user(user):
-        return None
+        return True, frozenset()
     conn_ids = await user.conn_permissions.all().values_list("id", flat=True)
-    return set(int(conn_id) for conn_id in conn_ids)
+    return False, frozenset(int(conn_id) for conn_id in conn_ids)
+
+
+async def get_authorized_conn_ids(user: User):
+    """返回用户可访问的连接ID集合，管理员返回 None（不限制）"""
+    if user and user.is_superuser:
+        return None
+    # 同一请求内的 user 对象只解析一次
+    authz = getattr(user, "_conn_authz", None)
+    if authz is None:
+        if settings.AUTH_CACHE_USER_TTL_SECONDS <= 0:
+            authz = await _load_authorization(user)
+        else:
+            key = (user.id, await auth_cache.auth_version.current(), await conn_permission_version.current())
+            authz = await _authz_cache.get_or_load(key, lambda: _load_authorization(user))
+        user._conn_authz = authz
+    is_admin, conn_ids = authz
+    return None if is_admin else set(conn_ids)
+
+
+async def invalidate_conn_permission_cache():
+    """用户连接授权变更后调用"""
+    _authz_cache.clear()
+    await conn_permission_version.bump()
 
 
 async def apply_conn_permission_filter(search_q: Q, user: User) -> Q:
@@ -0,0 +1,99 @@
+"""
+CPU密集任务进程池 - 将Excel解析、SQL生成等同步重计算移出事件循环
+"""
+import asyncio
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from app.log import logger
+from app.settings.config import settings
+
+
+class CpuPoolBusyError(Exception):
+    """进程池繁忙且排队已满时抛出的异常。"""
+
+
+class CpuTaskPool:
+    """
+    有界进程池
+
+    - 同时在途任务数上限为 max_workers + max_queue，超出时立即抛出 CpuPoolBusyError，避免请求无限堆积
+    - max_workers 为 0 时退化为 asyncio.to_thread 执行（仍受排队上限约束）
+    - 子进程异常退出（如OOM被杀）后自动重建进程池
+    """
+
+    def __init__(self, max_workers: int | None = None, max_queue: int | None = None):
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers if self._max_workers is not None else settings.CPU_POOL_MAX_WORKERS
+
+    @property
+    def max_queue(self) -> int:
+        return self._max_queue if self._max_queue is not None else settings.CPU_POOL_MAX_QUEUE
+
+    @property
+    def capacity(self) -> int:
+        return max(self.max_workers, 1) + max(self.max_queue, 0)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn 避免复制事件循环、数据库连接池等父进程状态
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """在进程池中执行可pickle的模块级函数并等待结果。"""
+        if self._inflight >= self.capacity:
+            raise CpuPoolBusyError("服务器繁忙，请稍后重试")
+
+        self._inflight += 1
+        try:
+            if self.max_workers <= 0:
+                return await asyncio.to_thread(func, *args)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+            except BrokenProcessPool:
+                logger.error(f"[进程池] 子进程异常退出，重建进程池: func={getattr(func, '__name__', func)}")
+                self._reset_executor()
+                raise
+        finally:
+            self._inflight -= 1
+
+    def shutdown(self):
+        self._reset_executor()
+
+
+cpu_pool = CpuTaskPool()
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args) -> Any:
+    """在共享进程池中执行CPU密集函数。"""
+    return await cpu_pool.run(func, *args)
@@ -4,11 +4,25 @@ import logging
 
 from app.services.db_pool import db_pool
 from app.settings.config import settings
+from app.utils.batch_lookup import resolve_in_batches
 
 logger = logging.getLogger(__name__)
 
 _ehcf_conn_id = None
 
+# 单条 CASE 批量更新语句携带的最大行数
+UPDATE_CASE_CHUNK = 500
+
+# 单次取号语句派生表的最大行数
+ALLOCATE_CHUNK = 500
+
+# 需要重新编号的明细表及其明细编号字段
+DETAIL_TABLES = (
+    ("tb_workgoodsdetail", "OrderDetailId"),
+    ("tb_workgoodsdetail_other", "OrderDetailId"),
+    ("tb_workfixitemdetail", "NewOrderDetailId"),
+)
+
 
 async def _get_conn_id():
     global _ehcf_conn_id
@@ -17,6 +31,85 @@ async def _get_conn_id():
     return _ehcf_conn_id
 
 
+async def _allocate_sequence(cur, exprs: Tuple[str, ...], n: int) -> List[Tuple[str, ...]]:
+    """按 ALLOCATE_CHUNK 分块预留 n 组序列值
+
+    对一个派生表逐行求值序列函数，每行返回一组新值；
+    首列为空或任一列出现重复值（序列函数未按行求值）视为取号失败，抛出 ValueError。
+    """
+    values: List[Tuple[str, ...]] = []
+    for start in range(0, n, ALLOCATE_CHUNK):
+        rows_sql = " UNION ALL ".join(["SELECT 1"] * min(ALLOCATE_CHUNK, n - start))
+        await cur.execute(f"SELECT {', '.join(exprs)} FROM ({rows_sql}) AS seq")
+        rows = await cur.fetchall()
+        values.extend(tuple(str(v) if v else "" for v in row) for row in rows)
+    if len(values) != n or not all(row[0] for row in values):
+        raise ValueError(f"预留序列值失败: 期望 {n} 个，实际 {len([r for r in values if r[0]])} 个")
+    for i, expr in enumerate(exprs):
+        distinct = len({row[i] for row in values})
+        if distinct != n:
+            raise ValueError(f"预留序列值失败: {expr} 期望 {n} 个不同值，实际 {distinct} 个")
+    return values
+
+
+async def _update_by_case(
+    cur,
+    table: str,
+    key_expr: str,
+    set_cols: Tuple[str, ...],
+    mapping: Dict[str, Tuple[str, ...]],
+    where_sql: str,
+    where_args: tuple = (),
+) -> None:
+    """按 key 分块执行 UPDATE ... SET col = CASE key WHEN ... END
+
+    mapping 为 key -> 与 set_cols 对齐的新值。MySQL 单表 UPDATE 按从左到右的顺序赋值，
+    若 key 列本身也要更新，须放在 set_cols 最后。
+    """
+    items = list(mapping.items())
+    for start in range(0, len(items), UPDATE_CASE_CHUNK):
+        chunk = items[start:start + UPDATE_CASE_CHUNK]
+        whens = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        clauses = []
+        args: list = []
+        for i, col in enumerate(set_cols):
+            clauses.append(f"{col} = CASE {key_expr} {whens} ELSE {col} END")
+            for key, values in chunk:
+                args.extend((key, values[i]))
+        keys = [key for key, _ in chunk]
+        placeholders = ", ".join(["%s"] * len(keys))
+        await cur.execute(
+            f"UPDATE {table} SET {', '.join(clauses)} WHERE {where_sql} AND {key_expr} IN ({placeholders})",
+            (*args, *where_args, *keys),
+        )
+
+
+async def _select_detail_rows(cur, workorder_id: str) -> List[Dict]:
+    """收集工单下三张明细表的明细行"""
+    all_rows = []
+    for table, detail_field in DETAIL_TABLES:
+        await cur.execute(
+            f"SELECT Id, {detail_field} FROM {table} WHERE WorkOrderId=%s",
+            (workorder_id,),
+        )
+        for row in await cur.fetchall():
+            all_rows.append({
+                "table": table,
+                "detail_field": detail_field,
+                "row_id": row[0],
+                "old_detail_id": str(row[1]) if row[1] else "",
+            })
+    return all_rows
+
+
+async def _write_detail_ids(cur, workorder_id: str, all_rows: List[Dict], mapping: Dict[str, str]) -> None:
+    """按表批量回写明细编号，mapping 为 原明细编号 -> 新编号"""
+    for table, detail_field in DETAIL_TABLES:
+        rows = {r["row_id"]: (mapping[r["old_detail_id"]],) for r in all_rows if r["table"] == table}
+        if rows:
+            await _update_by_case(cur, table, "Id", (detail_field,), rows, "WorkOrderId=%s", (workorder_id,))
+
+
 class EhcfService:
     """壹好车服业务服务"""
 
@@ -121,7 +214,10 @@ class EhcfService:
         }
 
     async def fix_order_detail_ids(self, workorder_id: str) -> Dict:
-        """修复订单明细Id（按原始值分组，每个不同原始值生成一个新的OE编号）"""
+        """修复订单明细Id（按原始值分组，每个不同原始值生成一个新的OE编号）
+
+        一次往返预留全部 OE 编号，每张表一条 CASE 批量更新，整体在同一事务内完成。
+        """
         await self._ensure_pool()
         pool = db_pool.get_pool(await _get_conn_id())
         if pool is None:
@@ -132,59 +228,32 @@ class EhcfService:
         if isinstance(pool, aiomysql.Pool):
             async with pool.acquire() as conn:
                 async with conn.cursor() as cur:
-                    # 处理三张表
-                    tables = [
-                        ("tb_workgoodsdetail", "WorkOrderId"),
-                        ("tb_workgoodsdetail_other", "WorkOrderId"),
-                        ("tb_workfixitemdetail", "WorkOrderId"),
-                    ]
-
-                    # 收集所有明细行，按原始 OrderDetailId 分组
-                    all_rows = []
-                    for table, where_col in tables:
-                        detail_field = "NewOrderDetailId" if table == "tb_workfixitemdetail" else "OrderDetailId"
-                        await cur.execute(
-                            f"SELECT Id, {detail_field} FROM {table} WHERE {where_col}=%s",
-                            (workorder_id,),
-                        )
-                        for row in await cur.fetchall():
-                            all_rows.append({
-                                "table": table,
-                                "detail_field": detail_field,
-                                "row_id": row[0],
-                                "old_detail_id": str(row[1]) if row[1] else "",
-                            })
-
-                    # 按原始 OrderDetailId 去重，为每个不同值生成新的 OE 编号
-                    unique_old_ids = list({r["old_detail_id"] for r in all_rows})
-                    oe_mapping = {}
-                    for old_id in unique_old_ids:
-                        await cur.execute("SELECT fn_nextval('OE');")
-                        oe_row = await cur.fetchone()
-                        new_id = str(oe_row[0]) if oe_row else ""
-                        if not new_id:
-                            return {"success": False, "message": "生成OE编号失败"}
-                        oe_mapping[old_id] = new_id
-
-                    # 更新所有明细行
-                    for r in all_rows:
-                        new_oe_id = oe_mapping[r["old_detail_id"]]
+                    await conn.begin()
+                    try:
+                        # 收集所有明细行，按原始 OrderDetailId 去重后批量预留 OE 编号
+                        all_rows = await _select_detail_rows(cur, workorder_id)
+                        unique_old_ids = list({r["old_detail_id"] for r in all_rows})
                         try:
-                            await cur.execute(
-                                f"UPDATE {r['table']} SET {r['detail_field']}=%s WHERE Id=%s",
-                                (new_oe_id, r["row_id"]),
-                            )
+                            allocated = await _allocate_sequence(cur, ("fn_nextval('OE')",), len(unique_old_ids))
+                        except ValueError as e:
+                            logger.error(f"工单 {workorder_id} 生成OE编号失败: {e}")
+                            await conn.rollback()
+                            return {"success": False, "message": "生成OE编号失败"}
+                        oe_mapping = {old_id: values[0] for old_id, values in zip(unique_old_ids, allocated)}
+
+                        await _write_detail_ids(cur, workorder_id, all_rows, oe_mapping)
+                        await conn.commit()
+                    except Exception as e:
+                        await conn.rollback()
+                        logger.error(f"工单 {workorder_id} 修复明细Id失败: {e}")
+                        results["failed"].append({"table": "detail", "id": workorder_id, "error": str(e)})
+                    else:
+                        for r in all_rows:
                             results["updated"].append({
                                 "table": r["table"],
                                 "id": str(r["row_id"]),
                                 "old": r["old_detail_id"],
-                                "new": new_oe_id,
-                            })
-                        except Exception as e:
-                            results["failed"].append({
-                                "table": r["table"],
-                                "id": str(r["row_id"]),
-                                "error": str(e),
+                                "new": oe_mapping[r["old_detail_id"]],
                             })
         else:
             raise ValueError("不支持的连接池类型")
@@ -198,7 +267,10 @@ class EhcfService:
         }
 
     async def regenerate_order_ids(self, workorder_id: str) -> Dict:
-        """重新生成订单Id和明细Id（按原始值分组，每个不同原始值生成一个新值）"""
+        """重新生成订单Id和明细Id（按原始值分组，每个不同原始值生成一个新值）
+
+        OI 编号与订单号分两次往返批量预留，每张表一条 CASE 批量更新，整体在同一事务内完成。
+        """
         await self._ensure_pool()
         pool = db_pool.get_pool(await _get_conn_id())
         if pool is None:
@@ -209,184 +281,114 @@ class EhcfService:
         if isinstance(pool, aiomysql.Pool):
             async with pool.acquire() as conn:
                 async with conn.cursor() as cur:
-                    # 1. 收集所有明细行，按原始 OrderDetailId 分组并生成新值
-                    detail_tables = [
-                        ("tb_workgoodsdetail", "WorkOrderId"),
-                        ("tb_workgoodsdetail_other", "WorkOrderId"),
-                        ("tb_workfixitemdetail", "WorkOrderId"),
-                    ]
-
-                    # 收集所有明细行
-                    all_detail_rows = []
-                    for table, where_col in detail_tables:
-                        detail_field = "NewOrderDetailId" if table == "tb_workfixitemdetail" else "OrderDetailId"
+                    await conn.begin()
+                    try:
+                        # 1. 收集明细行、商品订单、检修商品/项目订单的原始值
+                        all_detail_rows = await _select_detail_rows(cur, workorder_id)
                         await cur.execute(
-                            f"SELECT Id, {detail_field} FROM {table} WHERE {where_col}=%s",
+                            "SELECT MallOrderId, OrderNo FROM tb_workgoodsinfo WHERE WorkOrderId=%s",
                             (workorder_id,),
                         )
-                        for row in await cur.fetchall():
-                            all_detail_rows.append({
-                                "table": table,
-                                "detail_field": detail_field,
-                                "row_id": row[0],
-                                "old_detail_id": str(row[1]) if row[1] else "",
-                            })
-
-                    # 为每个不同的原始 OrderDetailId 生成新的 OI 编号
-                    unique_old_ids = list({r["old_detail_id"] for r in all_detail_rows})
-                    oi_mapping = {}
-                    for old_id in unique_old_ids:
-                        await cur.execute("SELECT fn_nextval('OI');")
-                        oi_row = await cur.fetchone()
-                        new_id = str(oi_row[0]) if oi_row else ""
-                        if not new_id:
-                            return {"success": False, "message": "生成OI编号失败"}
-                        oi_mapping[old_id] = new_id
+                        goodsinfo_rows = await cur.fetchall()
+                        await cur.execute(
+                            "SELECT Id, NewMallOrderId FROM tb_workfixgoodsinfo WHERE WorkOrderId=%s",
+                            (workorder_id,),
+                        )
+                        fixgoods_rows = await cur.fetchall()
+                        await cur.execute(
+                            "SELECT Id, NewMallOrderId FROM tb_workfixiteminfo WHERE WorkOrderId=%s",
+                            (workorder_id,),
+                        )
+                        fixitem_rows = await cur.fetchall()
 
-                    # 更新明细表
-                    for r in all_detail_rows:
-                        new_oi_id = oi_mapping[r["old_detail_id"]]
+                        # 2. 按原始值去重后一次性预留 OI 编号；商品订单同时预留订单号
+                        unique_detail_ids = list({r["old_detail_id"] for r in all_detail_rows})
+                        unique_fix_ids = list({str(row[1]) if row[1] else "" for row in fixgoods_rows})
+                        unique_fixitem_ids = list({str(row[1]) if row[1] else "" for row in fixitem_rows})
+                        unique_mall_ids = list({str(row[0]) if row[0] else "" for row in goodsinfo_rows})
                         try:
-                            await cur.execute(
-                                f"UPDATE {r['table']} SET {r['detail_field']}=%s WHERE Id=%s",
-                                (new_oi_id, r["row_id"]),
+                            oi_values = await _allocate_sequence(
+                                cur,
+                                ("fn_nextval('OI')",),
+                                len(unique_detail_ids) + len(unique_fix_ids) + len(unique_fixitem_ids),
                             )
+                            mall_values = await _allocate_sequence(
+                                cur, ("fn_nextval('OI')", "fn_GetOrderNoByPrefix('')"), len(unique_mall_ids),
+                            )
+                        except ValueError as e:
+                            logger.error(f"工单 {workorder_id} 生成OI编号失败: {e}")
+                            await conn.rollback()
+                            return {"success": False, "message": "生成OI编号失败"}
+                        oi_iter = (values[0] for values in oi_values)
+                        oi_mapping = dict(zip(unique_detail_ids, oi_iter))
+                        fix_oi_mapping = dict(zip(unique_fix_ids, oi_iter))
+                        fixitem_oi_mapping = dict(zip(unique_fixitem_ids, oi_iter))
+                        mall_mapping = dict(zip(unique_mall_ids, mall_values))
+
+                        # 3. 每张表一条批量更新
+                        await _write_detail_ids(cur, workorder_id, all_detail_rows, oi_mapping)
+                        if mall_mapping:
+                            # 以原 MallOrderId 为 CASE 键，OrderNo 须先于 MallOrderId 赋值
+                            await _update_by_case(
+                                cur,
+                                "tb_workgoodsinfo",
+                                "IFNULL(MallOrderId, '')",
+                                ("OrderNo", "MallOrderId"),
+                                {old: (order_no, new_oi) for old, (new_oi, order_no) in mall_mapping.items()},
+                                "WorkOrderId=%s",
+                                (workorder_id,),
+                            )
+                        for table, rows, mapping in (
+                            ("tb_workfixgoodsinfo", fixgoods_rows, fix_oi_mapping),
+                            ("tb_workfixiteminfo", fixitem_rows, fixitem_oi_mapping),
+                        ):
+                            if rows:
+                                await _update_by_case(
+                                    cur,
+                                    table,
+                                    "Id",
+                                    ("NewMallOrderId",),
+                                    {row[0]: (mapping[str(row[1]) if row[1] else ""],) for row in rows},
+                                    "WorkOrderId=%s",
+                                    (workorder_id,),
+                                )
+                        await conn.commit()
+                    except Exception as e:
+                        await conn.rollback()
+                        logger.error(f"工单 {workorder_id} 重新生成订单Id失败: {e}")
+                        results["failed"].append({"table": "order", "id": workorder_id, "error": str(e)})
+                    else:
+                        for r in all_detail_rows:
                             results["updated"].append({
                                 "table": r["table"],
                                 "id": str(r["row_id"]),
                                 "field": "OrderDetailId",
                                 "old": r["old_detail_id"],
-                                "new": new_oi_id,
-                            })
-                        except Exception as e:
-                            results["failed"].append({
-                                "table": r["table"],
-                                "id": str(r["row_id"]),
-                                "error": str(e),
+                                "new": oi_mapping[r["old_detail_id"]],
                             })
-
-                    # 2. 更新 tb_workgoodsinfo 的 MallOrderId 和 OrderNo（按原始值分组）
-                    await cur.execute(
-                        "SELECT MallOrderId, OrderNo FROM tb_workgoodsinfo WHERE WorkOrderId=%s",
-                        (workorder_id,),
-                    )
-                    goodsinfo_rows = await cur.fetchall()
-                    # 收集所有不同的原始 MallOrderId
-                    unique_mall_ids = list({str(row[0]) if row[0] else "" for row in goodsinfo_rows})
-                    mall_oi_mapping = {}
-                    mall_order_no_mapping = {}
-                    for old_mall_id in unique_mall_ids:
-                        await cur.execute("SELECT fn_nextval('OI');")
-                        oi_row = await cur.fetchone()
-                        new_oi_id = str(oi_row[0]) if oi_row else ""
-                        if not new_oi_id:
-                            return {"success": False, "message": "生成OI编号失败"}
-                        mall_oi_mapping[old_mall_id] = new_oi_id
-
-                        await cur.execute("SELECT fn_GetOrderNoByPrefix('');")
-                        on_row = await cur.fetchone()
-                        new_order_no = str(on_row[0]) if on_row else ""
-                        mall_order_no_mapping[old_mall_id] = new_order_no
-
-                    for row in goodsinfo_rows:
-                        old_mall_order_id = str(row[0]) if row[0] else ""
-                        old_order_no = str(row[1]) if row[1] else ""
-                        new_oi_id = mall_oi_mapping[old_mall_order_id]
-                        new_order_no = mall_order_no_mapping[old_mall_order_id]
-                        try:
-                            await cur.execute(
-                                "UPDATE tb_workgoodsinfo SET MallOrderId=%s, OrderNo=%s WHERE WorkOrderId=%s",
-                                (new_oi_id, new_order_no, workorder_id),
-                            )
+                        for row in goodsinfo_rows:
+                            old_mall_order_id = str(row[0]) if row[0] else ""
+                            old_order_no = str(row[1]) if row[1] else ""
+                            new_oi_id, new_order_no = mall_mapping[old_mall_order_id]
                             results["updated"].append({
                                 "table": "tb_workgoodsinfo",
                                 "field": "MallOrderId+OrderNo",
                                 "old": f"{old_mall_order_id} / {old_order_no}",
                                 "new": f"{new_oi_id} / {new_order_no}",
                             })
-                        except Exception as e:
-                            results["failed"].append({
-                                "table": "tb_workgoodsinfo",
-                                "error": str(e),
-                            })
-
-                    # 3. 更新 tb_workfixgoodsinfo 的 NewMallOrderId（按原始值分组）
-                    await cur.execute(
-                        "SELECT Id, NewMallOrderId FROM tb_workfixgoodsinfo WHERE WorkOrderId=%s",
-                        (workorder_id,),
-                    )
-                    fixgoods_rows = await cur.fetchall()
-                    unique_fix_ids = list({str(row[1]) if row[1] else "" for row in fixgoods_rows})
-                    fix_oi_mapping = {}
-                    for old_id in unique_fix_ids:
-                        await cur.execute("SELECT fn_nextval('OI');")
-                        oi_row = await cur.fetchone()
-                        new_oi_id = str(oi_row[0]) if oi_row else ""
-                        if not new_oi_id:
-                            return {"success": False, "message": "生成OI编号失败"}
-                        fix_oi_mapping[old_id] = new_oi_id
-
-                    for row in fixgoods_rows:
-                        row_id = row[0]
-                        old_val = str(row[1]) if row[1] else ""
-                        new_oi_id = fix_oi_mapping[old_val]
-                        try:
-                            await cur.execute(
-                                "UPDATE tb_workfixgoodsinfo SET NewMallOrderId=%s WHERE Id=%s",
-                                (new_oi_id, row_id),
-                            )
-                            results["updated"].append({
-                                "table": "tb_workfixgoodsinfo",
-                                "id": str(row_id),
-                                "field": "NewMallOrderId",
-                                "old": old_val,
-                                "new": new_oi_id,
-                            })
-                        except Exception as e:
-                            results["failed"].append({
-                                "table": "tb_workfixgoodsinfo",
-                                "id": str(row_id),
-                                "error": str(e),
-                            })
-
-                    # 4. 更新 tb_workfixiteminfo 的 NewMallOrderId（按原始值分组）
-                    await cur.execute(
-                        "SELECT Id, NewMallOrderId FROM tb_workfixiteminfo WHERE WorkOrderId=%s",
-                        (workorder_id,),
-                    )
-                    fixitem_rows = await cur.fetchall()
-                    unique_fixitem_ids = list({str(row[1]) if row[1] else "" for row in fixitem_rows})
-                    fixitem_oi_mapping = {}
-                    for old_id in unique_fixitem_ids:
-                        await cur.execute("SELECT fn_nextval('OI');")
-                        oi_row = await cur.fetchone()
-                        new_oi_id = str(oi_row[0]) if oi_row else ""
-                        if not new_oi_id:
-                            return {"success": False, "message": "生成OI编号失败"}
-                        fixitem_oi_mapping[old_id] = new_oi_id
-
-                    for row in fixitem_rows:
-                        row_id = row[0]
-                        old_val = str(row[1]) if row[1] else ""
-                        new_oi_id = fixitem_oi_mapping[old_val]
-                        try:
-                            await cur.execute(
-                                "UPDATE tb_workfixiteminfo SET NewMallOrderId=%s WHERE Id=%s",
-                                (new_oi_id, row_id),
-                            )
-                            results["updated"].append({
-                                "table": "tb_workfixiteminfo",
-                                "id": str(row_id),
-                                "field": "NewMallOrderId",
-                                "old": old_val,
-                                "new": new_oi_id,
-                            })
-                        except Exception as e:
-                            results["failed"].append({
-                                "table": "tb_workfixiteminfo",
-                                "id": str(row_id),
-                                "error": str(e),
-                            })
+                        for table, rows, mapping in (
+                            ("tb_workfixgoodsinfo", fixgoods_rows, fix_oi_mapping),
+                            ("tb_workfixiteminfo", fixitem_rows, fixitem_oi_mapping),
+                        ):
+                            for row in rows:
+                                old_val = str(row[1]) if row[1] else ""
+                                results["updated"].append({
+                                    "table": table,
+                                    "id": str(row[0]),
+                                    "field": "NewMallOrderId",
+                                    "old": old_val,
+                                    "new": mapping[old_val],
+                                })
         else:
             raise ValueError("不支持的连接池类型")
 
@@ -399,7 +401,7 @@ class EhcfService:
         }
 
     async def query_workorder_status(self, workorder_nos: list[str]) -> dict:
-        """查询工单状态信息"""
+        """查询工单状态信息（按 IN 列表分块批量查询，结果按输入顺序归并）"""
         await self._ensure_pool()
         pool = db_pool.get_pool(await _get_conn_id())
         if pool is None:
@@ -411,31 +413,33 @@ class EhcfService:
         if isinstance(pool, aiomysql.Pool):
             async with pool.acquire() as conn:
                 async with conn.cursor() as cur:
-                    for wo in workorder_nos:
-                        await cur.execute(
-                            """SELECT a.Id, a.AppCode, a.Deleted, a.DeletedAt, a.DeletedById,
-                                      a.WorkStatus, a.CustomerName, a.OrderType,
-                                      fn_GetOrderTypeByCode(a.OrderType) AS OrderTypeName
-                               FROM tb_workorderinfo a
-                               WHERE (a.Id=%s OR a.AppCode=%s)""",
-                            (wo, wo),
-                        )
-                        rows = await cur.fetchall()
-                        if not rows:
-                            not_found_docs.append(wo)
-                            continue
-                        for row in rows:
-                            found_docs.append({
-                                "id": str(row[0]) if row[0] else "",
-                                "app_code": str(row[1]) if row[1] else "",
-                                "deleted": row[2],
-                                "deleted_at": str(row[3]) if row[3] else "",
-                                "deleted_by_id": str(row[4]) if row[4] else "",
-                                "work_status": row[5] if row[5] is not None else "",
-                                "customer_name": str(row[6]) if row[6] else "",
-                                "order_type": str(row[7]) if row[7] else "",
-                                "order_type_name": str(row[8]) if row[8] else "",
-                            })
+                    matches = await resolve_in_batches(
+                        cur,
+                        """SELECT a.Id, a.AppCode, a.Deleted, a.DeletedAt, a.DeletedById,
+                                  a.WorkStatus, a.CustomerName, a.OrderType,
+                                  fn_GetOrderTypeByCode(a.OrderType) AS OrderTypeName
+                           FROM tb_workorderinfo a
+                           WHERE a.Id IN ({placeholders}) OR a.AppCode IN ({placeholders})""",
+                        workorder_nos,
+                        lambda row: (row[0], row[1]),
+                    )
+            for wo in workorder_nos:
+                rows = matches.get(wo)
+                if not rows:
+                    not_found_docs.append(wo)
+                    continue
+                for row in rows:
+                    found_docs.append({
+                        "id": str(row[0]) if row[0] else "",
+                        "app_code": str(row[1]) if row[1] else "",
+                        "deleted": row[2],
+                        "deleted_at": str(row[3]) if row[3] else "",
+                        "deleted_by_id": str(row[4]) if row[4] else "",
+                        "work_status": row[5] if row[5] is not None else "",
+                        "customer_name": str(row[6]) if row[6] else "",
+                        "order_type": str(row[7]) if row[7] else "",
+                        "order_type_name": str(row[8]) if row[8] else "",
+                    })
         else:
             raise ValueError("不支持的连接池类型")
 
@@ -565,7 +569,7 @@ class EhcfService:
         return success, failed
 
     async def fetch_workorder_ids_by_nos(self, workorder_nos: list[str]) -> dict:
-        """根据工单编码或Id获取对应的Id（同一编码可能对应多条工单，如加装/检修）"""
+        """根据工单编码或Id获取对应的Id（同一编码可能对应多条工单，如加装/检修；按 IN 列表分块批量查询）"""
         await self._ensure_pool()
         pool = db_pool.get_pool(await _get_conn_id())
         if pool is None:
@@ -577,29 +581,31 @@ class EhcfService:
         if isinstance(pool, aiomysql.Pool):
             async with pool.acquire() as conn:
                 async with conn.cursor() as cur:
-                    for wo in workorder_nos:
-                        await cur.execute(
-                            """SELECT a.Id, a.AppCode, a.OrderType, a.Deleted,
-                                      fn_GetOrderTypeByCode(a.OrderType) AS OrderTypeName,
-                                      a.DeletedById
-                               FROM tb_workorderinfo a
-                               WHERE (a.Id=%s OR a.AppCode=%s)""",
-                            (wo, wo),
-                        )
-                        rows = await cur.fetchall()
-                        if not rows:
-                            not_found_docs.append(wo)
-                            continue
-                        for row in rows:
-                            found_docs.append({
-                                "workorder_id": str(row[0]),
-                                "app_code": str(row[1]) if row[1] else "",
-                                "order_type": str(row[2]) if row[2] else "",
-                                "deleted": row[3],
-                                "order_type_name": str(row[4]) if row[4] else "",
-                                "deleted_by_id": str(row[5]) if row[5] else "",
-                                "input": wo,
-                            })
+                    matches = await resolve_in_batches(
+                        cur,
+                        """SELECT a.Id, a.AppCode, a.OrderType, a.Deleted,
+                                  fn_GetOrderTypeByCode(a.OrderType) AS OrderTypeName,
+                                  a.DeletedById
+                           FROM tb_workorderinfo a
+                           WHERE a.Id IN ({placeholders}) OR a.AppCode IN ({placeholders})""",
+                        workorder_nos,
+                        lambda row: (row[0], row[1]),
+                    )
+            for wo in workorder_nos:
+                rows = matches.get(wo)
+                if not rows:
+                    not_found_docs.append(wo)
+                    continue
+                for row in rows:
+                    found_docs.append({
+                        "workorder_id": str(row[0]),
+                        "app_code": str(row[1]) if row[1] else "",
+                        "order_type": str(row[2]) if row[2] else "",
+                        "deleted": row[3],
+                        "order_type_name": str(row[4]) if row[4] else "",
+                        "deleted_by_id": str(row[5]) if row[5] else "",
+                        "input": wo,
+                    })
         else:
             raise ValueError("不支持的连接池类型")
 
@@ -1,9 +1,10 @@
 """
 Excel导入服务 - 从Excel文件生成SQL语句
 """
+import asyncio
 import hashlib
-import json
 import os
+import re
 import uuid
 from datetime import date, datetime
 from io import BytesIO
@@ -13,51 +14,42 @@ import openpyxl
 from openpyxl.worksheet.worksheet import Worksheet
 from pypinyin import Style, lazy_pinyin
 
+from app.services.cpu_pool import run_cpu_bound
+from app.services.progress_reporter import ThrottledProgressReporter
+from app.services.progress_store import ProgressStore
 from app.services.sql_apply_service import execute_sql_on_connection
 
-# 进度存储
-_PROGRESS: dict[str, dict[str, Any]] = {}
+# 进度存储（Redis可用时跨进程共享，Celery Worker写入的状态Web进程可直接读取）
+_PROGRESS = ProgressStore("excelimp")
 EXCELIMP_TASK_DIR = "data/excelimp_tasks"
 os.makedirs(EXCELIMP_TASK_DIR, exist_ok=True)
 
 
-def _progress_path(stamp: str) -> str:
-    return os.path.join(EXCELIMP_TASK_DIR, f"{stamp}.json")
-
-
 def _sql_path(stamp: str) -> str:
     return os.path.join(EXCELIMP_TASK_DIR, f"{stamp}.sql")
 
 
-def _persist_progress(stamp: str):
-    data = _PROGRESS.get(stamp)
-    if not data:
-        return
-    safe_data = {k: v for k, v in data.items() if k != "sql"}
-    with open(_progress_path(stamp), "w", encoding="utf-8") as f:
-        json.dump(safe_data, f, ensure_ascii=False, default=str)
-
-
-def _progress_start(stamp: str, filename: str):
-    """开始任务"""
-    _PROGRESS[stamp] = {
+def _initial_progress(filename: str) -> dict[str, Any]:
+    return {
         "file": filename,
         "stage": "parsing",
         "total": 0,
         "current": 0,
         "message": "开始解析Excel文件",
         "success": False,
-        "sql": None,
         "sql_file_path": None,
     }
-    _persist_progress(stamp)
+
+
+# 同步版本供线程/Celery 中执行的 generate_sql_file_task 使用，协程中使用下方 async 版本
+def _progress_start(stamp: str, filename: str):
+    """开始任务"""
+    _PROGRESS.start(stamp, _initial_progress(filename))
 
 
 def _progress_update(stamp: str, **kwargs):
     """更新进度"""
-    if stamp in _PROGRESS:
-        _PROGRESS[stamp].update(kwargs)
-        _persist_progress(stamp)
+    _PROGRESS.update(stamp, **kwargs)
 
 
 def _progress_fail(stamp: str, message: str):
@@ -65,38 +57,50 @@ def _progress_fail(stamp: str, message: str):
     _progress_update(stamp, stage="failed", message=message, success=False)
 
 
-def _progress_done(stamp: str, sql: str):
-    """完成"""
+async def _aprogress_update(stamp: str, **kwargs):
+    """更新进度（协程）"""
+    await _PROGRESS.aupdate(stamp, **kwargs)
+
+
+async def _aprogress_fail(stamp: str, message: str):
+    """失败（协程）"""
+    await _aprogress_update(stamp, stage="failed", message=message, success=False)
+
+
+def _write_sql_file(stamp: str, sql: str) -> str:
     sql_file = _sql_path(stamp)
     with open(sql_file, "w", encoding="utf-8") as f:
         f.write(sql)
-    _progress_update(
+    return sql_file
+
+
+async def _aprogress_done(stamp: str, sql: str):
+    """完成（协程）"""
+    sql_file = await asyncio.to_thread(_write_sql_file, stamp, sql)
+    await _aprogress_update(
         stamp,
         stage="done",
         message="SQL生成完成",
         success=True,
-        sql=None,
         sql_file_path=sql_file,
         sql_sha256=hashlib.sha256(sql.encode("utf-8")).hexdigest(),
     )
 
 
-def get_progress(stamp: str) -> dict[str, Any]:
-    """获取进度"""
-    # 每次查询都尝试从磁盘读取最新状态，因为状态可能是其他进程（如Celery Worker）更新的
-    if os.path.exists(_progress_path(stamp)):
-        try:
-            with open(_progress_path(stamp), encoding="utf-8") as f:
-                _PROGRESS[stamp] = json.load(f)
-        except Exception:
-            pass
+async def get_progress(stamp: str) -> dict[str, Any]:
+    """获取进度（不含SQL正文，SQL通过 get_sql_file_path 流式下载）"""
+    return await _PROGRESS.aget(stamp) or {"stage": "", "message": ""}
+
 
-    data = dict(_PROGRESS.get(stamp, {"stage": "", "message": ""}))
+async def get_sql_file_path(stamp: str) -> str | None:
+    """获取已生成完成的SQL文件路径，未完成或文件不存在时返回None"""
+    data = await get_progress(stamp)
+    if data.get("stage") != "done":
+        return None
     sql_file = data.get("sql_file_path") or _sql_path(stamp)
-    if data.get("stage") == "done" and os.path.exists(sql_file):
-        with open(sql_file, encoding="utf-8") as f:
-            data["sql"] = f.read()
-    return data
+    if not os.path.exists(sql_file):
+        return None
+    return sql_file
 
 
 async def submit_and_generate(
@@ -106,27 +110,27 @@ async def submit_and_generate(
     if stamp is None:
         stamp = str(uuid.uuid4())
 
-    _progress_start(stamp, filename)
+    await _PROGRESS.astart(stamp, _initial_progress(filename))
 
     try:
         # 更新进度：解析文件
-        _progress_update(
+        await _aprogress_update(
             stamp, stage="parsing", message="正在解析Excel文件..."
         )
 
         # 生成SQL
-        sql_result = generate_sql(file_bytes, filename, db_type)
+        sql_result = await run_cpu_bound(generate_sql, file_bytes, filename, db_type)
 
         # 更新进度：生成SQL
-        _progress_update(
+        await _aprogress_update(
             stamp, stage="generating", message="正在生成SQL语句..."
         )
 
         # 完成
-        _progress_done(stamp, sql_result)
+        await _aprogress_done(stamp, sql_result)
 
     except Exception as e:
-        _progress_fail(stamp, str(e))
+        await _aprogress_fail(stamp, str(e))
 
     return stamp
 
@@ -137,7 +141,7 @@ def generate_sql_file_task(
     db_type: Literal["mysql", "postgresql"],
     stamp: str,
 ) -> dict[str, Any]:
-    """后台生成Excel临时表SQL，状态和结果均落盘，便于跨进程查询。"""
+    """后台生成Excel临时表SQL，SQL落盘，状态写入共享进度存储，便于跨进程查询。"""
     _progress_start(stamp, filename)
     try:
         _progress_update(stamp, stage="parsing", message="正在解析Excel文件...")
@@ -154,20 +158,19 @@ def generate_sql_file_task(
             row_count=meta.get("row_count"),
             table_name=meta.get("table_name"),
         )
-        return get_progress(stamp)
+        return _PROGRESS.get(stamp) or {"stage": "", "message": ""}
     except Exception as exc:
         _progress_fail(stamp, str(exc))
         raise
 
 
 async def execute_sql_file_task(stamp: str, target_conn_id: int) -> dict[str, Any]:
-    """后台执行Excel临时表SQL，并把执行状态写入同一个进度文件。"""
-    data = get_progress(stamp)
-    sql_file = data.get("sql_file_path") or _sql_path(stamp)
-    if data.get("stage") != "done" or not os.path.exists(sql_file):
+    """后台执行Excel临时表SQL，并把执行状态写入同一条进度记录。"""
+    sql_file = await get_sql_file_path(stamp)
+    if not sql_file:
         raise ValueError("SQL生成任务未完成或SQL文件不存在")
 
-    _progress_update(
+    await _aprogress_update(
         stamp,
         execute_status="processing",
         execute_message="导入执行已进入后台",
@@ -175,8 +178,8 @@ async def execute_sql_file_task(stamp: str, target_conn_id: int) -> dict[str, An
     with open(sql_file, encoding="utf-8") as f:
         sql_text = f.read()
 
-    async def progress_cb(done: int, total: int, _stmt: str):
-        _progress_update(
+    async def report_progress(done: int, total: int):
+        await _aprogress_update(
             stamp,
             execute_status="processing",
             execute_message=f"导入执行中: 已执行 {done}/{total} 条SQL",
@@ -184,17 +187,20 @@ async def execute_sql_file_task(stamp: str, target_conn_id: int) -> dict[str, An
             execute_total=total,
         )
 
+    progress_cb = ThrottledProgressReporter(on_report=report_progress)
     try:
         result = await execute_sql_on_connection(target_conn_id, sql_text, progress_cb=progress_cb)
-        _progress_update(
+        await _aprogress_update(
             stamp,
             execute_status="success",
             execute_message=f"执行成功，共执行 {result['executed_count']} 条语句",
             execute_result=result,
         )
-        return get_progress(stamp)
+        return await get_progress(stamp)
     except Exception as exc:
-        _progress_update(
+        # 节流期间尚未写出的进度先落盘，失败记录中的 execute_done 即中断位置
+        await progress_cb.flush()
+        await _aprogress_update(
             stamp,
             execute_status="failed",
             execute_message=str(exc),
@@ -319,10 +325,67 @@ def generate_sql_file_from_excel(
     return {
         "table_name": table_name,
         "row_count": row_count,
+        "columns_meta": _build_columns_meta(columns, field_names, field_types),
         "sql_sha256": sha.hexdigest(),
     }
 
 
+def _build_columns_meta(
+    columns: list[str | None],
+    field_names: list[str],
+    field_types: list[str],
+) -> list[dict[str, Any]]:
+    return [
+        {"column": column, "field": field, "type": type_}
+        for column, field, type_ in zip(columns, field_names, field_types)
+    ]
+
+
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+TABLE\s+([a-zA-Z0-9_]+)\s*\(", re.IGNORECASE)
+_COLUMN_DEF_RE = re.compile(r"^\s*([a-zA-Z0-9_]+)\s+(.+?),?\s*$")
+SQL_HEADER_MAX_LINES = 5000
+
+
+def read_sql_file_meta(sql_file_path: str) -> dict[str, Any] | None:
+    """
+    从SQL文件头部解析临时表名和列定义（用于历史任务元数据回填）
+
+    只逐行读取到 CREATE TABLE 语句结束为止，不加载整个文件；原始Excel列名无法还原，column 置空。
+    """
+    table_name = None
+    fields: list[tuple[str, str]] = []
+    with open(sql_file_path, encoding="utf-8", errors="ignore") as f:
+        for line_no, line in enumerate(f):
+            if line_no >= SQL_HEADER_MAX_LINES:
+                break
+            if table_name is None:
+                match = _CREATE_TABLE_RE.search(line)
+                if match:
+                    table_name = match.group(1)
+                continue
+            stripped = line.strip()
+            if stripped.startswith(")"):
+                break
+            if stripped.upper().startswith("PRIMARY KEY"):
+                continue
+            match = _COLUMN_DEF_RE.match(line)
+            if match:
+                fields.append((match.group(1), match.group(2)))
+
+    if table_name is None:
+        return None
+    # 第一列为生成的自增主键，不属于Excel数据列
+    data_fields = fields[1:]
+    return {
+        "table_name": table_name,
+        "columns_meta": _build_columns_meta(
+            [None] * len(data_fields),
+            [name for name, _ in data_fields],
+            [type_ for _, type_ in data_fields],
+        ),
+    }
+
+
 def _analyze_excel_file(
     excel_path: str,
     db_type: Literal["mysql", "postgresql"],
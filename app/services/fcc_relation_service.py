@@ -5,15 +5,124 @@ FCC报销单关联服务
 import asyncio
 import logging
 import uuid
+from contextlib import AsyncExitStack
 from datetime import datetime
 
 import aiomysql
 
+from app.services.celery_dispatcher import dispatch_fcc_relation
+from app.services.cpu_pool import run_cpu_bound
 from app.services.db_pool import db_pool
+from app.services.progress_store import ProgressStore
 from app.settings.config import settings
+from app.utils.batch_lookup import chunked, normalize_no, resolve_in_batches
 
 logger = logging.getLogger(__name__)
 
+# 超过该长度的输入文本在进程池中解析
+PARSE_OFFLOAD_THRESHOLD = 256 * 1024
+
+# SQL Server 单条语句最多 2100 个参数，IN 列表按此分块（三表 UNION 时参数×3）
+SQLSERVER_IN_CHUNK = 600
+
+# FCC单存在性：报销单、借款单、还款核销单任一存在即可
+FCC_EXISTS_SQL = """
+    SELECT CodeNumber FROM [dbo].[fms.reimbursement_info] WHERE Deleted=0 AND CodeNumber IN ({placeholders})
+    UNION
+    SELECT CodeNumber FROM [dbo].[fms.Loan_Info] WHERE Deleted=0 AND CodeNumber IN ({placeholders})
+    UNION
+    SELECT CodeNumber FROM [dbo].[fms.LoanRepaymentOrVerification_Info] WHERE Deleted=0 AND CodeNumber IN ({placeholders})
+"""
+
+# 已存在的对应关系：以 VALUES 表值列表承载 (CodeNumber, ReconcNo)
+FCC_EXISTING_RELATIONS_SQL = """
+    SELECT v.CodeNumber, v.ReconcNo
+      FROM (VALUES {values}) AS v(CodeNumber, ReconcNo)
+     WHERE EXISTS (
+           SELECT 1 FROM [dbo].[fms_costdetail_reconcinfo] r
+            WHERE r.CodeNumber = v.CodeNumber AND r.ReconcNo = v.ReconcNo AND r.Deleted = 0)
+"""
+
+# 仓储对账单存在性与是否已付款
+WMS_RECONC_STATUS_SQL = """
+    SELECT ReconcNo, MAX(PayStatus=3) AS Paid
+      FROM tb_reconcinfo
+     WHERE Deleted=0 AND ReconcNo IN ({placeholders})
+     GROUP BY ReconcNo
+"""
+
+# 对应应付单存在非全部对账的仓储对账单
+WMS_NOT_FULL_RECONC_SQL = """
+    SELECT DISTINCT S.ReconcNo FROM (
+        SELECT c.ReconcNo, a.OwingId
+          FROM tb_reconcdetail a
+          JOIN tb_owinginfo b
+            ON b.Id=a.OwingId
+            AND b.Deleted=0
+          JOIN tb_reconcinfo c
+            ON c.Id=a.ReconcId
+            AND c.Deleted=0
+         WHERE a.Deleted=0
+           AND c.ReconcNo IN ({placeholders})
+         GROUP BY c.ReconcNo, a.OwingId, b.StockNum
+        HAVING ABS(SUM(a.ReconcNum))!=b.StockNum
+    ) AS S
+"""
+
+# 关联写入用的会话级临时表：每个连接独立，并发任务与并发关系之间互不干扰
+TMP_RECONC_TABLE = "#tm_wh_reconcinfo"
+
+# 关系候选数据来源：(ApplicationType, FCC单据表)
+RELATION_SOURCES = (
+    (1, "fms.reimbursement_info"),
+    (2, "fms.loan_info"),
+    (3, "fms.LoanRepaymentOrVerification_Info"),
+)
+
+
+# 本关系已写入的仓储对账单（任务重投时判断是否已落库）
+FCC_RELATED_WMS_SQL = """
+    SELECT DISTINCT ReconcNo FROM [dbo].[fms_costdetail_reconcinfo] WITH (UPDLOCK, HOLDLOCK)
+     WHERE CodeNumber=? AND Deleted=0 AND ReconcNo IN ({placeholders})
+"""
+
+
+def _relation_select_sqls(wms_count: int) -> list[str]:
+    """
+    按单据来源构造关系候选数据查询，参数为 FCC单号 + 仓储对账单号列表
+
+    已存在的 (CodeNumber, ReconcNo) 不再返回，重复执行同一关系不会写入重复数据
+    """
+    placeholders_sqlserver = ','.join(['?'] * wms_count)
+    return [
+        f"""
+        SELECT NEWID() AS Id,{application_type} AS ApplicationType,B.Id AS ApplicationId,B.CodeNumber,C.Id AS CostDetailId,
+               A.ReconcId,A.ReconcNo,A.SupplierId,A.SupplierName,
+               D.CompanyId AS OwnerId,
+               D.OwnerId AS WareHouseOwnerId,D.OwnerName,
+               A.ApplyTime,
+               A.ReconcPrice,
+               A.ReconcPrice AS InvoiceSurplusPrice,
+               A.ReconcPrice AS ThisInvoicePrice,
+               (CAST(FORMAT(GETDATE(),'yyyy-MM-dd') AS VARCHAR)+' 手动刷数') AS Remark,
+               A.ReconcPersonCode,A.ReconcPersonName,
+               NULL AS CreatedById,GETDATE() AS CreatedAt,NULL AS UpdatedById,GETDATE() AS UpdatedAt,
+               NULL AS DeletedById,NULL AS DeletedAt,0 AS Deleted,A.ReconcNum
+          FROM {TMP_RECONC_TABLE} A
+          JOIN dbo.[{source_table}] B ON B.CodeNumber=?
+          LEFT JOIN dbo.[fms.costdetail_info] C ON B.Id=C.ReimbursementId AND C.Deleted=0
+          LEFT JOIN dbo.[fms_warehouse_ownerinfo] D ON D.OwnerId=A.OwnerId
+         WHERE A.ReconcNo IN ({placeholders_sqlserver})
+           AND B.Id IS NOT NULL
+           AND NOT EXISTS (
+               SELECT 1 FROM [dbo].[fms_costdetail_reconcinfo] R WITH (UPDLOCK, HOLDLOCK)
+                WHERE R.CodeNumber=B.CodeNumber AND R.ReconcNo=A.ReconcNo AND R.Deleted=0)
+         ORDER BY A.ApplyTime
+        """
+        for application_type, source_table in RELATION_SOURCES
+    ]
+
+
 # 数据库连接ID（延迟获取，避免模块加载时Tortoise未初始化）
 _wms_conn_id = None
 _fcc_conn_id = None
@@ -31,11 +140,66 @@ async def _get_fcc_conn_id():
     return _fcc_conn_id
 
 
+def parse_relation_text(input_text: str) -> dict:
+    """
+    解析输入文本
+    
+    格式规则：
+    - 每行一个FCC报销单与多个仓储对账单的关联
+    - 格式：FCC报销单号:仓储对账单1,仓储对账单2,...;
+    - 示例：J202512250009:ZD20260325153906B413D18,ZD202603251538028DCFA89;
+    
+    Args:
+        input_text: 输入文本
+        
+    Returns:
+        解析结果字典
+    """
+    relations = []
+    lines = input_text.strip().split('\n')
+
+    for line in lines:
+        line = line.strip()
+        if not line or not line.endswith(';'):
+            continue
+
+        line = line[:-1]  # 去除分号
+        if ':' not in line:
+            continue
+
+        parts = line.split(':')
+        if len(parts) != 2:
+            continue
+
+        fcc_no = parts[0].strip()
+        # 支持逗号、顿号、中文逗号分隔
+        wms_nos = []
+        for w in parts[1].replace('、', ',').replace('，', ',').split(','):
+            w = w.strip()
+            if w:
+                wms_nos.append(w)
+
+        if fcc_no and wms_nos:
+            relations.append({
+                'fcc_no': fcc_no,
+                'wms_nos': wms_nos
+            })
+
+    total_fcc = len(relations)
+    total_wms = sum(len(r['wms_nos']) for r in relations)
+
+    return {
+        'relations': relations,
+        'total_fcc': total_fcc,
+        'total_wms': total_wms
+    }
+
+
 class FccRelationService:
     """FCC报销单关联服务"""
 
     def __init__(self):
-        self.tasks: dict[str, dict] = {}  # 任务存储
+        self.tasks = ProgressStore("fcc_relation")  # 任务存储（Redis可用时跨Worker共享）
 
     async def _ensure_wms_pool(self) -> None:
         """确保仓储中心连接池已注册"""
@@ -46,63 +210,22 @@ class FccRelationService:
         await db_pool.ensure_pool(await _get_fcc_conn_id())
 
     def parse_input_text(self, input_text: str) -> dict:
-        """
-        解析输入文本
-        
-        格式规则：
-        - 每行一个FCC报销单与多个仓储对账单的关联
-        - 格式：FCC报销单号:仓储对账单1,仓储对账单2,...;
-        - 示例：J202512250009:ZD20260325153906B413D18,ZD202603251538028DCFA89;
-        
-        Args:
-            input_text: 输入文本
-            
-        Returns:
-            解析结果字典
-        """
-        relations = []
-        lines = input_text.strip().split('\n')
-
-        for line in lines:
-            line = line.strip()
-            if not line or not line.endswith(';'):
-                continue
-
-            line = line[:-1]  # 去除分号
-            if ':' not in line:
-                continue
+        """解析输入文本，规则见 parse_relation_text"""
+        return parse_relation_text(input_text)
 
-            parts = line.split(':')
-            if len(parts) != 2:
-                continue
-
-            fcc_no = parts[0].strip()
-            # 支持逗号、顿号、中文逗号分隔
-            wms_nos = []
-            for w in parts[1].replace('、', ',').replace('，', ',').split(','):
-                w = w.strip()
-                if w:
-                    wms_nos.append(w)
-
-            if fcc_no and wms_nos:
-                relations.append({
-                    'fcc_no': fcc_no,
-                    'wms_nos': wms_nos
-                })
-
-        total_fcc = len(relations)
-        total_wms = sum(len(r['wms_nos']) for r in relations)
-
-        return {
-            'relations': relations,
-            'total_fcc': total_fcc,
-            'total_wms': total_wms
-        }
+    async def parse_input(self, input_text: str) -> dict:
+        """解析输入文本，大文本在进程池中解析，避免阻塞事件循环"""
+        if len(input_text) < PARSE_OFFLOAD_THRESHOLD:
+            return parse_relation_text(input_text)
+        return await run_cpu_bound(parse_relation_text, input_text)
 
     async def validate_codenumber(self, relations: list[dict]) -> dict:
         """
         验证单据存在性
         
+        FCC（SQL Server）与仓储（MySQL）两侧互不依赖，分别用 IN / VALUES 列表分块批量校验，
+        并通过 asyncio.gather 并发执行。
+        
         Args:
             relations: 对应关系列表
             
@@ -117,92 +240,17 @@ class FccRelationService:
 
         if not wms_pool or not fcc_pool:
             raise ValueError("数据库连接池不存在")
+        if not isinstance(wms_pool, aiomysql.Pool):
+            raise ValueError("仓储中心连接池类型异常，预期为MySQL")
 
-        not_found_fcc = []
-        not_found_wms = []
-        paid_wms = []
-        not_full_reconc_wms = []
-        existing_relations = []  # 已存在的对应关系
+        # 收集所有单号（去重并保持输入顺序）
+        all_fcc_nos = list(dict.fromkeys(r['fcc_no'] for r in relations))
+        all_wms_nos = list(dict.fromkeys(w for r in relations for w in r['wms_nos']))
 
-        # 收集所有单号
-        all_fcc_nos = list(set(r['fcc_no'] for r in relations))
-        all_wms_nos = list(set(w for r in relations for w in r['wms_nos']))
-
-        # 验证FCC报销单（SQL Server）
-        async with fcc_pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                for fcc_no in all_fcc_nos:
-                    # SQL1: 验证FCC单（报销单或还款单）是否存在
-                    sql_reim = "SELECT COUNT(*) FROM [dbo].[fms.reimbursement_info] WHERE CodeNumber = ? AND Deleted=0"
-                    await cur.execute(sql_reim, (fcc_no,))
-                    res_reim = await cur.fetchone()
-
-                    if not res_reim or res_reim[0] == 0:
-                        # 报销单里没查到，继续查借款单
-                        sql_loan = "SELECT COUNT(*) FROM [dbo].[fms.Loan_Info] WHERE CodeNumber = ? AND Deleted=0"
-                        await cur.execute(sql_loan, (fcc_no,))
-                        res_loan = await cur.fetchone()
-
-                        if not res_loan or res_loan[0] == 0:
-                            # 借款单里也没查到，继续查还款核销单
-                            sql_repay = "SELECT COUNT(*) FROM [dbo].[fms.LoanRepaymentOrVerification_Info] WHERE CodeNumber = ? AND Deleted=0"
-                            await cur.execute(sql_repay, (fcc_no,))
-                            res_repay = await cur.fetchone()
-
-                            # 三个表都没有记录，才能判定它不存在
-                            if not res_repay or res_repay[0] == 0:
-                                not_found_fcc.append(fcc_no)
-
-                # 验证是否已存在对应关系（查询fms_costdetail_reconcinfo）
-                for relation in relations:
-                    fcc_no = relation['fcc_no']
-                    for wms_no in relation['wms_nos']:
-                        sql_exist = """
-                            SELECT COUNT(*) FROM [dbo].[fms_costdetail_reconcinfo] 
-                            WHERE CodeNumber = ? AND ReconcNo = ? AND Deleted = 0
-                        """
-                        await cur.execute(sql_exist, (fcc_no, wms_no))
-                        res_exist = await cur.fetchone()
-                        if res_exist and res_exist[0] > 0:
-                            existing_relations.append({'fcc_no': fcc_no, 'wms_no': wms_no})
-
-        # 验证仓储对账单（MySQL）
-        if isinstance(wms_pool, aiomysql.Pool):
-            async with wms_pool.acquire() as conn, conn.cursor() as cur:
-                for wms_no in all_wms_nos:
-                    # SQL2: 验证仓储对账单是否存在
-                    sql = "SELECT COUNT(*) FROM tb_reconcinfo WHERE ReconcNo = %s AND Deleted=0"
-                    await cur.execute(sql, (wms_no,))
-                    result = await cur.fetchone()
-                    if not result or result[0] == 0:
-                        not_found_wms.append(wms_no)
-                        continue
-
-                    # SQL3: 验证仓储对账单是否已付款
-                    sql_paid = "SELECT 1 FROM tb_reconcinfo a WHERE ReconcNo = %s AND a.PayStatus=3 AND a.Deleted=0"
-                    await cur.execute(sql_paid, (wms_no,))
-                    result_paid = await cur.fetchone()
-                    if result_paid:
-                        paid_wms.append(wms_no)
-
-                    # SQL4: 验证对账单是否均为全部对账的应付单
-                    sql_full = """SELECT a.OwingId,SUM(a.ReconcNum),b.StockNum
-                                      FROM tb_reconcdetail a
-                                      JOIN tb_owinginfo b
-                                        ON b.Id=a.OwingId
-                                        AND b.Deleted=0
-                                      JOIN tb_reconcinfo c
-                                        ON c.Id=a.ReconcId
-                                        AND c.Deleted=0
-                                      WHERE a.Deleted=0
-                                        AND c.ReconcNo = %s
-                                      GROUP BY a.OwingId
-                                      HAVING ABS(SUM(a.ReconcNum))!=b.StockNum
-                                   """
-                    await cur.execute(sql_full, (wms_no,))
-                    result_full = await cur.fetchone()
-                    if result_full:
-                        not_full_reconc_wms.append(wms_no)
+        (not_found_fcc, existing_relations), (not_found_wms, paid_wms, not_full_reconc_wms) = await asyncio.gather(
+            self._validate_fcc_side(fcc_pool, all_fcc_nos, relations),
+            self._validate_wms_side(wms_pool, all_wms_nos),
+        )
 
         valid = (len(not_found_fcc) == 0 and
                  len(not_found_wms) == 0 and
@@ -236,17 +284,83 @@ class FccRelationService:
             'message': message
         }
 
+    async def _validate_fcc_side(self, fcc_pool, all_fcc_nos: list[str], relations: list[dict]) -> tuple[list, list]:
+        """校验FCC单（报销单、借款单、还款核销单任一存在即可）及已存在的对应关系"""
+        async with fcc_pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                # SQL1: 三张单据表合并为一条 IN 查询
+                matches = await resolve_in_batches(
+                    cur, FCC_EXISTS_SQL, all_fcc_nos, lambda row: (row[0],),
+                    chunk_size=SQLSERVER_IN_CHUNK, marker="?",
+                )
+                not_found_fcc = [fcc_no for fcc_no in all_fcc_nos if not matches.get(fcc_no)]
+
+                # 验证是否已存在对应关系：(CodeNumber, ReconcNo) 作为 VALUES 表值列表批量匹配
+                pairs = list(dict.fromkeys(
+                    (relation['fcc_no'], wms_no) for relation in relations for wms_no in relation['wms_nos']
+                ))
+                existing = set()
+                for chunk in chunked(pairs, SQLSERVER_IN_CHUNK // 2):
+                    values = ",".join(["(?, ?)"] * len(chunk))
+                    await cur.execute(
+                        FCC_EXISTING_RELATIONS_SQL.format(values=values),
+                        [v for pair in chunk for v in pair],
+                    )
+                    for row in await cur.fetchall():
+                        existing.add((normalize_no(row[0]), normalize_no(row[1])))
+
+        existing_relations = [
+            {'fcc_no': relation['fcc_no'], 'wms_no': wms_no}
+            for relation in relations
+            for wms_no in relation['wms_nos']
+            if (normalize_no(relation['fcc_no']), normalize_no(wms_no)) in existing
+        ]
+        return not_found_fcc, existing_relations
+
+    async def _validate_wms_side(self, wms_pool, all_wms_nos: list[str]) -> tuple[list, list, list]:
+        """校验仓储对账单存在性、付款状态与应付单是否全部对账"""
+        async with wms_pool.acquire() as conn, conn.cursor() as cur:
+            # SQL2 + SQL3: 存在性与付款状态
+            status = await resolve_in_batches(cur, WMS_RECONC_STATUS_SQL, all_wms_nos, lambda row: (row[0],))
+            # SQL4: 存在非全部对账应付单的对账单
+            not_full = await resolve_in_batches(cur, WMS_NOT_FULL_RECONC_SQL, all_wms_nos, lambda row: (row[0],))
+
+        not_found_wms = []
+        paid_wms = []
+        not_full_reconc_wms = []
+        for wms_no in all_wms_nos:
+            rows = status.get(wms_no)
+            if not rows:
+                not_found_wms.append(wms_no)
+                continue
+            if any(row[1] for row in rows):
+                paid_wms.append(wms_no)
+            if not_full.get(wms_no):
+                not_full_reconc_wms.append(wms_no)
+        return not_found_wms, paid_wms, not_full_reconc_wms
+
     async def execute_relation_task(self, task_id: str, relations: list[dict]) -> None:
         """
         执行关联任务（异步）
         
+        按 FCC_RELATION_CONCURRENCY 路并发处理关系，每路独占一对 FCC/仓储连接及其会话临时表；
+        涉及相同仓储对账单的关系串行处理。已成功的关系记录在任务状态中，
+        任务被重新投递（如 Worker 重启）时跳过这些关系继续执行；
+        提交后、记录完成前中断的关系重跑时不会重复写入（见 _process_relation）。
+        任一路异常退出时取消其余各路，任务按已完成的部分记为失败。
+        
         Args:
             task_id: 任务ID
             relations: 对应关系列表
         """
+        success_count = 0
+        failed_items = []
         try:
+            state = await self.tasks.aget(task_id) or {}
+            done = set(state.get('done') or [])
+
             # 更新任务状态为processing
-            self.tasks[task_id]['status'] = 'processing'
+            await self.tasks.aupdate(task_id, status='processing', updated_at=datetime.now().isoformat())
 
             await self._ensure_wms_pool()
             await self._ensure_fcc_pool()
@@ -261,259 +375,242 @@ class FccRelationService:
 
             # 计算总数
             total = sum(len(r['wms_nos']) for r in relations)
-            self.tasks[task_id]['progress']['total'] = total
-
-            success_count = 0
+            success_count = sum(len(relations[i]['wms_nos']) for i in done if i < len(relations))
             failed_items = []
-            processed = 0
-
-            async with fcc_pool.acquire() as fcc_conn, wms_pool.acquire() as wms_conn:
-                async with fcc_conn.cursor() as fcc_cur, wms_conn.cursor() as wms_cur:
-                    # 临时表只在任务开始时清空一次，避免循环中只保留最后一条
-                    await fcc_cur.execute("DELETE FROM [dbo].[tm_wh_reconcinfo]")
-
-                    # 逐个处理关联关系
-                    for relation in relations:
-                        fcc_no = relation['fcc_no']
-                        wms_nos = relation['wms_nos']
-
+            processed = success_count
+            if done:
+                logger.info(f"[FCC关联] 任务恢复执行: task_id={task_id}, 跳过已完成关系={len(done)}")
+
+            async def report():
+                await self.tasks.aupdate(
+                    task_id,
+                    progress={
+                        'total': total,
+                        'processed': processed,
+                        'success': success_count,
+                        'failed': len(failed_items)
+                    },
+                    done=sorted(done),
+                    updated_at=datetime.now().isoformat(),
+                )
+
+            await report()
+
+            queue: asyncio.Queue = asyncio.Queue()
+            for index, relation in enumerate(relations):
+                if index not in done:
+                    queue.put_nowait((index, relation))
+            wms_locks: dict[str, asyncio.Lock] = {}
+
+            async def worker():
+                nonlocal success_count, processed
+                async with fcc_pool.acquire() as fcc_conn, wms_pool.acquire() as wms_conn:
+                    async with fcc_conn.cursor() as fcc_cur, wms_conn.cursor() as wms_cur:
+                        await self._create_tmp_table(fcc_conn, fcc_cur)
                         try:
-                            relation_tag = f"fcc_no={fcc_no}, wms_nos={wms_nos}"
-                            # 步骤1: 查询仓储对账单信息（避免JOIN明细导致重复）
-                            placeholders_mysql = ','.join(['%s'] * len(wms_nos))
-                            sql_wms = f"""
-                                SELECT a.Id AS ReconcId,a.ReconcNo,a.SupplierId,a.SupplierName,a.OwnerId,a.OwnerName,
-                                  a.Amount AS ReconcPrice,a.SubmitPerson AS ReconcPersonCode,a.SubmitPersonName AS ReconcPersonName,
-                                  a.SubmitTime AS ApplyTime,a.OwingNum AS ReconcNum
-                                FROM tb_reconcinfo a
-                                WHERE a.Deleted=0
-                                  AND a.ReconcNo IN ({placeholders_mysql})
-                            """
-                            await wms_cur.execute(sql_wms, wms_nos)
-                            reconc_data = await wms_cur.fetchall()
-                            logger.info(f"[FCC关联][步骤1] 查询仓储对账单完成: {relation_tag}, 查询行数={len(reconc_data)}")
-
-                            if not reconc_data:
-                                raise ValueError(f"未查询到对账单信息: {wms_nos}")
-
-                            # 步骤2: 写入FCC临时表（参数化批量写入）
-                            insert_tmp_sql = """
-                                INSERT INTO [dbo].[tm_wh_reconcinfo]
-                                ([ReconcId],[ReconcNo],[SupplierId],[SupplierName],[OwnerId],[OwnerName],
-                                 [ReconcPrice],[ReconcPersonCode],[ReconcPersonName],[ApplyTime],
-                                 [CodeNumber],[ReconcNum])
-                                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-                            """
-                            tmp_rows = []
-                            for row in reconc_data:
-                                reconc_id, reconc_no, supplier_id, supplier_name, owner_id, owner_name, \
-                                reconc_price, reconc_person_code, reconc_person_name, apply_time, reconc_num = row
-                                tmp_rows.append((
-                                    reconc_id,
-                                    reconc_no,
-                                    supplier_id,
-                                    supplier_name,
-                                    owner_id,
-                                    owner_name,
-                                    reconc_price,
-                                    reconc_person_code,
-                                    reconc_person_name,
-                                    apply_time,
-                                    fcc_no,
-                                    reconc_num,
-                                ))
-                            await fcc_cur.executemany(insert_tmp_sql, tmp_rows)
-                            tmp_insert_count = len(tmp_rows)
-                            logger.info(f"[FCC关联][步骤2] 写入FCC临时表完成: {relation_tag}, 影响行数={tmp_insert_count}")
-
-                            # 步骤3: 查询并写入正式关系表
-                            placeholders_sqlserver = ','.join(['?'] * len(wms_nos))
-                            sql_select_templates = [
-                                f"""
-                                SELECT NEWID() AS Id,1 AS ApplicationType,B.Id AS ApplicationId,B.CodeNumber,C.Id AS CostDetailId,
-                                       A.ReconcId,A.ReconcNo,A.SupplierId,A.SupplierName,
-                                       D.CompanyId AS OwnerId,
-                                       D.OwnerId AS WareHouseOwnerId,D.OwnerName,
-                                       A.ApplyTime,
-                                       A.ReconcPrice,
-                                       A.ReconcPrice AS InvoiceSurplusPrice,
-                                       A.ReconcPrice AS ThisInvoicePrice,
-                                       (CAST(FORMAT(GETDATE(),'yyyy-MM-dd') AS VARCHAR)+' 手动刷数') AS Remark,
-                                       A.ReconcPersonCode,A.ReconcPersonName,
-                                       NULL AS CreatedById,GETDATE() AS CreatedAt,NULL AS UpdatedById,GETDATE() AS UpdatedAt,
-                                       NULL AS DeletedById,NULL AS DeletedAt,0 AS Deleted,A.ReconcNum
-                                  FROM tm_wh_reconcinfo A
-                                  JOIN dbo.[fms.reimbursement_info] B ON B.CodeNumber=?
-                                  LEFT JOIN dbo.[fms.costdetail_info] C ON B.Id=C.ReimbursementId AND C.Deleted=0
-                                  LEFT JOIN dbo.[fms_warehouse_ownerinfo] D ON D.OwnerId=A.OwnerId
-                                 WHERE A.ReconcNo IN ({placeholders_sqlserver})
-                                   AND B.Id IS NOT NULL
-                                 ORDER BY A.ApplyTime
-                                """,
-                                f"""
-                                SELECT NEWID() AS Id,2 AS ApplicationType,B.Id AS ApplicationId,B.CodeNumber,C.Id AS CostDetailId,
-                                       A.ReconcId,A.ReconcNo,A.SupplierId,A.SupplierName,
-                                       D.CompanyId AS OwnerId,
-                                       D.OwnerId AS WareHouseOwnerId,D.OwnerName,
-                                       A.ApplyTime,
-                                       A.ReconcPrice,
-                                       A.ReconcPrice AS InvoiceSurplusPrice,
-                                       A.ReconcPrice AS ThisInvoicePrice,
-                                       (CAST(FORMAT(GETDATE(),'yyyy-MM-dd') AS VARCHAR)+' 手动刷数') AS Remark,
-                                       A.ReconcPersonCode,A.ReconcPersonName,
-                                       NULL AS CreatedById,GETDATE() AS CreatedAt,NULL AS UpdatedById,GETDATE() AS UpdatedAt,
-                                       NULL AS DeletedById,NULL AS DeletedAt,0 AS Deleted,A.ReconcNum
-                                  FROM tm_wh_reconcinfo A
-                                  JOIN dbo.[fms.loan_info] B ON B.CodeNumber=?
-                                  LEFT JOIN dbo.[fms.costdetail_info] C ON B.Id=C.ReimbursementId AND C.Deleted=0
-                                  LEFT JOIN dbo.[fms_warehouse_ownerinfo] D ON D.OwnerId=A.OwnerId
-                                 WHERE A.ReconcNo IN ({placeholders_sqlserver})
-                                   AND B.Id IS NOT NULL
-                                 ORDER BY A.ApplyTime
-                                """,
-                                f"""
-                                SELECT NEWID() AS Id,3 AS ApplicationType,B.Id AS ApplicationId,B.CodeNumber,C.Id AS CostDetailId,
-                                       A.ReconcId,A.ReconcNo,A.SupplierId,A.SupplierName,
-                                       D.CompanyId AS OwnerId,
-                                       D.OwnerId AS WareHouseOwnerId,D.OwnerName,
-                                       A.ApplyTime,
-                                       A.ReconcPrice,
-                                       A.ReconcPrice AS InvoiceSurplusPrice,
-                                       A.ReconcPrice AS ThisInvoicePrice,
-                                       (CAST(FORMAT(GETDATE(),'yyyy-MM-dd') AS VARCHAR)+' 手动刷数') AS Remark,
-                                       A.ReconcPersonCode,A.ReconcPersonName,
-                                       NULL AS CreatedById,GETDATE() AS CreatedAt,NULL AS UpdatedById,GETDATE() AS UpdatedAt,
-                                       NULL AS DeletedById,NULL AS DeletedAt,0 AS Deleted,A.ReconcNum
-                                  FROM tm_wh_reconcinfo A
-                                  JOIN dbo.[fms.LoanRepaymentOrVerification_Info] B ON B.CodeNumber=?
-                                  LEFT JOIN dbo.[fms.costdetail_info] C ON B.Id=C.ReimbursementId AND C.Deleted=0
-                                  LEFT JOIN dbo.[fms_warehouse_ownerinfo] D ON D.OwnerId=A.OwnerId
-                                 WHERE A.ReconcNo IN ({placeholders_sqlserver})
-                                   AND B.Id IS NOT NULL
-                                 ORDER BY A.ApplyTime
-                                """,
-                            ]
-
-                            params = [fcc_no] + wms_nos
-                            inserted_rows = 0
-                            for template_idx, select_sql in enumerate(sql_select_templates, start=1):
-                                await fcc_cur.execute(select_sql, params)
-                                relation_rows = await fcc_cur.fetchall()
-                                logger.info(
-                                    f"[FCC关联][步骤3-{template_idx}] 查询关系候选数据完成: {relation_tag}, 查询行数={len(relation_rows)}"
-                                )
-                                if not relation_rows:
-                                    continue
-
-                                # 用SELECT返回列名动态构造INSERT，避免列顺序硬编码出错
-                                columns = [col[0] for col in fcc_cur.description]
-                                quoted_columns = ",".join([f"[{col}]" for col in columns])
-                                value_marks = ",".join(["?"] * len(columns))
-                                insert_relation_sql = (
-                                    f"INSERT INTO [dbo].[fms_costdetail_reconcinfo] ({quoted_columns}) "
-                                    f"VALUES ({value_marks})"
-                                )
-                                await fcc_cur.executemany(insert_relation_sql, relation_rows)
-                                inserted_rows += len(relation_rows)
-                                logger.info(
-                                    f"[FCC关联][步骤3-{template_idx}] 写入正式关系表完成: {relation_tag}, 影响行数={len(relation_rows)}"
-                                )
-
-                            if inserted_rows == 0:
-                                raise ValueError(f"未匹配到可写入的FCC关系数据: {fcc_no} -> {wms_nos}")
-                            logger.info(f"[FCC关联][步骤3] 关系写入汇总: {relation_tag}, 总影响行数={inserted_rows}")
-
-                            # 步骤4: 更新仓储中心付款状态（SQL6、SQL7）
-                            sql6 = f"""
-                                UPDATE tb_owinginfo x
-                                  SET OwingStatus=4,OwingPrice=0,OwingedPrice=Amount
-                                WHERE x.Id IN (
-                                  SELECT S.OwingId FROM(
-                                SELECT a.OwingId,SUM(a.ReconcNum),b.StockNum
-                                  FROM tb_reconcdetail a
-                                  JOIN tb_owinginfo b
-                                    ON b.Id=a.OwingId
-                                    AND b.Deleted=0
-                                  JOIN tb_reconcinfo c
-                                    ON c.Id=a.ReconcId
-                                    AND c.Deleted=0
-                                WHERE a.Deleted=0
-                                  AND c.ReconcNo IN ({placeholders_mysql})
-                                GROUP BY a.OwingId
-                                  HAVING SUM(a.ReconcNum)=b.StockNum ) AS S
-                                  )
-                            """
-                            await wms_cur.execute(sql6, wms_nos)
-                            sql6_affected = wms_cur.rowcount
-                            logger.info(f"[FCC关联][步骤4-SQL6] 更新tb_owinginfo完成: {relation_tag}, 影响行数={sql6_affected}")
-
-                            sql7 = f"""
-                                UPDATE tb_reconcinfo
-                                SET PayStatus=3,InvoiceStatus=2,InvoicePrice=Amount,UnInvoicePrice=0
-                                WHERE ReconcNo IN ({placeholders_mysql})
-                                  AND Deleted=0
-                            """
-                            await wms_cur.execute(sql7, wms_nos)
-                            sql7_affected = wms_cur.rowcount
-                            logger.info(
-                                f"[FCC关联][步骤4-SQL7] 更新tb_reconcinfo完成: {relation_tag}, 影响行数={sql7_affected}"
-                            )
-
-                            # 显式提交，避免“无报错但不落库”
-                            await fcc_conn.commit()
-                            await wms_conn.commit()
-                            logger.info(f"[FCC关联][步骤5] 双库提交完成: {relation_tag}")
-
-                            success_count += len(wms_nos)
-                            processed += len(wms_nos)
-
-                        except Exception as e:
-                            logger.error(f"处理关联失败: fcc_no={fcc_no}, wms_nos={wms_nos}, error={e}")
-                            try:
-                                await fcc_conn.rollback()
-                            except Exception:
-                                pass
-                            try:
-                                await wms_conn.rollback()
-                            except Exception:
-                                pass
-                            for wms_no in wms_nos:
-                                failed_items.append({
-                                    'fcc_no': fcc_no,
-                                    'wms_no': wms_no,
-                                    'reason': str(e)
-                                })
-                                processed += 1
+                            while not queue.empty():
+                                index, relation = queue.get_nowait()
+                                fcc_no = relation['fcc_no']
+                                wms_nos = relation['wms_nos']
+                                try:
+                                    async with AsyncExitStack() as stack:
+                                        for wms_no in sorted(set(wms_nos)):
+                                            await stack.enter_async_context(wms_locks.setdefault(wms_no, asyncio.Lock()))
+                                        await self._process_relation(fcc_conn, fcc_cur, wms_conn, wms_cur, fcc_no, wms_nos)
+                                    done.add(index)
+                                    success_count += len(wms_nos)
+                                    processed += len(wms_nos)
+                                except Exception as e:
+                                    logger.error(f"处理关联失败: fcc_no={fcc_no}, wms_nos={wms_nos}, error={e}")
+                                    for wms_no in wms_nos:
+                                        failed_items.append({
+                                            'fcc_no': fcc_no,
+                                            'wms_no': wms_no,
+                                            'reason': str(e)
+                                        })
+                                        processed += 1
+                                finally:
+                                    await report()
                         finally:
-                            self.tasks[task_id]['progress']['processed'] = processed
-                            self.tasks[task_id]['progress']['success'] = success_count
-                            self.tasks[task_id]['progress']['failed'] = len(failed_items)
+                            await self._drop_tmp_table(fcc_cur)
+
+            concurrency = min(settings.FCC_RELATION_CONCURRENCY, queue.qsize())
+            # TaskGroup：任一路失败时取消其余各路（进行中的关系回滚），全部结束后才写最终状态
+            async with asyncio.TaskGroup() as group:
+                for _ in range(concurrency):
+                    group.create_task(worker())
 
             # 更新任务状态为completed
-            self.tasks[task_id]['status'] = 'completed'
-            self.tasks[task_id]['finished_at'] = datetime.now().isoformat()
-            self.tasks[task_id]['result'] = {
-                'success_count': success_count,
-                'failed_items': failed_items
-            }
+            await self.tasks.aupdate(
+                task_id,
+                status='completed',
+                finished_at=datetime.now().isoformat(),
+                updated_at=datetime.now().isoformat(),
+                result={
+                    'success_count': success_count,
+                    'failed_items': failed_items
+                }
+            )
 
         except Exception as e:
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
             logger.error(f"任务执行失败: {e}")
-            self.tasks[task_id]['status'] = 'failed'
-            self.tasks[task_id]['finished_at'] = datetime.now().isoformat()
-            self.tasks[task_id]['result'] = {
-                'success_count': 0,
-                'failed_items': [{
-                    'fcc_no': '',
-                    'wms_no': '',
-                    'reason': str(e)
-                }]
-            }
+            await self.tasks.aupdate(
+                task_id,
+                status='failed',
+                finished_at=datetime.now().isoformat(),
+                updated_at=datetime.now().isoformat(),
+                result={
+                    'success_count': success_count,
+                    'failed_items': failed_items + [{
+                        'fcc_no': '',
+                        'wms_no': '',
+                        'reason': str(e)
+                    }]
+                }
+            )
+
+    async def _create_tmp_table(self, fcc_conn, fcc_cur) -> None:
+        """在当前会话中创建临时表（复制 tm_wh_reconcinfo 结构），并立即提交避免随后续回滚丢失"""
+        await fcc_cur.execute(f"IF OBJECT_ID('tempdb..{TMP_RECONC_TABLE}') IS NOT NULL DROP TABLE {TMP_RECONC_TABLE}")
+        await fcc_cur.execute(f"SELECT TOP 0 * INTO {TMP_RECONC_TABLE} FROM [dbo].[tm_wh_reconcinfo]")
+        await fcc_conn.commit()
+
+    async def _drop_tmp_table(self, fcc_cur) -> None:
+        try:
+            await fcc_cur.execute(f"IF OBJECT_ID('tempdb..{TMP_RECONC_TABLE}') IS NOT NULL DROP TABLE {TMP_RECONC_TABLE}")
+        except Exception as e:
+            logger.warning(f"[FCC关联] 清理会话临时表失败: {e}")
+
+    async def _process_relation(self, fcc_conn, fcc_cur, wms_conn, wms_cur, fcc_no: str, wms_nos: list[str]) -> None:
+        """
+        处理单个FCC单与其仓储对账单的关联，成功时双库提交，失败或被取消时双库回滚并抛出异常
+
+        幂等：关系写入跳过已存在的 (CodeNumber, ReconcNo)，仓储侧更新为状态覆盖；
+        FCC 已提交而完成标记未保存（或仓储未提交）时重跑只补做仓储侧更新
+        """
+        try:
+            relation_tag = f"fcc_no={fcc_no}, wms_nos={wms_nos}"
+            # 步骤1: 查询仓储对账单信息（避免JOIN明细导致重复）
+            placeholders_mysql = ','.join(['%s'] * len(wms_nos))
+            sql_wms = f"""
+                SELECT a.Id AS ReconcId,a.ReconcNo,a.SupplierId,a.SupplierName,a.OwnerId,a.OwnerName,
+                  a.Amount AS ReconcPrice,a.SubmitPerson AS ReconcPersonCode,a.SubmitPersonName AS ReconcPersonName,
+                  a.SubmitTime AS ApplyTime,a.OwingNum AS ReconcNum
+                FROM tb_reconcinfo a
+                WHERE a.Deleted=0
+                  AND a.ReconcNo IN ({placeholders_mysql})
+            """
+            await wms_cur.execute(sql_wms, wms_nos)
+            reconc_data = await wms_cur.fetchall()
+            logger.info(f"[FCC关联][步骤1] 查询仓储对账单完成: {relation_tag}, 查询行数={len(reconc_data)}")
+
+            if not reconc_data:
+                raise ValueError(f"未查询到对账单信息: {wms_nos}")
+
+            # 步骤2: 写入会话临时表（先清空本连接上一条关系的数据）
+            await fcc_cur.execute(f"DELETE FROM {TMP_RECONC_TABLE}")
+            insert_tmp_sql = f"""
+                INSERT INTO {TMP_RECONC_TABLE}
+                ([ReconcId],[ReconcNo],[SupplierId],[SupplierName],[OwnerId],[OwnerName],
+                 [ReconcPrice],[ReconcPersonCode],[ReconcPersonName],[ApplyTime],
+                 [CodeNumber],[ReconcNum])
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+            """
+            tmp_rows = [(*row[:10], fcc_no, row[10]) for row in reconc_data]
+            await fcc_cur.executemany(insert_tmp_sql, tmp_rows)
+            logger.info(f"[FCC关联][步骤2] 写入FCC临时表完成: {relation_tag}, 影响行数={len(tmp_rows)}")
+
+            # 步骤3: 查询并写入正式关系表
+            params = [fcc_no] + wms_nos
+            inserted_rows = 0
+            for template_idx, select_sql in enumerate(_relation_select_sqls(len(wms_nos)), start=1):
+                await fcc_cur.execute(select_sql, params)
+                relation_rows = await fcc_cur.fetchall()
+                logger.info(
+                    f"[FCC关联][步骤3-{template_idx}] 查询关系候选数据完成: {relation_tag}, 查询行数={len(relation_rows)}"
+                )
+                if not relation_rows:
+                    continue
+
+                # 用SELECT返回列名动态构造INSERT，避免列顺序硬编码出错
+                columns = [col[0] for col in fcc_cur.description]
+                quoted_columns = ",".join([f"[{col}]" for col in columns])
+                value_marks = ",".join(["?"] * len(columns))
+                insert_relation_sql = (
+                    f"INSERT INTO [dbo].[fms_costdetail_reconcinfo] ({quoted_columns}) "
+                    f"VALUES ({value_marks})"
+                )
+                await fcc_cur.executemany(insert_relation_sql, relation_rows)
+                inserted_rows += len(relation_rows)
+                logger.info(
+                    f"[FCC关联][步骤3-{template_idx}] 写入正式关系表完成: {relation_tag}, 影响行数={len(relation_rows)}"
+                )
+
+            if inserted_rows == 0:
+                placeholders_sqlserver = ','.join(['?'] * len(wms_nos))
+                await fcc_cur.execute(FCC_RELATED_WMS_SQL.format(placeholders=placeholders_sqlserver), params)
+                related = {normalize_no(row[0]) for row in await fcc_cur.fetchall()}
+                if related != {normalize_no(wms_no) for wms_no in wms_nos}:
+                    raise ValueError(f"未匹配到可写入的FCC关系数据: {fcc_no} -> {wms_nos}")
+                logger.info(f"[FCC关联][步骤3] 关系已存在（重复执行），仅补做仓储侧更新: {relation_tag}")
+            logger.info(f"[FCC关联][步骤3] 关系写入汇总: {relation_tag}, 总影响行数={inserted_rows}")
+
+            # 步骤4: 更新仓储中心付款状态（SQL6、SQL7）
+            sql6 = f"""
+                UPDATE tb_owinginfo x
+                  SET OwingStatus=4,OwingPrice=0,OwingedPrice=Amount
+                WHERE x.Id IN (
+                  SELECT S.OwingId FROM(
+                SELECT a.OwingId,SUM(a.ReconcNum),b.StockNum
+                  FROM tb_reconcdetail a
+                  JOIN tb_owinginfo b
+                    ON b.Id=a.OwingId
+                    AND b.Deleted=0
+                  JOIN tb_reconcinfo c
+                    ON c.Id=a.ReconcId
+                    AND c.Deleted=0
+                WHERE a.Deleted=0
+                  AND c.ReconcNo IN ({placeholders_mysql})
+                GROUP BY a.OwingId
+                  HAVING SUM(a.ReconcNum)=b.StockNum ) AS S
+                  )
+            """
+            await wms_cur.execute(sql6, wms_nos)
+            logger.info(f"[FCC关联][步骤4-SQL6] 更新tb_owinginfo完成: {relation_tag}, 影响行数={wms_cur.rowcount}")
+
+            sql7 = f"""
+                UPDATE tb_reconcinfo
+                SET PayStatus=3,InvoiceStatus=2,InvoicePrice=Amount,UnInvoicePrice=0
+                WHERE ReconcNo IN ({placeholders_mysql})
+                  AND Deleted=0
+            """
+            await wms_cur.execute(sql7, wms_nos)
+            logger.info(f"[FCC关联][步骤4-SQL7] 更新tb_reconcinfo完成: {relation_tag}, 影响行数={wms_cur.rowcount}")
+
+            # 显式提交，避免“无报错但不落库”
+            await fcc_conn.commit()
+            await wms_conn.commit()
+            logger.info(f"[FCC关联][步骤5] 双库提交完成: {relation_tag}")
+        except BaseException:
+            try:
+                await fcc_conn.rollback()
+            except Exception:
+                pass
+            try:
+                await wms_conn.rollback()
+            except Exception:
+                pass
+            raise
 
     async def submit_task(self, relations: list[dict]) -> str:
         """
         提交任务
         
+        Celery 可用时投递到 Worker 执行（acks_late，Worker 异常退出后会重新投递并续跑），
+        否则在当前进程内异步执行。任务状态统一写入 ProgressStore，跨 Worker 可见。
+        
         Args:
             relations: 对应关系列表
             
@@ -522,36 +619,66 @@ class FccRelationService:
         """
         logger.info(f"[FCC关联] 任务提交接收: relations_count={len(relations)}")
         task_id = str(uuid.uuid4())
-        self.tasks[task_id] = {
+        now = datetime.now().isoformat()
+        await self.tasks.astart(task_id, {
             'task_id': task_id,
             'status': 'pending',
+            'backend': 'local',
             'progress': {
                 'total': 0,
                 'processed': 0,
                 'success': 0,
                 'failed': 0
             },
+            'done': [],
             'result': None,
-            'created_at': datetime.now().isoformat(),
+            'created_at': now,
+            'updated_at': now,
             'finished_at': None
-        }
+        })
 
-        # 异步执行任务
-        asyncio.create_task(self.execute_relation_task(task_id, relations))
+        if dispatch_fcc_relation(task_id, relations):
+            await self.tasks.aupdate(task_id, backend='celery')
+        else:
+            # 异步执行任务
+            asyncio.create_task(self.execute_relation_task(task_id, relations))
 
         return task_id
 
-    def query_task_status(self, task_id: str) -> dict | None:
+    async def query_task_status(self, task_id: str) -> dict | None:
         """
         查询任务状态
         
+        本地执行的任务若长时间无进度更新（所在进程已退出），返回中断失败状态。
+        
         Args:
             task_id: 任务ID
             
         Returns:
             任务状态字典
         """
-        return self.tasks.get(task_id)
+        task = await self.tasks.aget(task_id)
+        if not task or task.get('backend') != 'local' or task.get('status') not in ('pending', 'processing'):
+            return task
+        try:
+            idle = (datetime.now() - datetime.fromisoformat(task.get('updated_at') or task['created_at'])).total_seconds()
+        except (KeyError, ValueError):
+            return task
+        if idle < settings.FCC_RELATION_STALE_SECONDS:
+            return task
+        progress = task.get('progress') or {}
+        return {
+            **task,
+            'status': 'failed',
+            'result': {
+                'success_count': progress.get('success', 0),
+                'failed_items': [{
+                    'fcc_no': '',
+                    'wms_no': '',
+                    'reason': f"任务已中断（超过 {settings.FCC_RELATION_STALE_SECONDS} 秒无进度更新）"
+                }]
+            }
+        }
 
 
 # 单例
@@ -8,7 +8,8 @@ from datetime import datetime
 from app.log import logger
 from app.models.imptask import ImpTask
 from app.services.celery_dispatcher import dispatch_imptask, dispatch_imptask_execute
-from app.services.excelimp_service import generate_sql_file_from_excel
+from app.services.excelimp_service import generate_sql_file_from_excel, read_sql_file_meta
+from app.services.progress_reporter import ThrottledProgressReporter
 from app.services.sql_apply_service import calc_sha256, execute_sql_on_connection
 
 RETRYABLE_ERRORS = (MemoryError, OSError, TimeoutError, ConnectionError)
@@ -58,8 +59,8 @@ async def _raise_if_process_stop_requested(task_id: int):
 
 
 async def _raise_if_execute_stop_requested(task_id: int):
-    task = await ImpTask.get_or_none(id=task_id)
-    if task and task.execute_stop_requested:
+    stop_requested = await ImpTask.filter(id=task_id).values_list("execute_stop_requested", flat=True).first()
+    if stop_requested:
         raise ManualStopError("导入执行已手动停止")
 
 
@@ -166,6 +167,9 @@ async def process_imptask(task_id: int, raise_retryable: bool = False):
         task.sql_file_path = sql_file_path
         task.sql_file_size = os.path.getsize(sql_file_path)
         task.sql_sha256 = sql_meta["sql_sha256"]
+        task.temp_table_name = sql_meta.get("table_name")
+        task.row_count = sql_meta.get("row_count")
+        task.columns_meta = sql_meta.get("columns_meta")
         task.completed_at = datetime.now()
         task.process_celery_task_id = None
         task.stop_requested = False
@@ -311,15 +315,16 @@ async def execute_imptask_sql(
         if task.sql_sha256 and task.sql_sha256 != current_sha:
             raise ValueError("SQL文件摘要校验失败，疑似被篡改")
 
-        async def progress_cb(done: int, total: int, _stmt: str):
-            await _raise_if_execute_stop_requested(task_id)
-            if total <= 0:
-                return
+        async def report_progress(done: int, total: int):
             percent = int(done / total * 100)
             task.execute_message = f"导入执行中: 已执行 {done}/{total} 条SQL"
             await task.save(update_fields=["execute_message"])
             logger.info(f"导入执行进度: task_id={task_id}, {done}/{total}, {percent}%")
 
+        progress_cb = ThrottledProgressReporter(
+            on_report=report_progress,
+            stop_check=lambda: _raise_if_execute_stop_requested(task_id),
+        )
         result = await execute_sql_on_connection(task.target_conn_id, sql_text, progress_cb=progress_cb)
         await _raise_if_execute_stop_requested(task_id)
         task.execute_status = "success"
@@ -407,3 +412,42 @@ async def _mark_task_manual_stopped(task_id: int, target: str):
         "process_celery_task_id",
         "completed_at",
     ])
+
+
+async def backfill_imptask_metadata(batch_size: int = 100) -> int:
+    """
+    回填历史任务的生成元数据（临时表名、列信息）
+
+    仅处理已生成SQL文件但缺少 temp_table_name 的任务，逐个读取SQL文件头部解析，幂等可重复执行。
+    历史任务无法还原数据行数，row_count 保持为空。
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = await (
+            ImpTask.filter(id__gt=last_id, temp_table_name__isnull=True, sql_file_path__isnull=False)
+            .order_by("id")
+            .limit(batch_size)
+            .values_list("id", "sql_file_path")
+        )
+        if not rows:
+            break
+        for task_id, sql_file_path in rows:
+            last_id = task_id
+            if not os.path.exists(sql_file_path):
+                continue
+            try:
+                meta = await asyncio.to_thread(read_sql_file_meta, sql_file_path)
+            except Exception as e:
+                logger.warning(f"回填导入任务元数据失败: task_id={task_id}, error={e}")
+                continue
+            if not meta:
+                continue
+            await ImpTask.filter(id=task_id).update(
+                temp_table_name=meta["table_name"],
+                columns_meta=meta["columns_meta"],
+            )
+            updated += 1
+    if updated:
+        logger.info(f"导入任务元数据回填完成: {updated} 条")
+    return updated
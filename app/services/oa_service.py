@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import Sequence
 from datetime import datetime
 from typing import Any
@@ -6,13 +7,76 @@ import aiomysql
 
 from app.models.conn import DBConnection
 from app.services.db_pool import db_pool
+from app.utils.batch_lookup import chunked
 
 OA_CONN_ALIAS = "OA_CONN"
 FCC_CONN_ALIAS = "FCC_CONN"
 
+# IN 列表分块大小；SQL Server 单条语句最多 2100 个参数（含 SET 的时间参数）
+OA_CHUNK_SIZE = 1000
+FCC_CHUNK_SIZE = 2000
+
+# 转正时间相关的OA表：(表名, 查询SQL模板)，{placeholders} 为人员Id的IN列表
+OA_POSITIVE_TIME_QUERIES = (
+    (
+        "check_userbaseinfo",
+        "SELECT Id AS user_id, PositiveTime AS positive_time "
+        "FROM oa_hrcenter.check_userbaseinfo "
+        "WHERE Id IN ({placeholders})",
+    ),
+    (
+        "check_userinfobyday",
+        "SELECT Id AS user_id, PositiveTime AS positive_time "
+        "FROM oa_hrcenter.check_userinfobyday "
+        "WHERE Id IN ({placeholders})",
+    ),
+    (
+        "membership_userbaseinfo",
+        "SELECT Id AS user_id, PositiveTime AS positive_time "
+        "FROM oa_hrcenter.membership_userbaseinfo "
+        "WHERE Id IN ({placeholders}) AND Deleted=0",
+    ),
+    (
+        "membership_positiveconfirm",
+        "SELECT UserBaseInfoId AS user_id, "
+        "JSON_UNQUOTE(JSON_EXTRACT(PositiveJSON, '$.PositiveTime')) AS positive_time "
+        "FROM membership_positiveconfirm "
+        "WHERE UserBaseInfoId IN ({placeholders})",
+    ),
+)
+
+# 入职时间相关的OA表：(表名, 查询SQL模板, IN 列表按人员Id还是工号)
+OA_ENTRY_TIME_QUERIES = (
+    (
+        "membership_userbaseinfo",
+        "SELECT Id AS user_id, Code AS code, EntryTime AS entry_time "
+        "FROM oa_hrcenter.membership_userbaseinfo "
+        "WHERE Id IN ({placeholders}) AND Deleted=0",
+        "id",
+    ),
+    (
+        "check_userinfobyday",
+        "SELECT Id AS user_id, Code AS code, EntryTime AS entry_time "
+        "FROM oa_hrcenter.check_userinfobyday "
+        "WHERE Id IN ({placeholders})",
+        "id",
+    ),
+    (
+        "tb_entryinfo",
+        "SELECT Id AS user_id, Code AS code, EntryTime AS entry_time "
+        "FROM oa_hrcenter.tb_entryinfo "
+        "WHERE Code IN ({placeholders}) AND Deleted=0",
+        "code",
+    ),
+)
+
 
 class OAPositiveTimeService:
-    """OA转正时间维护服务"""
+    """OA转正时间维护服务
+
+    OA（MySQL）与FCC（SQL Server）两侧互不依赖，读写均通过 asyncio.gather 并发；
+    OA 各表的读取分别占用独立的池连接，写入按 IN 列表分块、每个库一个事务。
+    """
 
     async def validate_positive_time(self, codes: Sequence[str]) -> dict[str, Any]:
         normalized_codes = self._normalize_codes(codes)
@@ -22,8 +86,10 @@ class OAPositiveTimeService:
         oa_conn_id = await self._get_conn_id(OA_CONN_ALIAS, "mysql")
         fcc_conn_id = await self._get_conn_id(FCC_CONN_ALIAS, "sqlserver")
 
-        oa_rows, not_found_codes = await self._fetch_oa_positive_times(oa_conn_id, normalized_codes)
-        fcc_rows = await self._fetch_fcc_positive_times(fcc_conn_id, normalized_codes)
+        (oa_rows, not_found_codes), fcc_rows = await asyncio.gather(
+            self._fetch_oa_positive_times(oa_conn_id, normalized_codes),
+            self._fetch_fcc_positive_times(fcc_conn_id, normalized_codes),
+        )
 
         return {
             "codes": normalized_codes,
@@ -46,7 +112,8 @@ class OAPositiveTimeService:
         oa_users = await self._fetch_oa_users(oa_conn_id, normalized_codes)
         user_ids = [row["Id"] for row in oa_users]
         found_codes = [row["Code"] for row in oa_users]
-        not_found_codes = [code for code in normalized_codes if code not in set(found_codes)]
+        found_code_set = set(found_codes)
+        not_found_codes = [code for code in normalized_codes if code not in found_code_set]
 
         if not user_ids:
             raise ValueError("未在OA库找到可修改的人员")
@@ -54,8 +121,10 @@ class OAPositiveTimeService:
         mysql_time = positive_time.strftime("%Y-%m-%d %H:%M:%S")
         json_time = positive_time.strftime("%Y-%m-%dT%H:%M:%S")
 
-        oa_affected = await self._update_oa_positive_time(oa_conn_id, user_ids, mysql_time, json_time)
-        fcc_affected = await self._update_fcc_positive_time(fcc_conn_id, found_codes, mysql_time)
+        oa_affected, fcc_affected = await self._update_both(
+            self._update_oa_positive_time(oa_conn_id, user_ids, mysql_time, json_time),
+            self._update_fcc_positive_time(fcc_conn_id, found_codes, mysql_time),
+        )
         validation = await self.validate_positive_time(normalized_codes)
 
         return {
@@ -75,8 +144,10 @@ class OAPositiveTimeService:
         oa_conn_id = await self._get_conn_id(OA_CONN_ALIAS, "mysql")
         fcc_conn_id = await self._get_conn_id(FCC_CONN_ALIAS, "sqlserver")
 
-        oa_rows, not_found_codes = await self._fetch_oa_entry_times(oa_conn_id, normalized_codes)
-        fcc_rows = await self._fetch_fcc_entry_times(fcc_conn_id, normalized_codes)
+        (oa_rows, not_found_codes), fcc_rows = await asyncio.gather(
+            self._fetch_oa_entry_times(oa_conn_id, normalized_codes),
+            self._fetch_fcc_entry_times(fcc_conn_id, normalized_codes),
+        )
 
         return {
             "codes": normalized_codes,
@@ -99,7 +170,8 @@ class OAPositiveTimeService:
         oa_users = await self._fetch_oa_users(oa_conn_id, normalized_codes)
         user_ids = [row["Id"] for row in oa_users]
         found_codes = [row["Code"] for row in oa_users]
-        not_found_codes = [code for code in normalized_codes if code not in set(found_codes)]
+        found_code_set = set(found_codes)
+        not_found_codes = [code for code in normalized_codes if code not in found_code_set]
 
         if not user_ids:
             raise ValueError("未在OA库找到可修改的人员")
@@ -107,8 +179,10 @@ class OAPositiveTimeService:
         mysql_time = entry_time.strftime("%Y-%m-%d %H:%M:%S")
         date_value = entry_time.strftime("%Y-%m-%d")
 
-        oa_affected = await self._update_oa_entry_time(oa_conn_id, user_ids, found_codes, mysql_time, date_value)
-        fcc_affected = await self._update_fcc_entry_time(fcc_conn_id, found_codes, mysql_time)
+        oa_affected, fcc_affected = await self._update_both(
+            self._update_oa_entry_time(oa_conn_id, user_ids, found_codes, mysql_time, date_value),
+            self._update_fcc_entry_time(fcc_conn_id, found_codes, mysql_time),
+        )
         validation = await self.validate_entry_time(normalized_codes)
 
         return {
@@ -142,22 +216,46 @@ class OAPositiveTimeService:
     def _sqlserver_in_clause(self, values: Sequence[Any]) -> str:
         return ",".join(["?"] * len(values))
 
-    async def _fetch_oa_users(self, conn_id: int, codes: Sequence[str]) -> list[dict[str, Any]]:
+    async def _get_oa_pool(self, conn_id: int) -> aiomysql.Pool:
         await db_pool.ensure_pool(conn_id)
         pool = db_pool.get_pool(conn_id)
         if not isinstance(pool, aiomysql.Pool):
             raise ValueError("OA_CONN 必须是 MySQL 连接")
+        return pool
+
+    async def _get_fcc_pool(self, conn_id: int):
+        await db_pool.ensure_pool(conn_id)
+        pool = db_pool.get_pool(conn_id)
+        if pool is None:
+            raise ValueError("FCC_CONN 连接池不存在")
+        return pool
+
+    async def _query_oa_chunked(self, pool: aiomysql.Pool, sql: str, values: Sequence[Any]) -> list[dict[str, Any]]:
+        """在一个独立的池连接上按 IN 列表分块执行查询"""
+        rows: list[dict[str, Any]] = []
+        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cur:
+            for chunk in chunked(values, OA_CHUNK_SIZE):
+                await cur.execute(sql.format(placeholders=self._mysql_in_clause(chunk)), tuple(chunk))
+                rows.extend(await cur.fetchall() or [])
+        return rows
+
+    async def _query_fcc_chunked(self, pool, sql: str, values: Sequence[Any]) -> list[dict[str, Any]]:
+        rows: list[dict[str, Any]] = []
+        async with pool.acquire() as conn, conn.cursor() as cur:
+            for chunk in chunked(values, FCC_CHUNK_SIZE):
+                await cur.execute(sql.format(placeholders=self._sqlserver_in_clause(chunk)), tuple(chunk))
+                columns = [col[0] for col in cur.description]
+                rows.extend(dict(zip(columns, row)) for row in await cur.fetchall())
+        return rows
 
-        placeholders = self._mysql_in_clause(codes)
+    async def _fetch_oa_users(self, conn_id: int, codes: Sequence[str]) -> list[dict[str, Any]]:
+        pool = await self._get_oa_pool(conn_id)
         sql = (
             "SELECT Id, Code, PositiveTime "
             "FROM oa_hrcenter.membership_userbaseinfo "
-            f"WHERE Code IN ({placeholders}) AND Deleted=0"
+            "WHERE Code IN ({placeholders}) AND Deleted=0"
         )
-        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cur:
-            await cur.execute(sql, tuple(codes))
-            rows = await cur.fetchall()
-        return list(rows or [])
+        return await self._query_oa_chunked(pool, sql, codes)
 
     async def _fetch_oa_positive_times(self, conn_id: int, codes: Sequence[str]) -> tuple[list[dict[str, Any]], list[str]]:
         users = await self._fetch_oa_users(conn_id, codes)
@@ -168,57 +266,27 @@ class OAPositiveTimeService:
         if not user_ids:
             return [], not_found_codes
 
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if not isinstance(pool, aiomysql.Pool):
-            raise ValueError("OA_CONN 必须是 MySQL 连接")
-
-        id_placeholders = self._mysql_in_clause(user_ids)
-        queries = [
-            (
-                "check_userbaseinfo",
-                "SELECT Id AS user_id, PositiveTime AS positive_time "
-                "FROM oa_hrcenter.check_userbaseinfo "
-                f"WHERE Id IN ({id_placeholders})",
-            ),
-            (
-                "check_userinfobyday",
-                "SELECT Id AS user_id, PositiveTime AS positive_time "
-                "FROM oa_hrcenter.check_userinfobyday "
-                f"WHERE Id IN ({id_placeholders})",
-            ),
-            (
-                "membership_userbaseinfo",
-                "SELECT Id AS user_id, PositiveTime AS positive_time "
-                "FROM oa_hrcenter.membership_userbaseinfo "
-                f"WHERE Id IN ({id_placeholders}) AND Deleted=0",
-            ),
-            (
-                "membership_positiveconfirm",
-                "SELECT UserBaseInfoId AS user_id, "
-                "JSON_UNQUOTE(JSON_EXTRACT(PositiveJSON, '$.PositiveTime')) AS positive_time "
-                "FROM membership_positiveconfirm "
-                f"WHERE UserBaseInfoId IN ({id_placeholders})",
-            ),
-        ]
+        pool = await self._get_oa_pool(conn_id)
+        # 各表查询互不依赖，分别占用独立连接并发执行
+        results = await asyncio.gather(
+            *(self._query_oa_chunked(pool, sql, user_ids) for _, sql in OA_POSITIVE_TIME_QUERIES)
+        )
 
         code_by_id = {row["Id"]: row["Code"] for row in users}
         rows: list[dict[str, Any]] = []
         seen_tables_by_user_id: dict[str, set[str]] = {user_id: set() for user_id in user_ids}
-        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cur:
-            for table_name, sql in queries:
-                await cur.execute(sql, tuple(user_ids))
-                for row in await cur.fetchall():
-                    seen_tables_by_user_id.setdefault(row["user_id"], set()).add(table_name)
-                    rows.append(
-                        {
-                            "source": "OA",
-                            "table": table_name,
-                            "code": code_by_id.get(row["user_id"]),
-                            "user_id": row["user_id"],
-                            "positive_time": self._format_value(row.get("positive_time")),
-                        }
-                    )
+        for (table_name, _), table_rows in zip(OA_POSITIVE_TIME_QUERIES, results):
+            for row in table_rows:
+                seen_tables_by_user_id.setdefault(row["user_id"], set()).add(table_name)
+                rows.append(
+                    {
+                        "source": "OA",
+                        "table": table_name,
+                        "code": code_by_id.get(row["user_id"]),
+                        "user_id": row["user_id"],
+                        "positive_time": self._format_value(row.get("positive_time")),
+                    }
+                )
         for user_id in user_ids:
             if "membership_positiveconfirm" not in seen_tables_by_user_id.get(user_id, set()):
                 rows.append(
@@ -233,117 +301,115 @@ class OAPositiveTimeService:
         return rows, not_found_codes
 
     async def _fetch_fcc_positive_times(self, conn_id: int, codes: Sequence[str]) -> list[dict[str, Any]]:
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if pool is None:
-            raise ValueError("FCC_CONN 连接池不存在")
-
-        placeholders = self._sqlserver_in_clause(codes)
+        pool = await self._get_fcc_pool(conn_id)
         sql = (
             "SELECT Id, Code, PositiveTime "
             "FROM MemberShip_UserBaseInfo "
-            f"WHERE Code IN ({placeholders}) AND Deleted=0"
+            "WHERE Code IN ({placeholders}) AND Deleted=0"
         )
-        rows: list[dict[str, Any]] = []
-        async with pool.acquire() as conn, conn.cursor() as cur:
-            await cur.execute(sql, tuple(codes))
-            columns = [col[0] for col in cur.description]
-            for row in await cur.fetchall():
-                data = dict(zip(columns, row))
-                rows.append(
-                    {
-                        "source": "FCC",
-                        "table": "MemberShip_UserBaseInfo",
-                        "code": data.get("Code"),
-                        "user_id": self._format_value(data.get("Id")),
-                        "positive_time": self._format_value(data.get("PositiveTime")),
-                    }
-                )
-        return rows
+        return [
+            {
+                "source": "FCC",
+                "table": "MemberShip_UserBaseInfo",
+                "code": data.get("Code"),
+                "user_id": self._format_value(data.get("Id")),
+                "positive_time": self._format_value(data.get("PositiveTime")),
+            }
+            for data in await self._query_fcc_chunked(pool, sql, codes)
+        ]
 
     async def _fetch_oa_entry_times(self, conn_id: int, codes: Sequence[str]) -> tuple[list[dict[str, Any]], list[str]]:
         users = await self._fetch_oa_users(conn_id, codes)
         user_ids = [row["Id"] for row in users]
-        found_codes = {row["Code"] for row in users}
-        not_found_codes = [code for code in codes if code not in found_codes]
+        found_codes = list(dict.fromkeys(row["Code"] for row in users))
+        found_code_set = set(found_codes)
+        not_found_codes = [code for code in codes if code not in found_code_set]
         if not user_ids:
             return [], not_found_codes
 
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if not isinstance(pool, aiomysql.Pool):
-            raise ValueError("OA_CONN 必须是 MySQL 连接")
-
-        id_placeholders = self._mysql_in_clause(user_ids)
-        code_placeholders = self._mysql_in_clause(found_codes)
-        queries = [
-            (
-                "membership_userbaseinfo",
-                "SELECT Id AS user_id, Code AS code, EntryTime AS entry_time "
-                "FROM oa_hrcenter.membership_userbaseinfo "
-                f"WHERE Id IN ({id_placeholders}) AND Deleted=0",
-                tuple(user_ids),
-            ),
-            (
-                "check_userinfobyday",
-                "SELECT Id AS user_id, Code AS code, EntryTime AS entry_time "
-                "FROM oa_hrcenter.check_userinfobyday "
-                f"WHERE Id IN ({id_placeholders})",
-                tuple(user_ids),
-            ),
-            (
-                "tb_entryinfo",
-                "SELECT Id AS user_id, Code AS code, EntryTime AS entry_time "
-                "FROM oa_hrcenter.tb_entryinfo "
-                f"WHERE Code IN ({code_placeholders}) AND Deleted=0",
-                tuple(found_codes),
-            ),
-        ]
+        pool = await self._get_oa_pool(conn_id)
+        results = await asyncio.gather(
+            *(
+                self._query_oa_chunked(pool, sql, user_ids if key == "id" else found_codes)
+                for _, sql, key in OA_ENTRY_TIME_QUERIES
+            )
+        )
 
         rows: list[dict[str, Any]] = []
-        async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cur:
-            for table_name, sql, params in queries:
-                await cur.execute(sql, params)
-                for row in await cur.fetchall():
-                    rows.append(
-                        {
-                            "source": "OA",
-                            "table": table_name,
-                            "code": row.get("code"),
-                            "user_id": row.get("user_id"),
-                            "entry_time": self._format_value(row.get("entry_time")),
-                        }
-                    )
+        for (table_name, _, _), table_rows in zip(OA_ENTRY_TIME_QUERIES, results):
+            for row in table_rows:
+                rows.append(
+                    {
+                        "source": "OA",
+                        "table": table_name,
+                        "code": row.get("code"),
+                        "user_id": row.get("user_id"),
+                        "entry_time": self._format_value(row.get("entry_time")),
+                    }
+                )
         return rows, not_found_codes
 
     async def _fetch_fcc_entry_times(self, conn_id: int, codes: Sequence[str]) -> list[dict[str, Any]]:
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if pool is None:
-            raise ValueError("FCC_CONN 连接池不存在")
-
-        placeholders = self._sqlserver_in_clause(codes)
+        pool = await self._get_fcc_pool(conn_id)
         sql = (
             "SELECT Id, Code, EntryTime "
             "FROM MemberShip_UserBaseInfo "
-            f"WHERE Code IN ({placeholders}) AND Deleted=0"
+            "WHERE Code IN ({placeholders}) AND Deleted=0"
         )
-        rows: list[dict[str, Any]] = []
+        return [
+            {
+                "source": "FCC",
+                "table": "MemberShip_UserBaseInfo",
+                "code": data.get("Code"),
+                "user_id": self._format_value(data.get("Id")),
+                "entry_time": self._format_value(data.get("EntryTime")),
+            }
+            for data in await self._query_fcc_chunked(pool, sql, codes)
+        ]
+
+    async def _apply_oa_updates(
+        self,
+        pool: aiomysql.Pool,
+        statements: Sequence[tuple[str, str, Any, Sequence[Any]]],
+    ) -> dict[str, int]:
+        """在一个事务内按 IN 列表分块执行各表更新，返回每表影响行数
+
+        statements 为 (表名, SQL模板, SET参数, IN列表取值)。
+        """
+        affected: dict[str, int] = {}
         async with pool.acquire() as conn, conn.cursor() as cur:
-            await cur.execute(sql, tuple(codes))
-            columns = [col[0] for col in cur.description]
-            for row in await cur.fetchall():
-                data = dict(zip(columns, row))
-                rows.append(
-                    {
-                        "source": "FCC",
-                        "table": "MemberShip_UserBaseInfo",
-                        "code": data.get("Code"),
-                        "user_id": self._format_value(data.get("Id")),
-                        "entry_time": self._format_value(data.get("EntryTime")),
-                    }
-                )
-        return rows
+            try:
+                await conn.begin()
+                for table_name, sql, value, keys in statements:
+                    affected[table_name] = 0
+                    for chunk in chunked(keys, OA_CHUNK_SIZE):
+                        await cur.execute(
+                            sql.format(placeholders=self._mysql_in_clause(chunk)),
+                            tuple([value, *chunk]),
+                        )
+                        affected[table_name] += cur.rowcount or 0
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+        return affected
+
+    async def _apply_fcc_update(self, pool, sql: str, value: Any, codes: Sequence[str]) -> int:
+        """在一个事务内按 IN 列表分块执行FCC更新，返回影响行数"""
+        affected = 0
+        async with pool.acquire() as conn, conn.cursor() as cur:
+            try:
+                for chunk in chunked(codes, FCC_CHUNK_SIZE):
+                    await cur.execute(
+                        sql.format(placeholders=self._sqlserver_in_clause(chunk)),
+                        tuple([value, *chunk]),
+                    )
+                    affected += cur.rowcount or 0
+                await conn.commit()
+                return affected
+            except BaseException:
+                await conn.rollback()
+                raise
 
     async def _update_oa_positive_time(
         self,
@@ -352,73 +418,47 @@ class OAPositiveTimeService:
         mysql_time: str,
         json_time: str,
     ) -> dict[str, int]:
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if not isinstance(pool, aiomysql.Pool):
-            raise ValueError("OA_CONN 必须是 MySQL 连接")
-
-        placeholders = self._mysql_in_clause(user_ids)
+        pool = await self._get_oa_pool(conn_id)
         statements = [
             (
                 "check_userbaseinfo",
-                f"UPDATE oa_hrcenter.check_userbaseinfo SET PositiveTime=%s WHERE Id IN ({placeholders})",
-                tuple([mysql_time, *user_ids]),
+                "UPDATE oa_hrcenter.check_userbaseinfo SET PositiveTime=%s WHERE Id IN ({placeholders})",
+                mysql_time,
+                user_ids,
             ),
             (
                 "check_userinfobyday",
-                f"UPDATE oa_hrcenter.check_userinfobyday SET PositiveTime=%s WHERE Id IN ({placeholders})",
-                tuple([mysql_time, *user_ids]),
+                "UPDATE oa_hrcenter.check_userinfobyday SET PositiveTime=%s WHERE Id IN ({placeholders})",
+                mysql_time,
+                user_ids,
             ),
             (
                 "membership_userbaseinfo",
-                f"UPDATE oa_hrcenter.membership_userbaseinfo SET PositiveTime=%s WHERE Id IN ({placeholders}) AND Deleted=0",
-                tuple([mysql_time, *user_ids]),
+                "UPDATE oa_hrcenter.membership_userbaseinfo SET PositiveTime=%s WHERE Id IN ({placeholders}) AND Deleted=0",
+                mysql_time,
+                user_ids,
             ),
             (
                 "membership_positiveconfirm",
                 "UPDATE membership_positiveconfirm "
                 "SET PositiveJSON = JSON_SET(PositiveJSON, '$.PositiveTime', %s) "
-                f"WHERE UserBaseInfoId IN ({placeholders})",
-                tuple([json_time, *user_ids]),
+                "WHERE UserBaseInfoId IN ({placeholders})",
+                json_time,
+                user_ids,
             ),
         ]
-
-        affected: dict[str, int] = {}
-        async with pool.acquire() as conn, conn.cursor() as cur:
-            try:
-                await conn.begin()
-                for table_name, sql, params in statements:
-                    await cur.execute(sql, params)
-                    affected[table_name] = cur.rowcount or 0
-                await conn.commit()
-            except Exception:
-                await conn.rollback()
-                raise
-        return affected
+        return await self._apply_oa_updates(pool, statements)
 
     async def _update_fcc_positive_time(self, conn_id: int, codes: Sequence[str], positive_time: str) -> int:
         if not codes:
             return 0
 
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if pool is None:
-            raise ValueError("FCC_CONN 连接池不存在")
-
-        placeholders = self._sqlserver_in_clause(codes)
+        pool = await self._get_fcc_pool(conn_id)
         sql = (
             "UPDATE MemberShip_UserBaseInfo "
-            f"SET PositiveTime=? WHERE Code IN ({placeholders}) AND Deleted=0"
+            "SET PositiveTime=? WHERE Code IN ({placeholders}) AND Deleted=0"
         )
-        async with pool.acquire() as conn, conn.cursor() as cur:
-            try:
-                await cur.execute(sql, tuple([positive_time, *codes]))
-                affected = cur.rowcount or 0
-                await conn.commit()
-                return affected
-            except Exception:
-                await conn.rollback()
-                raise
+        return await self._apply_fcc_update(pool, sql, positive_time, codes)
 
     async def _update_oa_entry_time(
         self,
@@ -428,67 +468,59 @@ class OAPositiveTimeService:
         mysql_time: str,
         date_value: str,
     ) -> dict[str, int]:
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if not isinstance(pool, aiomysql.Pool):
-            raise ValueError("OA_CONN 必须是 MySQL 连接")
-
-        id_placeholders = self._mysql_in_clause(user_ids)
-        code_placeholders = self._mysql_in_clause(codes)
+        pool = await self._get_oa_pool(conn_id)
         statements = [
             (
                 "membership_userbaseinfo",
-                f"UPDATE oa_hrcenter.membership_userbaseinfo SET EntryTime=%s WHERE Id IN ({id_placeholders}) AND Deleted=0",
-                tuple([mysql_time, *user_ids]),
+                "UPDATE oa_hrcenter.membership_userbaseinfo SET EntryTime=%s WHERE Id IN ({placeholders}) AND Deleted=0",
+                mysql_time,
+                user_ids,
             ),
             (
                 "check_userinfobyday",
-                f"UPDATE oa_hrcenter.check_userinfobyday SET EntryTime=%s WHERE Id IN ({id_placeholders})",
-                tuple([mysql_time, *user_ids]),
+                "UPDATE oa_hrcenter.check_userinfobyday SET EntryTime=%s WHERE Id IN ({placeholders})",
+                mysql_time,
+                user_ids,
             ),
             (
                 "tb_entryinfo",
-                f"UPDATE oa_hrcenter.tb_entryinfo SET EntryTime=%s WHERE Code IN ({code_placeholders}) AND Deleted=0",
-                tuple([date_value, *codes]),
+                "UPDATE oa_hrcenter.tb_entryinfo SET EntryTime=%s WHERE Code IN ({placeholders}) AND Deleted=0",
+                date_value,
+                codes,
             ),
         ]
-
-        affected: dict[str, int] = {}
-        async with pool.acquire() as conn, conn.cursor() as cur:
-            try:
-                await conn.begin()
-                for table_name, sql, params in statements:
-                    await cur.execute(sql, params)
-                    affected[table_name] = cur.rowcount or 0
-                await conn.commit()
-            except Exception:
-                await conn.rollback()
-                raise
-        return affected
+        return await self._apply_oa_updates(pool, statements)
 
     async def _update_fcc_entry_time(self, conn_id: int, codes: Sequence[str], entry_time: str) -> int:
         if not codes:
             return 0
 
-        await db_pool.ensure_pool(conn_id)
-        pool = db_pool.get_pool(conn_id)
-        if pool is None:
-            raise ValueError("FCC_CONN 连接池不存在")
-
-        placeholders = self._sqlserver_in_clause(codes)
+        pool = await self._get_fcc_pool(conn_id)
         sql = (
             "UPDATE MemberShip_UserBaseInfo "
-            f"SET EntryTime=? WHERE Code IN ({placeholders}) AND Deleted=0"
+            "SET EntryTime=? WHERE Code IN ({placeholders}) AND Deleted=0"
         )
-        async with pool.acquire() as conn, conn.cursor() as cur:
-            try:
-                await cur.execute(sql, tuple([entry_time, *codes]))
-                affected = cur.rowcount or 0
-                await conn.commit()
-                return affected
-            except Exception:
-                await conn.rollback()
-                raise
+        return await self._apply_fcc_update(pool, sql, entry_time, codes)
+
+    async def _update_both(self, oa_update, fcc_update) -> tuple[dict[str, int], int]:
+        """
+        并发执行OA与FCC的更新（两库各自独立事务），等待两边都结束后再返回
+
+        任一边失败时抛出 ValueError，说明两边各自是已提交还是已回滚，便于人工核对补偿
+        """
+        oa_result, fcc_result = await asyncio.gather(oa_update, fcc_update, return_exceptions=True)
+        errors = [r for r in (oa_result, fcc_result) if isinstance(r, BaseException)]
+        if errors:
+            raise ValueError(
+                f"OA库{self._describe_update(oa_result)}；FCC库{self._describe_update(fcc_result)}"
+            ) from errors[0]
+        return oa_result, fcc_result
+
+    def _describe_update(self, result: dict[str, int] | int | BaseException) -> str:
+        if isinstance(result, BaseException):
+            return f"更新失败（已回滚）: {result}"
+        affected = sum(result.values()) if isinstance(result, dict) else result
+        return f"已提交（影响 {affected} 行）"
 
     def _merge_rows(
         self,
@@ -0,0 +1,81 @@
+"""
+节流进度上报器 - 合并高频进度回调，避免每条SQL都写库/写盘
+"""
+import time
+from collections.abc import Awaitable, Callable
+
+ReportCallback = Callable[[int, int], Awaitable[None]]
+StopCheckCallback = Callable[[], Awaitable[None]]
+
+DEFAULT_MIN_INTERVAL = 1.0
+DEFAULT_PERCENT_STEP = 5
+DEFAULT_STOP_CHECK_INTERVAL = 2.0
+
+
+class ThrottledProgressReporter:
+    """
+    按时间间隔或百分比步长合并进度更新。
+
+    实例本身可直接作为 execute_sql_on_connection 的 progress_cb 使用：
+    - 距上次上报超过 min_interval 秒、进度跨过 percent_step 个百分点或执行完毕时才调用 on_report
+    - 停止标记检查按 stop_check_interval 秒节流，stop_check 通过抛异常中断执行
+    """
+
+    def __init__(
+        self,
+        on_report: ReportCallback,
+        stop_check: StopCheckCallback | None = None,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        percent_step: int = DEFAULT_PERCENT_STEP,
+        stop_check_interval: float = DEFAULT_STOP_CHECK_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.on_report = on_report
+        self.stop_check = stop_check
+        self.min_interval = min_interval
+        self.percent_step = percent_step
+        self.stop_check_interval = stop_check_interval
+        self._clock = clock
+        self._last_report_at: float | None = None
+        self._last_stop_check_at: float | None = None
+        self._last_percent = -1
+        self._pending: tuple[int, int] | None = None
+        self.report_count = 0
+
+    async def __call__(self, done: int, total: int, _stmt: str = ""):
+        await self.update(done, total)
+
+    async def update(self, done: int, total: int):
+        now = self._clock()
+        if self.stop_check and (
+            self._last_stop_check_at is None or now - self._last_stop_check_at >= self.stop_check_interval
+        ):
+            self._last_stop_check_at = now
+            await self.stop_check()
+
+        self._pending = (done, total)
+        if total <= 0:
+            return
+
+        percent = int(done / total * 100)
+        finished = done >= total
+        interval_elapsed = self._last_report_at is None or now - self._last_report_at >= self.min_interval
+        step_crossed = percent - self._last_percent >= self.percent_step
+        if finished or interval_elapsed or step_crossed:
+            await self._report(done, total, percent, now)
+
+    async def flush(self):
+        """把最后一次未上报的进度写出（用于异常/中断前收尾）。"""
+        if not self._pending:
+            return
+        done, total = self._pending
+        if total <= 0:
+            return
+        await self._report(done, total, int(done / total * 100), self._clock())
+
+    async def _report(self, done: int, total: int, percent: int, now: float):
+        self._pending = None
+        self._last_report_at = now
+        self._last_percent = percent
+        self.report_count += 1
+        await self.on_report(done, total)
@@ -0,0 +1,320 @@
+"""
+任务进度存储 - Redis 哈希（跨主机共享）、JSON 文件（同一主机跨进程共享）或进程内存（带TTL清理）
+
+Redis 与文件后端的读写是阻塞 I/O，协程中应使用 ProgressStore 的 a* 异步方法（在线程中执行）
+"""
+import asyncio
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境：仅进程内加锁
+    fcntl = None
+
+from app.log import logger
+from app.settings.config import settings
+
+KEY_PREFIX = "dbadmin:progress"
+MEMORY_PURGE_INTERVAL = 60
+
+
+class MemoryProgressBackend:
+    """进程内存进度存储，写入时按间隔清理过期记录。"""
+
+    name = "memory"
+    shared = False
+    blocking = False
+
+    def __init__(self):
+        self._data: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._last_purge_at = 0.0
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            item = self._data.get(key)
+            if not item:
+                return None
+            expires_at, data = item
+            if expires_at <= time.time():
+                self._data.pop(key, None)
+                return None
+            return dict(data)
+
+    def update(self, key: str, fields: dict[str, Any], ttl: int, replace: bool = False):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            data = {} if replace or not item or item[0] <= now else item[1]
+            data.update(fields)
+            self._data[key] = (now + ttl, data)
+            if now - self._last_purge_at >= MEMORY_PURGE_INTERVAL:
+                self._purge_expired(now)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _purge_expired(self, now: float):
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at <= now]
+        for k in expired:
+            self._data.pop(k, None)
+        self._last_purge_at = now
+
+
+class RedisProgressBackend:
+    """Redis 哈希进度存储，每个字段单独 JSON 编码，支持局部更新。"""
+
+    name = "redis"
+    shared = True
+    blocking = True
+
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        raw = self._client.hgetall(key)
+        if not raw:
+            return None
+        return {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in raw.items()
+        }
+
+    def update(self, key: str, fields: dict[str, Any], ttl: int, replace: bool = False):
+        mapping = {k: json.dumps(v, ensure_ascii=False, default=str) for k, v in fields.items()}
+        pipe = self._client.pipeline(transaction=True)
+        if replace:
+            pipe.delete(key)
+        if mapping:
+            pipe.hset(key, mapping=mapping)
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+
+class FileProgressBackend:
+    """
+    JSON 文件进度存储（每个键一个文件），同一主机上的 Web 进程与 Celery Worker 均可见
+
+    读写在文件锁（flock）下进行，局部更新不会与其他进程的写入互相覆盖；写入时按间隔清理过期文件。
+    """
+
+    name = "file"
+    shared = True
+    blocking = True
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_purge_at = 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]", "_", key) + ".json")
+
+    @contextlib.contextmanager
+    def _open_locked(self, path: str, mode: str, exclusive: bool):
+        with self._lock, open(path, mode, encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield f
+
+    @staticmethod
+    def _load(f, now: float) -> dict[str, Any] | None:
+        f.seek(0)
+        text = f.read()
+        if not text:
+            return None
+        item = json.loads(text)
+        if item.get("expires_at", 0) <= now:
+            return None
+        return item.get("data") or {}
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        try:
+            with self._open_locked(self._path(key), "r", exclusive=False) as f:
+                return self._load(f, time.time())
+        except FileNotFoundError:
+            return None
+
+    def update(self, key: str, fields: dict[str, Any], ttl: int, replace: bool = False):
+        now = time.time()
+        with self._open_locked(self._path(key), "a+", exclusive=True) as f:
+            data = {} if replace else (self._load(f, now) or {})
+            data.update(fields)
+            f.seek(0)
+            f.truncate()
+            json.dump({"expires_at": now + ttl, "data": data}, f, ensure_ascii=False, default=str)
+        if now - self._last_purge_at >= MEMORY_PURGE_INTERVAL:
+            self._purge_expired(now)
+
+    def delete(self, key: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(key))
+
+    def _purge_expired(self, now: float):
+        self._last_purge_at = now
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    expired = json.load(f).get("expires_at", 0) <= now
+            except (OSError, ValueError):
+                continue
+            if expired:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+
+
+ProgressBackend = MemoryProgressBackend | RedisProgressBackend | FileProgressBackend
+
+_backend: ProgressBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def _create_redis_backend() -> RedisProgressBackend | None:
+    if not settings.REDIS_URL:
+        return None
+    try:
+        import redis  # type: ignore
+
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=2)
+        client.ping()
+        return RedisProgressBackend(client)
+    except Exception as exc:
+        logger.warning(f"[进度存储] Redis不可用，回退进程内存存储: {exc}")
+        return None
+
+
+def get_progress_backend() -> ProgressBackend:
+    """
+    按配置选择进度存储后端（进程内单例）
+
+    auto/redis 模式下 Redis 不可用时回退到文件存储，保证同一主机的多个 Worker 仍能看到彼此的进度；
+    进程内存仅在显式配置 memory 时使用。
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            mode = (settings.PROGRESS_STORE_BACKEND or "auto").lower()
+            backend = _create_redis_backend() if mode in ("auto", "redis") else None
+            if backend is None and mode == "redis":
+                logger.error("[进度存储] 已配置使用Redis但连接失败，回退文件存储，仅同一主机内的进程可见")
+            if backend is None and mode != "memory":
+                backend = FileProgressBackend(settings.PROGRESS_STORE_FILE_DIR)
+            _backend = backend or MemoryProgressBackend()
+            logger.info(f"[进度存储] 使用后端: {_backend.name}")
+            if not _backend.shared and settings.SERVER_WORKERS > 1:
+                logger.warning(
+                    f"[进度存储] server.workers={settings.SERVER_WORKERS} 但使用进程内存存储："
+                    "任务进度与缓存失效版本号不跨Worker共享，其他Worker的权限/Token缓存需等待TTL过期才会刷新"
+                )
+    return _backend
+
+
+class ProgressStore:
+    """
+    按命名空间隔离的任务进度存储
+
+    存储异常只记录日志不向上抛出，进度写入失败不应中断业务任务。
+    同步方法供 Celery 任务与线程中使用；协程中使用 astart/aupdate/aget/adelete，
+    Redis/文件后端的 I/O 在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, namespace: str, ttl: int | None = None, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._backend = backend
+
+    @property
+    def backend(self) -> ProgressBackend:
+        return self._backend or get_progress_backend()
+
+    async def _abackend(self) -> ProgressBackend:
+        if self._backend is not None or _backend is not None:
+            return self.backend
+        # 首次选择后端可能需要连接 Redis
+        return await asyncio.to_thread(get_progress_backend)
+
+    async def _acall(self, op: str, key: str, *args, **kwargs):
+        backend = await self._abackend()
+        method = getattr(backend, op)
+        if backend.blocking:
+            return await asyncio.to_thread(method, self._key(key), *args, **kwargs)
+        return method(self._key(key), *args, **kwargs)
+
+    def _key(self, key: str) -> str:
+        return f"{KEY_PREFIX}:{self.namespace}:{key}"
+
+    def _ttl(self) -> int:
+        return self.ttl or settings.PROGRESS_STORE_TTL_SECONDS
+
+    def start(self, key: str, data: dict[str, Any]):
+        """写入新的进度记录（覆盖旧记录）。"""
+        try:
+            self.backend.update(self._key(key), data, self._ttl(), replace=True)
+        except Exception as exc:
+            logger.warning(f"[进度存储] 写入失败: {self.namespace}:{key}, error={exc}")
+
+    def update(self, key: str, **fields):
+        """局部更新进度字段，并刷新过期时间。"""
+        try:
+            self.backend.update(self._key(key), fields, self._ttl())
+        except Exception as exc:
+            logger.warning(f"[进度存储] 更新失败: {self.namespace}:{key}, error={exc}")
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        try:
+            return self.backend.get(self._key(key))
+        except Exception as exc:
+            logger.warning(f"[进度存储] 读取失败: {self.namespace}:{key}, error={exc}")
+            return None
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def delete(self, key: str):
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as exc:
+            logger.warning(f"[进度存储] 删除失败: {self.namespace}:{key}, error={exc}")
+
+    async def astart(self, key: str, data: dict[str, Any]):
+        """start 的异步版本"""
+        try:
+            await self._acall("update", key, data, self._ttl(), replace=True)
+        except Exception as exc:
+            logger.warning(f"[进度存储] 写入失败: {self.namespace}:{key}, error={exc}")
+
+    async def aupdate(self, key: str, **fields):
+        """update 的异步版本"""
+        try:
+            await self._acall("update", key, fields, self._ttl())
+        except Exception as exc:
+            logger.warning(f"[进度存储] 更新失败: {self.namespace}:{key}, error={exc}")
+
+    async def aget(self, key: str) -> dict[str, Any] | None:
+        """get 的异步版本"""
+        try:
+            return await self._acall("get", key)
+        except Exception as exc:
+            logger.warning(f"[进度存储] 读取失败: {self.namespace}:{key}, error={exc}")
+            return None
+
+    async def adelete(self, key: str):
+        """delete 的异步版本"""
+        try:
+            await self._acall("delete", key)
+        except Exception as exc:
+            logger.warning(f"[进度存储] 删除失败: {self.namespace}:{key}, error={exc}")
@@ -1,11 +1,14 @@
+import asyncio
 import csv
+import os
 import uuid
-from io import BytesIO
+from collections.abc import Iterator
 from typing import Any
 
 import aiomysql
 
 from app.services.db_pool import db_pool
+from app.services.progress_store import ProgressStore
 from app.settings.config import settings
 
 # SIM导入固定连接的Id（延迟获取，避免模块加载时Tortoise未初始化）
@@ -17,107 +20,162 @@ async def _get_sim_conn_id():
         _sim_conn_id = await settings.SIM_CONN_ID()
     return _sim_conn_id
 
-_PROGRESS: dict[str, dict[str, Any]] = {}
+_PROGRESS = ProgressStore("simiccid")
+
+SIM_UPLOAD_DIR = "data/sim_upload"
+SIM_UPLOAD_MAX_SIZE = 100 * 1024 * 1024  # 100MB
+SIM_INSERT_CHUNK_SIZE = 5000  # 每块行数，逐块写入并提交
+SIM_UPLOAD_EXTENSIONS = ("xlsx", "csv")  # 流式解析支持的文件类型
+
+
+def _iter_xlsx_rows(file_path: str) -> Iterator[tuple[str, str]]:
+    try:
+        import openpyxl  # type: ignore
+    except Exception:
+        raise ValueError("服务器未安装Excel解析库，请上传CSV或联系管理员安装openpyxl")
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        row_iter = ws.iter_rows(values_only=True)
+        header = next(row_iter, ())
+        headers = [str(c).strip() if c is not None else "" for c in header]
+        if headers != ["SimNumber", "ICCID"]:
+            raise ValueError("Excel列名不符合要求，需为SimNumber、ICCID")
+        for row in row_iter:
+            row = tuple(row or ()) + (None, None)
+            sim = str(row[0]).strip() if row[0] is not None else ""
+            iccid = str(row[1]).strip() if row[1] is not None else ""
+            if sim or iccid:
+                yield sim, iccid
+    finally:
+        wb.close()
+
+
+def _iter_csv_rows(file_path: str) -> Iterator[tuple[str, str]]:
+    with open(file_path, encoding="utf-8", errors="ignore", newline="") as f:
+        reader = csv.reader(f)
+        headers = [h.strip() for h in next(reader, [])]
+        if headers != ["SimNumber", "ICCID"]:
+            raise ValueError("CSV列名不符合要求，需为SimNumber、ICCID")
+        for r in reader:
+            if not r or len(r) < 2:
+                continue
+            sim = (r[0] or "").strip()
+            iccid = (r[1] or "").strip()
+            if sim or iccid:
+                yield sim, iccid
+
+
+def sim_upload_extension(filename: str) -> str | None:
+    """返回受支持的上传文件扩展名，不支持时返回 None"""
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return ext if ext in SIM_UPLOAD_EXTENSIONS else None
+
+
+def iter_sim_iccid_file(
+    file_path: str,
+    filename: str,
+    chunk_size: int = SIM_INSERT_CHUNK_SIZE,
+) -> Iterator[list[tuple[str, str]]]:
+    """流式解析SIM-ICCID上传文件（xlsx/csv），按块产出 (SimNumber, ICCID) 列表，内存占用与文件行数无关"""
+    ext = sim_upload_extension(filename)
+    if ext == "xlsx":
+        rows = _iter_xlsx_rows(file_path)
+    elif ext == "csv":
+        rows = _iter_csv_rows(file_path)
+    else:
+        raise ValueError("仅支持.xlsx或.csv文件")
+    chunk: list[tuple[str, str]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
 class SIMService:
     """SIM-ICCID导入服务"""
 
-    def _progress_start(self, stamp: str, filename: str):
+    async def _progress_start(self, stamp: str, filename: str):
         """开始任务"""
-        _PROGRESS[stamp] = {
+        await _PROGRESS.astart(stamp, {
             "file": filename,
             "stage": "parsing",
             "total": 0,
             "current": 0,
             "message": "开始解析文件",
             "success": False,
-        }
+        })
 
-    def _progress_update(self, stamp: str, **kwargs):
+    async def _progress_update(self, stamp: str, **kwargs):
         """更新进度"""
-        if stamp in _PROGRESS:
-            _PROGRESS[stamp].update(kwargs)
+        await _PROGRESS.aupdate(stamp, **kwargs)
 
-    def _progress_fail(self, stamp: str, message: str):
+    async def _progress_fail(self, stamp: str, message: str):
         """失败"""
-        self._progress_update(stamp, stage="failed", message=message, success=False)
+        await self._progress_update(stamp, stage="failed", message=message, success=False)
 
-    def _progress_done(self, stamp: str):
+    async def _progress_done(self, stamp: str):
         """完成"""
-        self._progress_update(stamp, stage="done", message="处理完成", success=True)
+        await self._progress_update(stamp, stage="done", message="处理完成", success=True)
 
-    def get_progress(self, stamp: str) -> dict[str, Any]:
+    async def get_progress(self, stamp: str) -> dict[str, Any]:
         """获取进度"""
-        return _PROGRESS.get(stamp, {"stage": "", "message": ""})
+        return await _PROGRESS.aget(stamp) or {"stage": "", "message": ""}
 
     async def _ensure_pool(self) -> None:
         """确保连接池已注册"""
         await db_pool.ensure_pool(await _get_sim_conn_id())
 
-    async def _insert_rows(self, stamp: str, rows: list[tuple[str, str]]) -> int:
-        """批量写入临时表"""
-        if not rows:
-            return 0
+    async def _ingest_file(self, stamp: str, file_path: str, filename: str) -> int:
+        """逐块解析并写入临时表，每块单独提交；失败时清理本批次已写入的数据"""
         await self._ensure_pool()
-        self._progress_update(stamp, stage="writing", total=len(rows), current=0, message="写入临时表")
         pool = db_pool.get_pool(await _get_sim_conn_id())
         if pool is None:
             raise ValueError("连接池不存在")
-        if isinstance(pool, aiomysql.Pool):
-            async with pool.acquire() as conn, conn.cursor() as cur:
-                await cur.executemany(
-                    "INSERT INTO tm_simiccidimp (ImpStamp, SimNumber, ICCID) VALUES (%s, %s, %s)",
-                    [(stamp, r[0], r[1]) for r in rows],
-                )
-                await conn.commit()
-                self._progress_update(stamp, current=len(rows))
-                return cur.rowcount or 0
-        raise ValueError("不支持的连接池类型")
+        if not isinstance(pool, aiomysql.Pool):
+            raise ValueError("不支持的连接池类型")
 
-    async def upload_excel(self, file_bytes: bytes, filename: str, stamp: str | None = None) -> str:
-        """上传Excel并写入临时表"""
-        if stamp is None:
-            stamp = str(uuid.uuid4())
-        self._progress_start(stamp, filename)
-        ext = filename.split(".")[-1].lower() if "." in filename else ""
-        rows: list[tuple[str, str]] = []
-        if ext in ("xlsx",):
+        chunks = iter_sim_iccid_file(file_path, filename)
+        written = 0
+        async with pool.acquire() as conn, conn.cursor() as cur:
             try:
-                import openpyxl  # type: ignore
+                while True:
+                    # openpyxl/csv 解析为同步调用，放到线程中逐块推进，避免阻塞事件循环
+                    rows = await asyncio.to_thread(next, chunks, None)
+                    if rows is None:
+                        break
+                    await cur.executemany(
+                        "INSERT INTO tm_simiccidimp (ImpStamp, SimNumber, ICCID) VALUES (%s, %s, %s)",
+                        [(stamp, r[0], r[1]) for r in rows],
+                    )
+                    await conn.commit()
+                    written += len(rows)
+                    await self._progress_update(stamp, stage="writing", current=written, message=f"已写入 {written} 条")
             except Exception:
-                raise ValueError("服务器未安装Excel解析库，请上传CSV或联系管理员安装openpyxl")
-            wb = openpyxl.load_workbook(BytesIO(file_bytes), read_only=True, data_only=True)
-            ws = wb.active
-            headers = [str(c.value).strip() if c.value is not None else "" for c in next(ws.iter_rows(max_row=1))]
-            if headers != ["SimNumber", "ICCID"]:
-                raise ValueError("Excel列名不符合要求，需为SimNumber、ICCID")
-            self._progress_update(stamp, stage="parsing", message="解析Excel中")
-            for row in ws.iter_rows(min_row=2):
-                sim = str(row[0].value).strip() if row[0].value is not None else ""
-                iccid = str(row[1].value).strip() if row[1].value is not None else ""
-                if sim or iccid:
-                    rows.append((sim, iccid))
-        elif ext in ("csv",):
-            text = file_bytes.decode("utf-8", errors="ignore")
-            reader = csv.reader(BytesIO(text.encode("utf-8")))
-            try:
-                headers = next(reader)
-            except StopIteration:
-                headers = []
-            headers = [h.strip() for h in headers]
-            if headers != ["SimNumber", "ICCID"]:
-                raise ValueError("CSV列名不符合要求，需为SimNumber、ICCID")
-            self._progress_update(stamp, stage="parsing", message="解析CSV中")
-            for r in reader:
-                if not r or len(r) < 2:
-                    continue
-                sim = (r[0] or "").strip()
-                iccid = (r[1] or "").strip()
-                if sim or iccid:
-                    rows.append((sim, iccid))
-        else:
-            raise ValueError("仅支持.xlsx或.csv文件")
-        await self._insert_rows(stamp, rows)
+                await conn.rollback()
+                if written:
+                    await cur.execute("DELETE FROM tm_simiccidimp WHERE ImpStamp = %s", (stamp,))
+                    await conn.commit()
+                raise
+            finally:
+                chunks.close()
+        return written
+
+    async def upload_excel(self, file_path: str, filename: str, stamp: str | None = None) -> str:
+        """流式解析已落盘的上传文件并分块写入临时表，完成后删除上传文件"""
+        if stamp is None:
+            stamp = str(uuid.uuid4())
+        try:
+            await self._progress_start(stamp, filename)
+            await self._progress_update(stamp, stage="writing", message="解析并写入临时表")
+            written = await self._ingest_file(stamp, file_path, filename)
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        await self._progress_update(stamp, total=written, current=written, message=f"已写入 {written} 条")
         return stamp
 
     async def process_tmp(self, stamp: str) -> None:
@@ -129,7 +187,7 @@ class SIMService:
         if isinstance(pool, aiomysql.Pool):
             async with pool.acquire() as conn, conn.cursor() as cur:
                 try:
-                    self._progress_update(stamp, stage="processing", message="调用存储过程")
+                    await self._progress_update(stamp, stage="processing", message="调用存储过程")
                     await cur.execute("CALL proc_ImportSimICCID(%s)", (stamp,))
                     result_row = await cur.fetchone()
                     er_type = 0
@@ -147,27 +205,27 @@ class SIMService:
                             break
                     await conn.commit()
                     if er_type != 0:
-                        self._progress_fail(stamp, er_message or "存储过程执行失败")
+                        await self._progress_fail(stamp, er_message or "存储过程执行失败")
                         raise ValueError(er_message or "存储过程执行失败")
                     if er_message:
-                        self._progress_update(stamp, message=er_message)
-                    self._progress_done(stamp)
+                        await self._progress_update(stamp, message=er_message)
+                    await self._progress_done(stamp)
                 except Exception as e:
                     await conn.commit()
-                    self._progress_fail(stamp, str(e))
+                    await self._progress_fail(stamp, str(e))
                     raise
             return
         raise ValueError("不支持的连接池类型")
 
-    async def submit_and_process(self, file_bytes: bytes, filename: str, stamp: str | None = None) -> str:
+    async def submit_and_process(self, file_path: str, filename: str, stamp: str | None = None) -> str:
         """后台执行：上传并处理"""
         if stamp is None:
             stamp = str(uuid.uuid4())
         try:
-            await self.upload_excel(file_bytes, filename, stamp=stamp)
+            await self.upload_excel(file_path, filename, stamp=stamp)
             await self.process_tmp(stamp)
         except Exception as e:
-            self._progress_fail(stamp, str(e))
+            await self._progress_fail(stamp, str(e))
             raise
         return stamp
 
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from collections.abc import Awaitable, Callable
 from typing import Any
@@ -12,6 +13,220 @@ logger = logging.getLogger(__name__)
 ProgressCallback = Callable[[dict[str, Any]], Awaitable[None]]
 BATCH_SIZE = 2000
 
+WMS_SOURCE_SQL = """
+    SELECT a.MaterialNo, a.OwnerId, a.StockStatus,
+           a.StockLocationId, a.StockLocationName, a.CustSettleId, a.CustSettleName,
+           a.ParentWarehouseId,
+           c.SimSpec,
+           d.AuditTime, d.AuditPerson, d.AuditName,
+           e.SupplierId,
+           f.Name AS WHName,
+           h.ProCode, h.CityCode,
+           i.LoginName, i.UserName
+    FROM tb_materialstock a
+    JOIN tb_instockno b ON b.MaterialNo = a.MaterialNo AND b.Deleted = 0
+    JOIN tb_instockdetailhis c ON c.Id = b.DetailId AND c.Deleted = 0
+    JOIN tb_instockinfohis d ON d.Id = c.InStockId AND d.Deleted = 0
+    JOIN tb_materialinit e ON e.MaterialNo = a.MaterialNo AND e.Deleted = 0
+    LEFT JOIN tb_warehouse f ON f.Id = a.ParentWarehouseId AND f.Deleted = 0
+    LEFT JOIN tb_whaddress h ON h.WarehouseId = a.StockLocationId AND h.IsDefault = 1 AND h.Deleted = 0
+    LEFT JOIN tb_whmanager i ON i.WarehouseId = a.StockLocationId AND i.IsDefault = 1 AND i.ManagerType = 0 AND i.Deleted = 0
+    WHERE a.Deleted = 0 AND d.InStockNo IN ({placeholders}) AND a.MaterialNo IN ({material_placeholders})
+"""
+
+# 存在性与已加装数量一次查询：无库存记录（d 为空）的入库明细即视为已加装
+PRECHECK_RECEIPTS_SQL = """
+    SELECT a.InStockNo,
+           COUNT(CASE WHEN c.Id IS NOT NULL AND d.MaterialNo IS NULL THEN 1 END) AS installed_count
+    FROM tb_instockinfohis a
+    LEFT JOIN tb_instockdetailhis b ON b.InStockId = a.Id AND b.Deleted = 0
+    LEFT JOIN tb_instockno c ON c.DetailId = b.Id AND c.Deleted = 0
+    LEFT JOIN tb_materialstock d ON d.MaterialNo = c.MaterialNo AND d.Deleted = 0
+    WHERE a.InStockNo IN ({placeholders}) AND a.InStockType IN ('IN0', 'IN8') AND a.Deleted = 0
+    GROUP BY a.InStockNo
+"""
+
+# 待同步卡号（只取键，同时作为进度总数）；完整行再按卡号分页读取，仅需内连接部分
+WMS_KEYS_SQL = """
+    SELECT DISTINCT a.MaterialNo
+    FROM tb_materialstock a
+    JOIN tb_instockno b ON b.MaterialNo = a.MaterialNo AND b.Deleted = 0
+    JOIN tb_instockdetailhis c ON c.Id = b.DetailId AND c.Deleted = 0
+    JOIN tb_instockinfohis d ON d.Id = c.InStockId AND d.Deleted = 0
+    JOIN tb_materialinit e ON e.MaterialNo = a.MaterialNo AND e.Deleted = 0
+    WHERE a.Deleted = 0 AND d.InStockNo IN ({placeholders})
+"""
+
+SIM_OPERATOR_ID = '203E0000-3E01-0016-3584-08D39E2871A0'
+
+# staging 策略：批次数据写入会话临时表，由反连接在服务端完成存在性过滤
+# 临时表各列按 CREATE ... SELECT 从对应目标列复制类型、长度与排序规则：
+# 超长/越界值在写入临时表时即按严格模式报错，反连接的 SimNumber 比较也与目标表一致、可走索引
+STAGING_TABLE = "tmp_simtrans_stage"
+STAGING_COLUMN_SOURCES = (
+    ("MaterialNo", "i.SIMNumber"),
+    ("SimType", "i.SIMType"),
+    ("SupplierWareHouseId", "i.SupplierWareHouseId"),
+    ("SupplierID", "i.SIMSupplierID"),
+    ("SilentDuration", "i.SilentDuration"),
+    ("OwnerId", "i.OwnerId"),
+    ("SimSpec", "i.SimSpec"),
+    ("StockStatus", "st.SIMStatus"),
+    ("AuditTime", "i.FirstInStockTime"),
+    ("AuditPerson", "w.OperationCode"),
+    ("AuditName", "w.OperationName"),
+    ("SilentBeginTime", "i.SilentBeginTime"),
+    ("LocationType", "w.LocationType"),
+    ("CustSettleId", "w.CustSettleId"),
+    ("CustSettleName", "w.CustSettleName"),
+    ("WarehouseId", "w.WarehouseId"),
+    ("WarehouseName", "w.WarehouseName"),
+    ("ParentWareHouseId", "w.ParentWareHouseId"),
+    ("ParentWareHouseName", "w.ParentWareHouseName"),
+    ("ProCode", "w.ProCode"),
+    ("ProName", "w.ProName"),
+    ("CityCode", "w.CityCode"),
+    ("CityName", "w.CityName"),
+    ("ManagerCode", "w.ManagerCode"),
+    ("ManagerName", "w.ManagerName"),
+)
+STAGING_COLUMNS = tuple(column for column, _ in STAGING_COLUMN_SOURCES)
+STAGING_DDL = f"""
+    CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (PRIMARY KEY (MaterialNo))
+    SELECT {', '.join(f"{source} AS {column}" for column, source in STAGING_COLUMN_SOURCES)}
+    FROM tb_siminfo i
+    JOIN tb_simstatus st
+    JOIN tb_simwarehouse w
+    WHERE 1 = 0
+"""
+# 批次内重复卡号在写入前去重，使用普通 INSERT，任何截断/类型错误都直接失败回滚
+STAGING_LOAD_SQL = (
+    f"INSERT INTO {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(STAGING_COLUMNS))})"
+)
+
+# 按依赖顺序执行：simstatus/simwarehouse/simdatauseinfo 依赖 tb_siminfo，simfollowinfo 依赖 tb_simstatus
+STAGED_INSERTS = (
+    ("tb_siminfo", f"""
+        INSERT INTO tb_siminfo (
+            Id, SIMNumber, SIMSupplierID, SupplierWareHouseId,
+            SIMKinds, SIMType, SIMYears,
+            FirstInStockTime, SilentDuration,
+            SIMPackageName, IsInstallment, InstallmentCycle,
+            OwnerId, SimSpec,
+            CreatedById, CreatedAt, UpdatedById, UpdatedAt,
+            DeletedById, DeletedAt, Deleted, Remark,
+            SilentBeginTime, EnableTime
+        )
+        SELECT fn_nextval('SI'), s.MaterialNo, s.SupplierID, s.SupplierWareHouseId,
+               1, s.SimType, NULL,
+               s.AuditTime, s.SilentDuration,
+               NULL, NULL, NULL,
+               s.OwnerId, s.SimSpec,
+               '{SIM_OPERATOR_ID}', NOW(), '{SIM_OPERATOR_ID}', NOW(),
+               NULL, NULL, 0, NULL,
+               s.SilentBeginTime, NULL
+        FROM {STAGING_TABLE} s
+        LEFT JOIN tb_siminfo t ON t.SIMNumber = s.MaterialNo
+        WHERE t.SIMNumber IS NULL
+    """),
+    ("tb_simstatus", f"""
+        INSERT INTO tb_simstatus (
+            Id, SIMNumber, SIMPackage, SIMLifeCycle, SIMStatus,
+            SIMMarkStatus, WriteStatus, EnableStatus, SIMDataUseYesterday,
+            CustSettleAccountTime, CarUserAccountTime,
+            CustSettleRenewDuration, CarUserRenewDuration,
+            CarUserRefundDuration, ExpiryDate, DeviceNumber,
+            ICCID, VirtualICCID, LastUpdateTime, ActivationTime,
+            SupplierPackage
+        )
+        SELECT i.Id, s.MaterialNo, NULL, 1, s.StockStatus,
+               0, NULL, 0, 0,
+               NULL, NULL,
+               NULL, NULL,
+               NULL, NULL, NULL,
+               NULL, NULL, NOW(), NULL,
+               NULL
+        FROM {STAGING_TABLE} s
+        JOIN tb_siminfo i ON i.SIMNumber = s.MaterialNo
+        LEFT JOIN tb_simstatus t ON t.SIMNumber = s.MaterialNo
+        WHERE t.SIMNumber IS NULL
+    """),
+    ("tb_simwarehouse", f"""
+        INSERT INTO tb_simwarehouse (
+            Id, SIMNumber, LocationType,
+            CustSettleId, CustSettleName, WarehouseId, WarehouseName,
+            ParentWareHouseId, ParentWareHouseName,
+            ProCode, ProName, CityCode, CityName,
+            OutStockTime, ManagerCode, ManagerName,
+            IsCardTermAdjust, OperationCode, OperationName, OperationTime,
+            Deleted
+        )
+        SELECT i.Id, s.MaterialNo, s.LocationType,
+               s.CustSettleId, s.CustSettleName, s.WarehouseId, s.WarehouseName,
+               s.ParentWareHouseId, s.ParentWareHouseName,
+               s.ProCode, s.ProName, s.CityCode, s.CityName,
+               NULL, s.ManagerCode, s.ManagerName,
+               NULL, s.AuditPerson, s.AuditName, s.AuditTime,
+               0
+        FROM {STAGING_TABLE} s
+        JOIN tb_siminfo i ON i.SIMNumber = s.MaterialNo
+        LEFT JOIN tb_simwarehouse t ON t.SIMNumber = s.MaterialNo
+        WHERE t.SIMNumber IS NULL
+    """),
+    ("tb_simfollowinfo", f"""
+        INSERT INTO tb_simfollowinfo (
+            SIMId, SIMNumber, SIMLifeCycle, SIMStatus, SIMMarkStatus,
+            OperationName, OperationSystem, CreatedByName, CreatedAt, Deleted
+        )
+        SELECT st.Id, s.MaterialNo, st.SIMLifeCycle, st.SIMStatus, st.SIMMarkStatus,
+               '', 2, s.AuditName, s.AuditTime, 0
+        FROM {STAGING_TABLE} s
+        JOIN tb_simstatus st ON st.SIMNumber = s.MaterialNo
+        LEFT JOIN tb_simfollowinfo t ON t.SIMNumber = s.MaterialNo
+        WHERE t.SIMNumber IS NULL
+    """),
+    ("tb_simdatauseinfo", f"""
+        INSERT INTO tb_simdatauseinfo (
+            Id, SIMId, SIMNumber, SIMSupplierID,
+            SIMUseDataTotal, SIMStatus, CheckDate, IsFrozen, Deleted
+        )
+        SELECT fn_nextval('DU'), i.Id, s.MaterialNo, i.SIMSupplierID,
+               0, 0, CURDATE(), 0, 0
+        FROM {STAGING_TABLE} s
+        JOIN tb_siminfo i ON i.SIMNumber = s.MaterialNo
+        LEFT JOIN tb_simdatauseinfo t ON t.SIMNumber = s.MaterialNo
+        WHERE t.SIMNumber IS NULL
+    """),
+)
+
+# (名称, 查询SQL, 是否返回明细映射)
+EXISTENCE_PROBES = (
+    ("siminfo", "SELECT SimNumber, Id, SIMSupplierID FROM tb_siminfo WHERE SimNumber IN ({placeholders})", True),
+    ("simstatus", "SELECT SimNumber FROM tb_simstatus WHERE SimNumber IN ({placeholders})", False),
+    ("simwarehouse", "SELECT SimNumber FROM tb_simwarehouse WHERE SimNumber IN ({placeholders})", False),
+    ("simfollowinfo", "SELECT SimNumber FROM tb_simfollowinfo WHERE SimNumber IN ({placeholders})", False),
+    ("simdatauseinfo", "SELECT SIMNumber AS SimNumber FROM tb_simdatauseinfo WHERE SIMNumber IN ({placeholders})", False),
+)
+
+
+def _sim_type(material_no: str) -> int:
+    """按卡号长度判断SIM类型：11位=1，15位=2，其余（含13位）=0"""
+    return {11: 1, 15: 2}.get(len(material_no), 0)
+
+
+def _silent_begin(audit_time) -> str | None:
+    return audit_time.strftime('%Y-%m-%d 00:00:00') if audit_time else None
+
+
+def _missing_district_codes(row_chunk: list[dict[str, Any]], district_map: dict[str, str]) -> set:
+    return {
+        code
+        for r in row_chunk
+        for code in (r.get('ProCode'), r.get('CityCode'))
+        if code and code not in district_map
+    }
+
 
 class SIMTransService:
     """SIM卡同步服务 - 从仓储中心同步数据到SIM卡中心"""
@@ -70,46 +285,9 @@ class SIMTransService:
                 except Exception as exc:
                     logger.warning(f"自动重连数据库失败: conn_id={conn_id}, error={exc}")
 
-    async def validate_receipt_exists(self, receipt_numbers: list[str]) -> dict[str, Any]:
-        """
-        验证入库单号在仓储中心是否存在（已完成且未删除）
-
-        Args:
-            receipt_numbers: 入库单号列表
-
-        Returns:
-            验证结果
-        """
-        _, pool = await self._ensure_wms_pool()
-
-        not_exists = []
-        exists = []
-
-        # 验证仓储单据是否存在
-        VALIDATE_SQL = """
-        SELECT InStockNo
-        FROM tb_instockinfohis
-        WHERE InStockNo = %s AND InStockType IN ('IN0', 'IN8') AND Deleted = 0
-        """
-
-        async with pool.acquire() as conn, conn.cursor(aiomysql.cursors.DictCursor) as cur:
-            for receipt_no in receipt_numbers:
-                receipt_no = receipt_no.strip()
-                if not receipt_no:
-                    continue
-
-                try:
-                    await cur.execute(VALIDATE_SQL, (receipt_no,))
-                    result = await cur.fetchone()
-
-                    if result:
-                        exists.append(receipt_no)
-                    else:
-                        not_exists.append(receipt_no)
-                except Exception as e:
-                    logger.error(f"验证入库单 {receipt_no} 失败: {e}")
-                    raise ValueError(f"验证入库单 {receipt_no} 失败: {e!s}")
-
+    def _validation_result(self, receipt_numbers: list[str], receipts: list[str], found: set) -> dict[str, Any]:
+        exists = [rn for rn in receipts if rn in found]
+        not_exists = [rn for rn in receipts if rn not in found]
         return {
             "exists": exists,
             "not_exists": not_exists,
@@ -118,48 +296,38 @@ class SIMTransService:
             "not_exists_count": len(not_exists)
         }
 
-    async def check_installed_devices(self, receipt_numbers: list[str]) -> dict[str, Any]:
+    async def precheck_receipts(self, receipt_numbers: list[str]) -> tuple[dict[str, Any], dict[str, Any]]:
         """
-        验证是否全部未加装，如果存在已加装设备则返回数量
-
-        Args:
-            receipt_numbers: 入库单号列表
+        同步前置校验：入库单存在性与设备加装状态在同一轮分批查询中完成
 
         Returns:
-            检查结果
+            (验证结果, 加装检查结果)
+            验证结果: exists / not_exists 单号列表及 total_count / exists_count / not_exists_count
+            加装检查结果: has_installed 是否存在已加装设备、installed_count 已加装数量
         """
         _, pool = await self._ensure_wms_pool()
 
-        # 检查已加装设备数量
-        CHECK_INSTALLED_SQL = """
-        SELECT COUNT(*) as installed_count
-        FROM tb_instockinfohis a
-        JOIN tb_instockdetailhis b
-          ON b.InStockId = a.Id AND b.Deleted = 0
-        JOIN tb_instockno c
-          ON c.DetailId = b.Id AND c.Deleted = 0
-        WHERE a.Deleted = 0
-          AND a.InStockNo IN ({})
-          AND NOT EXISTS (
-            SELECT 1 FROM tb_materialstock d
-            WHERE d.MaterialNo = c.MaterialNo AND d.Deleted = 0
-          )
-        """
-
+        receipts = [rn.strip() for rn in receipt_numbers if rn.strip()]
+        found = set()
         installed_count = 0
         async with pool.acquire() as conn, conn.cursor(aiomysql.cursors.DictCursor) as cur:
-            for receipt_chunk in self._chunks(receipt_numbers):
+            for receipt_chunk in self._chunks(list(dict.fromkeys(receipts))):
                 placeholders = ','.join(['%s'] * len(receipt_chunk))
-                sql = CHECK_INSTALLED_SQL.format(placeholders)
-
-                await cur.execute(sql, tuple(receipt_chunk))
-                result = await cur.fetchone()
-                installed_count += result['installed_count'] if result else 0
-
-        return {
+                try:
+                    await cur.execute(PRECHECK_RECEIPTS_SQL.format(placeholders=placeholders), tuple(receipt_chunk))
+                except Exception as e:
+                    logger.error(f"验证入库单失败: {e}")
+                    raise ValueError(f"验证入库单失败: {e!s}")
+                for row in await cur.fetchall():
+                    found.add(row['InStockNo'])
+                    installed_count += int(row['installed_count'] or 0)
+
+        validation_result = self._validation_result(receipt_numbers, receipts, found)
+        installed_check = {
             "has_installed": installed_count > 0,
             "installed_count": installed_count
         }
+        return validation_result, installed_check
 
     async def sync_sim_cards(
         self,
@@ -200,10 +368,10 @@ class SIMTransService:
         receipt_numbers: list[str],
         progress_cb: ProgressCallback | None = None,
     ) -> dict[str, Any]:
-        # 步骤1: 验证入库单号是否存在
-        logger.info(f"开始验证入库单号: {receipt_numbers}")
+        # 步骤1: 验证入库单号是否存在（同一轮查询同时统计已加装设备）
+        logger.info(f"开始验证入库单号: {len(receipt_numbers)} 个")
         await self._emit_progress(progress_cb, "validating", "正在验证入库单号", 5)
-        validation_result = await self.validate_receipt_exists(receipt_numbers)
+        validation_result, installed_check = await self.precheck_receipts(receipt_numbers)
 
         if validation_result['not_exists_count'] > 0:
             not_exists_list = ', '.join(validation_result['not_exists'])
@@ -214,13 +382,10 @@ class SIMTransService:
             }
 
         valid_receipts = validation_result['exists']
-        logger.info(f"入库单号验证通过: {valid_receipts}")
+        logger.info(f"入库单号验证通过: {len(valid_receipts)} 个")
 
         # 步骤2: 验证是否全部未加装
-        logger.info("开始检查设备加装状态")
         await self._emit_progress(progress_cb, "checking", "正在检查设备加装状态", 15)
-        installed_check = await self.check_installed_devices(valid_receipts)
-
         if installed_check['has_installed']:
             return {
                 "success": False,
@@ -261,16 +426,361 @@ class SIMTransService:
             rows.update(row[key] for row in await cur.fetchall())
         return rows
 
+    async def _collect_wms_keys(self, wms_pool, receipt_numbers: list[str]) -> list[tuple[list[str], list[str]]]:
+        """按入库单分块读取待同步卡号（已跨分块去重），返回 [(入库单分块, 卡号列表)]"""
+        groups = []
+        seen: set[str] = set()
+        async with wms_pool.acquire() as wms_conn, wms_conn.cursor() as wms_cur:
+            for receipt_chunk in self._chunks(receipt_numbers):
+                placeholders = ','.join(['%s'] * len(receipt_chunk))
+                await wms_cur.execute(WMS_KEYS_SQL.format(placeholders=placeholders), tuple(receipt_chunk))
+                material_nos = [row[0] for row in await wms_cur.fetchall() if row[0] not in seen]
+                seen.update(material_nos)
+                if material_nos:
+                    groups.append((receipt_chunk, material_nos))
+        return groups
+
+    async def _iter_wms_chunks(self, wms_pool, key_groups: list[tuple[list[str], list[str]]]):
+        """
+        按卡号分页读取仓储数据，每页不超过 BATCH_SIZE 个卡号
+
+        每页单独借用连接、缓冲读取后立即归还，SIM 写入期间不占用 WMS 连接与服务端游标
+        """
+        for receipt_chunk, material_nos in key_groups:
+            placeholders = ','.join(['%s'] * len(receipt_chunk))
+            for material_chunk in self._chunks(material_nos):
+                sql = WMS_SOURCE_SQL.format(
+                    placeholders=placeholders,
+                    material_placeholders=','.join(['%s'] * len(material_chunk)),
+                )
+                async with wms_pool.acquire() as wms_conn, wms_conn.cursor(aiomysql.cursors.DictCursor) as wms_cur:
+                    await wms_cur.execute(sql, (*receipt_chunk, *material_chunk))
+                    rows = await wms_cur.fetchall()
+                if rows:
+                    yield rows
+
+    async def _probe_existing(self, sim_pool, sql: str, material_nos: list[str], as_map: bool):
+        """在独立连接上执行单表存在性查询，便于多表并发"""
+        async with sim_pool.acquire() as conn, conn.cursor(aiomysql.cursors.DictCursor) as cur:
+            if as_map:
+                return await self._fetch_existing_map(cur, sql, material_nos)
+            return await self._fetch_existing_set(cur, sql, material_nos)
+
+    async def _load_districts(self, sim_pool, codes: set, district_map: dict[str, str]):
+        """补充加载尚未缓存的行政区划名称"""
+        if not codes:
+            return
+        async with sim_pool.acquire() as conn, conn.cursor(aiomysql.cursors.DictCursor) as cur:
+            code_ph = ','.join(['%s'] * len(codes))
+            await cur.execute(
+                f"SELECT Code, Name FROM basic_district WHERE Code IN ({code_ph}) AND Deleted = 0",
+                tuple(codes)
+            )
+            for r in await cur.fetchall():
+                district_map[r['Code']] = r['Name']
+
+    async def _lookup_chunk(self, sim_pool, row_chunk: list[dict[str, Any]], district_map: dict[str, str]) -> dict[str, Any]:
+        """并发查询本批次在五张目标表中已存在的 SimNumber，同时补齐行政区划"""
+        material_nos = [r['MaterialNo'] for r in row_chunk]
+        results = await asyncio.gather(
+            *(self._probe_existing(sim_pool, sql, material_nos, as_map) for _, sql, as_map in EXISTENCE_PROBES),
+            self._load_districts(sim_pool, _missing_district_codes(row_chunk, district_map), district_map),
+        )
+        return {name: result for (name, _, _), result in zip(EXISTENCE_PROBES, results)}
+
+    async def _write_chunk(
+        self,
+        sim_cur,
+        row_chunk: list[dict[str, Any]],
+        existing: dict[str, Any],
+        supplier_wh: dict[str, dict[str, Any]],
+        district_map: dict[str, str],
+        written: dict[str, Any],
+    ) -> dict[str, int]:
+        """
+        写入单个批次（调用方负责事务）
+
+        existing 为本批次查询时刻的已存在数据；written 记录本次同步已写入的 SimNumber，
+        下一批次的查询与本批次写入并行，需同时参考两者避免重复写入。
+        """
+        existing_siminfo = existing['siminfo']
+        siminfo_new = written['siminfo']          # MaterialNo -> (Id, SIMSupplierID)
+        status_new = written['simstatus']
+        warehouse_new = written['simwarehouse']
+        follow_new = written['simfollowinfo']
+        datause_new = written['simdatauseinfo']
+
+        def _info_id(mn: str):
+            if mn in siminfo_new:
+                return siminfo_new[mn][0]
+            return (existing_siminfo.get(mn) or {}).get('Id')
+
+        batch_counts = {
+            "tb_siminfo": 0,
+            "tb_simstatus": 0,
+            "tb_simwarehouse": 0,
+            "tb_simfollowinfo": 0,
+            "tb_simdatauseinfo": 0,
+        }
+
+        # ── 3a. tb_siminfo ──
+        for row in row_chunk:
+            mn = row['MaterialNo']
+            if mn in existing_siminfo or mn in siminfo_new:
+                continue
+
+            await sim_cur.execute("SELECT fn_nextval('SI') AS nid")
+            nid = (await sim_cur.fetchone())['nid']
+
+            sw = supplier_wh.get(row.get('SupplierId'))
+            sid = sw['SupplierID'] if sw else None
+            sd = sw['SilentDuration'] if sw else None
+
+            stype = _sim_type(mn)
+            audit_time = row.get('AuditTime')
+            silent_begin = _silent_begin(audit_time)
+
+            await sim_cur.execute("""
+                    INSERT INTO tb_siminfo (
+                        Id, SIMNumber, SIMSupplierID, SupplierWareHouseId,
+                        SIMKinds, SIMType, SIMYears,
+                        FirstInStockTime, SilentDuration,
+                        SIMPackageName, IsInstallment, InstallmentCycle,
+                        OwnerId, SimSpec,
+                        CreatedById, CreatedAt, UpdatedById, UpdatedAt,
+                        DeletedById, DeletedAt, Deleted, Remark,
+                        SilentBeginTime, EnableTime
+                    ) VALUES (
+                        %s,%s,%s,%s,
+                        1,%s,%s,
+                        %s,%s,
+                        %s,%s,%s,
+                        %s,%s,
+                        %s,NOW(),%s,NOW(),
+                        NULL,NULL,0,NULL,
+                        %s,NULL
+                    )
+                """, (
+                nid, mn, sid, row.get('SupplierId'),
+                stype, None,
+                audit_time, sd,
+                None, None, None,
+                row.get('OwnerId'), row.get('SimSpec'),
+                SIM_OPERATOR_ID,
+                SIM_OPERATOR_ID,
+                silent_begin,
+            ))
+            siminfo_new[mn] = (nid, sid)
+            batch_counts['tb_siminfo'] += 1
+
+        # ── 3b. tb_simstatus ──
+        for row in row_chunk:
+            mn = row['MaterialNo']
+            if mn in existing['simstatus'] or mn in status_new:
+                continue
+            info_id = _info_id(mn)
+            if not info_id:
+                continue
+
+            await sim_cur.execute("""
+                    INSERT INTO tb_simstatus (
+                        Id, SIMNumber, SIMPackage, SIMLifeCycle, SIMStatus,
+                        SIMMarkStatus, WriteStatus, EnableStatus, SIMDataUseYesterday,
+                        CustSettleAccountTime, CarUserAccountTime,
+                        CustSettleRenewDuration, CarUserRenewDuration,
+                        CarUserRefundDuration, ExpiryDate, DeviceNumber,
+                        ICCID, VirtualICCID, LastUpdateTime, ActivationTime,
+                        SupplierPackage
+                    ) VALUES (
+                        %s,%s,NULL,1,%s,
+                        0,NULL,0,0,
+                        NULL,NULL,
+                        NULL,NULL,
+                        NULL,NULL,NULL,
+                        NULL,NULL,NOW(),NULL,
+                        NULL
+                    )
+                """, (info_id, mn, row.get('StockStatus')))
+            status_new.add(mn)
+            batch_counts['tb_simstatus'] += 1
+
+        # ── 3c. tb_simwarehouse ──
+        for row in row_chunk:
+            mn = row['MaterialNo']
+            if mn in existing['simwarehouse'] or mn in warehouse_new:
+                continue
+            info_id = _info_id(mn)
+            if not info_id:
+                continue
+
+            loc_id = row.get('StockLocationId') or ''
+            lt = 0 if loc_id.startswith('WH') else 1
+            pro_name = district_map.get(row.get('ProCode') or '')
+            city_name = district_map.get(row.get('CityCode') or '')
+
+            await sim_cur.execute("""
+                    INSERT INTO tb_simwarehouse (
+                        Id, SIMNumber, LocationType,
+                        CustSettleId, CustSettleName, WarehouseId, WarehouseName,
+                        ParentWareHouseId, ParentWareHouseName,
+                        ProCode, ProName, CityCode, CityName,
+                        OutStockTime, ManagerCode, ManagerName,
+                        IsCardTermAdjust, OperationCode, OperationName, OperationTime,
+                        Deleted
+                    ) VALUES (
+                        %s,%s,%s,
+                        %s,%s,%s,%s,
+                        %s,%s,
+                        %s,%s,%s,%s,
+                        NULL,%s,%s,
+                        NULL,%s,%s,%s,
+                        0
+                    )
+                """, (
+                info_id, mn, lt,
+                row.get('CustSettleId'), row.get('CustSettleName'),
+                loc_id, row.get('StockLocationName'),
+                row.get('ParentWarehouseId'), row.get('WHName'),
+                row.get('ProCode'), pro_name, row.get('CityCode'), city_name,
+                row.get('LoginName'), row.get('UserName'),
+                row.get('AuditPerson'), row.get('AuditName'), row.get('AuditTime'),
+            ))
+            warehouse_new.add(mn)
+            batch_counts['tb_simwarehouse'] += 1
+
+        # ── 3d. tb_simfollowinfo ──
+        # 需要 tb_simstatus 的 SIMLifeCycle / SIMStatus / SIMMarkStatus
+        for row in row_chunk:
+            mn = row['MaterialNo']
+            if mn in existing['simfollowinfo'] or mn in follow_new:
+                continue
+            # 已有的或刚写入的 tb_simstatus 均可
+            if mn not in existing['simstatus'] and mn not in status_new:
+                continue
+
+            await sim_cur.execute(
+                "SELECT Id, SIMLifeCycle, SIMStatus, SIMMarkStatus "
+                "FROM tb_simstatus WHERE SimNumber = %s", (mn,)
+            )
+            st = await sim_cur.fetchone()
+            if not st:
+                continue
+
+            await sim_cur.execute("""
+                    INSERT INTO tb_simfollowinfo (
+                        SIMId, SIMNumber, SIMLifeCycle, SIMStatus, SIMMarkStatus,
+                        OperationName, OperationSystem, CreatedByName, CreatedAt, Deleted
+                    ) VALUES (
+                        %s,%s,%s,%s,%s,
+                        '',2,%s,%s,0
+                    )
+                """, (
+                st['Id'], mn, st['SIMLifeCycle'], st['SIMStatus'], st['SIMMarkStatus'],
+                row.get('AuditName'), row.get('AuditTime'),
+            ))
+            follow_new.add(mn)
+            batch_counts['tb_simfollowinfo'] += 1
+
+        # ── 3e. tb_simdatauseinfo ──
+        for row in row_chunk:
+            mn = row['MaterialNo']
+            if mn in existing['simdatauseinfo'] or mn in datause_new:
+                continue
+            info_id = _info_id(mn)
+            if not info_id:
+                continue
+
+            # SIMSupplierID：优先用刚写入的，否则用已存在的
+            if mn in siminfo_new:
+                supplier_id = siminfo_new[mn][1]
+            else:
+                supplier_id = (existing_siminfo.get(mn) or {}).get('SIMSupplierID')
+
+            await sim_cur.execute("SELECT fn_nextval('DU') AS nid")
+            du_id = (await sim_cur.fetchone())['nid']
+
+            await sim_cur.execute("""
+                    INSERT INTO tb_simdatauseinfo (
+                        Id, SIMId, SIMNumber, SIMSupplierID,
+                        SIMUseDataTotal, SIMStatus, CheckDate, IsFrozen, Deleted
+                    ) VALUES (
+                        %s,%s,%s,%s,
+                        0,0,CURDATE(),0,0
+                    )
+                """, (du_id, info_id, mn, supplier_id))
+            datause_new.add(mn)
+            batch_counts['tb_simdatauseinfo'] += 1
+
+        return batch_counts
+
+    def _stage_row(
+        self,
+        row: dict[str, Any],
+        supplier_wh: dict[str, dict[str, Any]],
+        district_map: dict[str, str],
+    ) -> tuple:
+        """把一行仓储数据转换为临时表记录（与逐行写入的字段取值保持一致）"""
+        mn = row['MaterialNo']
+        sw = supplier_wh.get(row.get('SupplierId'))
+        loc_id = row.get('StockLocationId') or ''
+        audit_time = row.get('AuditTime')
+        return (
+            mn, _sim_type(mn), row.get('SupplierId'),
+            sw['SupplierID'] if sw else None, sw['SilentDuration'] if sw else None,
+            row.get('OwnerId'), row.get('SimSpec'), row.get('StockStatus'),
+            audit_time, row.get('AuditPerson'), row.get('AuditName'), _silent_begin(audit_time),
+            0 if loc_id.startswith('WH') else 1,
+            row.get('CustSettleId'), row.get('CustSettleName'),
+            loc_id, row.get('StockLocationName'),
+            row.get('ParentWarehouseId'), row.get('WHName'),
+            row.get('ProCode'), district_map.get(row.get('ProCode') or ''),
+            row.get('CityCode'), district_map.get(row.get('CityCode') or ''),
+            row.get('LoginName'), row.get('UserName'),
+        )
+
+    async def _write_chunk_staged(
+        self,
+        sim_cur,
+        row_chunk: list[dict[str, Any]],
+        supplier_wh: dict[str, dict[str, Any]],
+        district_map: dict[str, str],
+    ) -> dict[str, int]:
+        """
+        集合方式写入单个批次（调用方负责事务）
+
+        批次数据按卡号去重（保留首条）后一次性写入会话临时表，五张目标表各执行一条
+        INSERT ... SELECT ... LEFT JOIN ... IS NULL，存在性过滤全部在服务端完成。
+        """
+        staged_rows: dict[str, tuple] = {}
+        for row in row_chunk:
+            if row['MaterialNo'] not in staged_rows:
+                staged_rows[row['MaterialNo']] = self._stage_row(row, supplier_wh, district_map)
+        await sim_cur.execute(f"DELETE FROM {STAGING_TABLE}")
+        await sim_cur.executemany(STAGING_LOAD_SQL, list(staged_rows.values()))
+        batch_counts = {}
+        for table, sql in STAGED_INSERTS:
+            await sim_cur.execute(sql)
+            batch_counts[table] = max(sim_cur.rowcount or 0, 0)
+        return batch_counts
+
     async def _execute_sync(
         self,
         receipt_numbers: list[str],
         progress_cb: ProgressCallback | None = None,
+        strategy: str | None = None,
     ) -> dict[str, Any]:
         """
-        执行数据同步 - 先从WMS_CONN查询仓储数据，取回结果再写入SIM_CONN
+        执行数据同步 - 流水线方式从WMS_CONN读取仓储数据并分批写入SIM_CONN
+
+        - 先读取待同步卡号（同时得到进度总数），再按卡号分页读取仓储数据，每页用完即归还 WMS 连接，
+          内存只保留卡号列表与在途批次
+        - probe（默认）：每批五张目标表的存在性查询在各自的池连接上并发执行，再逐行写入
+        - staging：批次写入会话临时表（列类型取自目标表），五张目标表各一条反连接 INSERT ... SELECT
+        - 第 N+1 批的读取与预处理和第 N 批的写入事务重叠进行
 
         Args:
             receipt_numbers: 入库单号列表
+            strategy: 存在性过滤方式，默认取配置 simtrans.sync_strategy
 
         Returns:
             同步结果统计
@@ -286,374 +796,115 @@ class SIMTransService:
             "tb_simdatauseinfo": 0,
         }
 
-        # ══════════════════════════════════════════════════════════
-        # Step 1: 从 WMS_CONN 查询 whcenter 源数据
-        # ══════════════════════════════════════════════════════════
-        wms_query = """
-            SELECT a.MaterialNo, a.OwnerId, a.StockStatus,
-                   a.StockLocationId, a.StockLocationName, a.CustSettleId, a.CustSettleName,
-                   a.ParentWarehouseId,
-                   c.SimSpec,
-                   d.AuditTime, d.AuditPerson, d.AuditName,
-                   e.SupplierId,
-                   f.Name AS WHName,
-                   h.ProCode, h.CityCode,
-                   i.LoginName, i.UserName
-            FROM tb_materialstock a
-            JOIN tb_instockno b ON b.MaterialNo = a.MaterialNo AND b.Deleted = 0
-            JOIN tb_instockdetailhis c ON c.Id = b.DetailId AND c.Deleted = 0
-            JOIN tb_instockinfohis d ON d.Id = c.InStockId AND d.Deleted = 0
-            JOIN tb_materialinit e ON e.MaterialNo = a.MaterialNo AND e.Deleted = 0
-            LEFT JOIN tb_warehouse f ON f.Id = a.ParentWarehouseId AND f.Deleted = 0
-            LEFT JOIN tb_whaddress h ON h.WarehouseId = a.StockLocationId AND h.IsDefault = 1 AND h.Deleted = 0
-            LEFT JOIN tb_whmanager i ON i.WarehouseId = a.StockLocationId AND i.IsDefault = 1 AND i.ManagerType = 0 AND i.Deleted = 0
-            WHERE a.Deleted = 0 AND d.InStockNo IN ({placeholders})
-        """
-
-        whcenter_rows = []
-        async with wms_pool.acquire() as wms_conn, wms_conn.cursor(aiomysql.cursors.DictCursor) as wms_cur:
-            for receipt_chunk in self._chunks(receipt_numbers):
-                placeholders = ','.join(['%s'] * len(receipt_chunk))
-                await wms_cur.execute(
-                    wms_query.format(placeholders=placeholders),
-                    tuple(receipt_chunk),
-                )
-                whcenter_rows.extend(await wms_cur.fetchall())
-
-        if not whcenter_rows:
+        key_groups = await self._collect_wms_keys(wms_pool, receipt_numbers)
+        total = sum(len(material_nos) for _, material_nos in key_groups)
+        if total == 0:
             logger.info("未查询到仓储数据，跳过同步")
             return {"total_inserted": 0, "sim_card_count": 0, "inserted_by_table": {}}
 
-        material_nos = [r['MaterialNo'] for r in whcenter_rows]
-        logger.info(f"从WMS_CONN查询到 {len(whcenter_rows)} 条仓储记录")
+        logger.info(f"从WMS_CONN查询到 {total} 张待同步卡")
         await self._emit_progress(
             progress_cb,
             "syncing",
-            f"从仓储中心查询到 {len(whcenter_rows)} 条记录，开始分批写入",
+            f"从仓储中心查询到 {total} 张待同步卡，开始分批写入",
             35,
-            total=len(whcenter_rows),
+            total=total,
             current=0,
         )
 
-        # ══════════════════════════════════════════════════════════
-        # Step 2: 从 SIM_CONN 获取辅助数据
-        # ══════════════════════════════════════════════════════════
         async with sim_pool.acquire() as sim_conn, sim_conn.cursor(aiomysql.cursors.DictCursor) as sim_cur:
-            # 2a. tb_supplierwarehouse (SIMCENTER表，LEFT JOIN用)
+            # tb_supplierwarehouse (SIMCENTER表，LEFT JOIN用)
             await sim_cur.execute(
                 "SELECT SupplierWareHouseId, SupplierID, SilentDuration "
                 "FROM tb_supplierwarehouse WHERE SupplierKinds = 1 AND Deleted = 0"
             )
             supplier_wh = {r['SupplierWareHouseId']: r for r in await sim_cur.fetchall()}
 
-            # 2b. basic_district (SIMCENTER表，LEFT JOIN用)
-            all_codes = set()
-            for r in whcenter_rows:
-                if r.get('ProCode'):
-                    all_codes.add(r['ProCode'])
-                if r.get('CityCode'):
-                    all_codes.add(r['CityCode'])
-            district_map = {}
-            if all_codes:
-                code_ph = ','.join(['%s'] * len(all_codes))
-                await sim_cur.execute(
-                    f"SELECT Code, Name FROM basic_district WHERE Code IN ({code_ph}) AND Deleted = 0",
-                    tuple(all_codes)
-                )
-                for r in await sim_cur.fetchall():
-                    district_map[r['Code']] = r['Name']
-
-            processed = 0
-
-            for row_chunk in self._chunks(whcenter_rows):
-                chunk_material_nos = [r['MaterialNo'] for r in row_chunk]
-
-                # 2c. 各目标表中已有的 SimNumber。按批查询，避免 MySQL range_optimizer 内存 warning。
-                existing_siminfo = await self._fetch_existing_map(
-                    sim_cur,
-                    "SELECT SimNumber, Id, SIMSupplierID FROM tb_siminfo WHERE SimNumber IN ({placeholders})",
-                    chunk_material_nos,
-                )
-                existing_simstatus = await self._fetch_existing_set(
-                    sim_cur,
-                    "SELECT SimNumber FROM tb_simstatus WHERE SimNumber IN ({placeholders})",
-                    chunk_material_nos,
-                )
-                existing_simwarehouse = await self._fetch_existing_set(
-                    sim_cur,
-                    "SELECT SimNumber FROM tb_simwarehouse WHERE SimNumber IN ({placeholders})",
-                    chunk_material_nos,
-                )
-                existing_simfollowinfo = await self._fetch_existing_set(
-                    sim_cur,
-                    "SELECT SimNumber FROM tb_simfollowinfo WHERE SimNumber IN ({placeholders})",
-                    chunk_material_nos,
-                )
-                existing_simdatauseinfo = await self._fetch_existing_set(
-                    sim_cur,
-                    "SELECT SIMNumber AS SimNumber FROM tb_simdatauseinfo WHERE SIMNumber IN ({placeholders})",
-                    chunk_material_nos,
-                )
+            district_map: dict[str, str] = {}
+            written = {
+                "siminfo": {},
+                "simstatus": set(),
+                "simwarehouse": set(),
+                "simfollowinfo": set(),
+                "simdatauseinfo": set(),
+            }
+            staged = (strategy or settings.SIMTRANS_SYNC_STRATEGY) == "staging"
+            if staged:
+                await sim_cur.execute(STAGING_DDL)
+            source = self._iter_wms_chunks(wms_pool, key_groups)
 
-                # ══════════════════════════════════════════════════
-                # Step 3: 在 SIM_CONN 上分批写入（每批一个事务）
-                # ══════════════════════════════════════════════════
-                await sim_conn.begin()
+            async def _next_chunk():
                 try:
-                    batch_inserted = 0
-                    batch_counts = {
-                        "tb_siminfo": 0,
-                        "tb_simstatus": 0,
-                        "tb_simwarehouse": 0,
-                        "tb_simfollowinfo": 0,
-                        "tb_simdatauseinfo": 0,
-                    }
-                    siminfo_new = {}          # MaterialNo -> Id
-                    siminfo_supplier = {}     # MaterialNo -> SIMSupplierID（新写入的）
-                    status_new = set()        # MaterialNo（新写入的）
-
-                    # ── 3a. tb_siminfo ──
-                    for row in row_chunk:
-                        mn = row['MaterialNo']
-                        if mn in existing_siminfo:
-                            continue
-
-                        await sim_cur.execute("SELECT fn_nextval('SI') AS nid")
-                        nid = (await sim_cur.fetchone())['nid']
-
-                        sw = supplier_wh.get(row.get('SupplierId'))
-                        sid = sw['SupplierID'] if sw else None
-                        sd = sw['SilentDuration'] if sw else None
-
-                        mlen = len(mn)
-                        if mlen == 13:
-                            stype = 0
-                        elif mlen == 11:
-                            stype = 1
-                        elif mlen == 15:
-                            stype = 2
+                    row_chunk = await source.__anext__()
+                except StopAsyncIteration:
+                    return None
+                if staged:
+                    codes = _missing_district_codes(row_chunk, district_map)
+                    await self._load_districts(sim_pool, codes, district_map)
+                    return row_chunk, None
+                return row_chunk, await self._lookup_chunk(sim_pool, row_chunk, district_map)
+
+            processed = 0
+            pending = asyncio.create_task(_next_chunk())
+            try:
+                while True:
+                    item = await pending
+                    if item is None:
+                        break
+                    row_chunk, existing = item
+                    # 预取下一批（读取+预处理），与本批写入事务并行
+                    pending = asyncio.create_task(_next_chunk())
+
+                    await sim_conn.begin()
+                    try:
+                        if staged:
+                            batch_counts = await self._write_chunk_staged(
+                                sim_cur, row_chunk, supplier_wh, district_map,
+                            )
                         else:
-                            stype = 0
-
-                        audit_time = row.get('AuditTime')
-                        silent_begin = audit_time.strftime('%Y-%m-%d 00:00:00') if audit_time else None
-
-                        await sim_cur.execute("""
-                                INSERT INTO tb_siminfo (
-                                    Id, SIMNumber, SIMSupplierID, SupplierWareHouseId,
-                                    SIMKinds, SIMType, SIMYears,
-                                    FirstInStockTime, SilentDuration,
-                                    SIMPackageName, IsInstallment, InstallmentCycle,
-                                    OwnerId, SimSpec,
-                                    CreatedById, CreatedAt, UpdatedById, UpdatedAt,
-                                    DeletedById, DeletedAt, Deleted, Remark,
-                                    SilentBeginTime, EnableTime
-                                ) VALUES (
-                                    %s,%s,%s,%s,
-                                    1,%s,%s,
-                                    %s,%s,
-                                    %s,%s,%s,
-                                    %s,%s,
-                                    %s,NOW(),%s,NOW(),
-                                    NULL,NULL,0,NULL,
-                                    %s,NULL
-                                )
-                            """, (
-                            nid, mn, sid, row.get('SupplierId'),
-                            stype, None,
-                            audit_time, sd,
-                            None, None, None,
-                            row.get('OwnerId'), row.get('SimSpec'),
-                            '203E0000-3E01-0016-3584-08D39E2871A0',
-                            '203E0000-3E01-0016-3584-08D39E2871A0',
-                            silent_begin,
-                        ))
-                        siminfo_new[mn] = nid
-                        siminfo_supplier[mn] = sid
-                        batch_inserted += 1
-
-                    cnt = len(siminfo_new)
-                    batch_counts['tb_siminfo'] = cnt
-
-                    # ── 3b. tb_simstatus ──
-                    for row in row_chunk:
-                        mn = row['MaterialNo']
-                        if mn in existing_simstatus:
-                            continue
-                        info_id = siminfo_new.get(mn) or (existing_siminfo.get(mn) or {}).get('Id')
-                        if not info_id:
-                            continue
-
-                        await sim_cur.execute("""
-                                INSERT INTO tb_simstatus (
-                                    Id, SIMNumber, SIMPackage, SIMLifeCycle, SIMStatus,
-                                    SIMMarkStatus, WriteStatus, EnableStatus, SIMDataUseYesterday,
-                                    CustSettleAccountTime, CarUserAccountTime,
-                                    CustSettleRenewDuration, CarUserRenewDuration,
-                                    CarUserRefundDuration, ExpiryDate, DeviceNumber,
-                                    ICCID, VirtualICCID, LastUpdateTime, ActivationTime,
-                                    SupplierPackage
-                                ) VALUES (
-                                    %s,%s,NULL,1,%s,
-                                    0,NULL,0,0,
-                                    NULL,NULL,
-                                    NULL,NULL,
-                                    NULL,NULL,NULL,
-                                    NULL,NULL,NOW(),NULL,
-                                    NULL
-                                )
-                            """, (info_id, mn, row.get('StockStatus')))
-                        status_new.add(mn)
-                        batch_inserted += 1
-
-                    cnt = len(status_new)
-                    batch_counts['tb_simstatus'] = cnt
-
-                    # ── 3c. tb_simwarehouse ──
-                    wh_count = 0
-                    for row in row_chunk:
-                        mn = row['MaterialNo']
-                        if mn in existing_simwarehouse:
-                            continue
-                        info_id = siminfo_new.get(mn) or (existing_siminfo.get(mn) or {}).get('Id')
-                        if not info_id:
-                            continue
-
-                        loc_id = row.get('StockLocationId') or ''
-                        lt = 0 if loc_id.startswith('WH') else 1
-                        pro_name = district_map.get(row.get('ProCode') or '')
-                        city_name = district_map.get(row.get('CityCode') or '')
-
-                        await sim_cur.execute("""
-                                INSERT INTO tb_simwarehouse (
-                                    Id, SIMNumber, LocationType,
-                                    CustSettleId, CustSettleName, WarehouseId, WarehouseName,
-                                    ParentWareHouseId, ParentWareHouseName,
-                                    ProCode, ProName, CityCode, CityName,
-                                    OutStockTime, ManagerCode, ManagerName,
-                                    IsCardTermAdjust, OperationCode, OperationName, OperationTime,
-                                    Deleted
-                                ) VALUES (
-                                    %s,%s,%s,
-                                    %s,%s,%s,%s,
-                                    %s,%s,
-                                    %s,%s,%s,%s,
-                                    NULL,%s,%s,
-                                    NULL,%s,%s,%s,
-                                    0
-                                )
-                            """, (
-                            info_id, mn, lt,
-                            row.get('CustSettleId'), row.get('CustSettleName'),
-                            loc_id, row.get('StockLocationName'),
-                            row.get('ParentWarehouseId'), row.get('WHName'),
-                            row.get('ProCode'), pro_name, row.get('CityCode'), city_name,
-                            row.get('LoginName'), row.get('UserName'),
-                            row.get('AuditPerson'), row.get('AuditName'), row.get('AuditTime'),
-                        ))
-                        wh_count += 1
-                        batch_inserted += 1
-
-                    batch_counts['tb_simwarehouse'] = wh_count
-
-                    # ── 3d. tb_simfollowinfo ──
-                    # 需要 tb_simstatus 的 SIMLifeCycle / SIMStatus / SIMMarkStatus
-                    follow_count = 0
-                    for row in row_chunk:
-                        mn = row['MaterialNo']
-                        if mn in existing_simfollowinfo:
-                            continue
-                        # 已有的或刚写入的 tb_simstatus 均可
-                        if mn not in existing_simstatus and mn not in status_new:
-                            continue
-
-                        await sim_cur.execute(
-                            "SELECT Id, SIMLifeCycle, SIMStatus, SIMMarkStatus "
-                            "FROM tb_simstatus WHERE SimNumber = %s", (mn,)
-                        )
-                        st = await sim_cur.fetchone()
-                        if not st:
-                            continue
-
-                        await sim_cur.execute("""
-                                INSERT INTO tb_simfollowinfo (
-                                    SIMId, SIMNumber, SIMLifeCycle, SIMStatus, SIMMarkStatus,
-                                    OperationName, OperationSystem, CreatedByName, CreatedAt, Deleted
-                                ) VALUES (
-                                    %s,%s,%s,%s,%s,
-                                    '',2,%s,%s,0
-                                )
-                            """, (
-                            st['Id'], mn, st['SIMLifeCycle'], st['SIMStatus'], st['SIMMarkStatus'],
-                            row.get('AuditName'), row.get('AuditTime'),
-                        ))
-                        follow_count += 1
-                        batch_inserted += 1
-
-                    batch_counts['tb_simfollowinfo'] = follow_count
-
-                    # ── 3e. tb_simdatauseinfo ──
-                    du_count = 0
-                    for row in row_chunk:
-                        mn = row['MaterialNo']
-                        if mn in existing_simdatauseinfo:
-                            continue
-                        info_id = siminfo_new.get(mn) or (existing_siminfo.get(mn) or {}).get('Id')
-                        if not info_id:
-                            continue
-
-                        # SIMSupplierID：优先用刚写入的，否则用已存在的
-                        supplier_id = siminfo_supplier.get(mn)
-                        if supplier_id is None and mn in existing_siminfo:
-                            supplier_id = existing_siminfo[mn].get('SIMSupplierID')
-
-                        await sim_cur.execute("SELECT fn_nextval('DU') AS nid")
-                        du_id = (await sim_cur.fetchone())['nid']
-
-                        await sim_cur.execute("""
-                                INSERT INTO tb_simdatauseinfo (
-                                    Id, SIMId, SIMNumber, SIMSupplierID,
-                                    SIMUseDataTotal, SIMStatus, CheckDate, IsFrozen, Deleted
-                                ) VALUES (
-                                    %s,%s,%s,%s,
-                                    0,0,CURDATE(),0,0
-                                )
-                            """, (du_id, info_id, mn, supplier_id))
-                        du_count += 1
-                        batch_inserted += 1
-
-                    batch_counts['tb_simdatauseinfo'] = du_count
-
-                    # ── 提交事务 ──
-                    await sim_conn.commit()
+                            batch_counts = await self._write_chunk(
+                                sim_cur, row_chunk, existing, supplier_wh, district_map, written,
+                            )
+                        await sim_conn.commit()
+                    except Exception as e:
+                        await sim_conn.rollback()
+                        logger.error(f"数据同步失败: {e}")
+                        raise
+
                     for table, count in batch_counts.items():
                         inserted_by_table[table] += count
-                    processed += len(row_chunk)
+                    # 同一卡号可能对应多行仓储明细，进度按卡号计
+                    processed += len({r["MaterialNo"] for r in row_chunk})
                     logger.info(
-                        f"SIM同步批次完成: processed={processed}/{len(whcenter_rows)}, "
-                        f"batch_inserted={batch_inserted}"
+                        f"SIM同步批次完成: processed={processed}/{total}, "
+                        f"batch_inserted={sum(batch_counts.values())}"
                     )
                     await self._emit_progress(
                         progress_cb,
                         "syncing",
-                        f"已同步 {processed}/{len(whcenter_rows)} 条仓储记录",
-                        35 + int(processed / len(whcenter_rows) * 60),
-                        total=len(whcenter_rows),
+                        f"已同步 {processed}/{total} 张卡",
+                        35 + int(min(processed, total) / total * 60),
+                        total=total,
                         current=processed,
                         inserted_by_table=inserted_by_table,
                     )
-
-                except Exception as e:
-                    await sim_conn.rollback()
-                    logger.error(f"数据同步失败: {e}")
-                    raise
-
-            logger.info(f"写入 tb_siminfo: {inserted_by_table['tb_siminfo']} 条")
-            logger.info(f"写入 tb_simstatus: {inserted_by_table['tb_simstatus']} 条")
-            logger.info(f"写入 tb_simwarehouse: {inserted_by_table['tb_simwarehouse']} 条")
-            logger.info(f"写入 tb_simfollowinfo: {inserted_by_table['tb_simfollowinfo']} 条")
-            logger.info(f"写入 tb_simdatauseinfo: {inserted_by_table['tb_simdatauseinfo']} 条")
-            logger.info(f"数据同步完成，总计写入: {sum(inserted_by_table.values())} 条")
+            finally:
+                if not pending.done():
+                    pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+                await source.aclose()
+                if staged:
+                    try:
+                        await sim_cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGING_TABLE}")
+                    except Exception as exc:
+                        logger.warning(f"清理SIM同步临时表失败: {exc}")
+
+        logger.info(f"写入 tb_siminfo: {inserted_by_table['tb_siminfo']} 条")
+        logger.info(f"写入 tb_simstatus: {inserted_by_table['tb_simstatus']} 条")
+        logger.info(f"写入 tb_simwarehouse: {inserted_by_table['tb_simwarehouse']} 条")
+        logger.info(f"写入 tb_simfollowinfo: {inserted_by_table['tb_simfollowinfo']} 条")
+        logger.info(f"写入 tb_simdatauseinfo: {inserted_by_table['tb_simdatauseinfo']} 条")
+        logger.info(f"数据同步完成，总计写入: {sum(inserted_by_table.values())} 条")
 
         return {
             "total_inserted": sum(inserted_by_table.values()),
@@ -5,30 +5,29 @@ from typing import Any
 
 from app.log import logger
 from app.services.celery_dispatcher import dispatch_simtrans_sync
+from app.services.progress_store import ProgressStore
 from app.services.simtrans import sim_trans_service
 
-_LOCAL_TASKS: dict[str, dict[str, Any]] = {}
+_LOCAL_TASKS = ProgressStore("simtrans")
 
 
 def _now() -> str:
     return datetime.now().isoformat(timespec="seconds")
 
 
-def _local_update(task_id: str, **kwargs):
-    task = _LOCAL_TASKS.setdefault(task_id, {"task_id": task_id})
-    task.update(kwargs)
-    task["updated_at"] = _now()
+async def _local_update(task_id: str, **kwargs):
+    await _LOCAL_TASKS.aupdate(task_id, task_id=task_id, updated_at=_now(), **kwargs)
 
 
 async def _run_local_sync(task_id: str, receipt_numbers_text: str):
     async def progress_cb(payload: dict[str, Any]):
-        _local_update(task_id, status="running", **payload)
+        await _local_update(task_id, status="running", **payload)
 
     try:
-        _local_update(task_id, status="running", stage="queued", message="任务启动", progress=1)
+        await _local_update(task_id, status="running", stage="queued", message="任务启动", progress=1)
         result = await sim_trans_service.sync_sim_cards(receipt_numbers_text, progress_cb=progress_cb)
         ok = bool(result.get("success"))
-        _local_update(
+        await _local_update(
             task_id,
             status="success" if ok else "failed",
             stage="done" if ok else "failed",
@@ -40,7 +39,7 @@ async def _run_local_sync(task_id: str, receipt_numbers_text: str):
         )
     except Exception as exc:
         logger.error(f"SIM同步后台任务失败: task_id={task_id}, error={exc}", exc_info=True)
-        _local_update(
+        await _local_update(
             task_id,
             status="failed",
             stage="failed",
@@ -62,7 +61,7 @@ async def submit_simtrans_sync(receipt_numbers_text: str) -> dict[str, Any]:
         }
 
     task_id = str(uuid.uuid4())
-    _LOCAL_TASKS[task_id] = {
+    task = {
         "task_id": task_id,
         "backend": "local",
         "status": "queued",
@@ -72,8 +71,9 @@ async def submit_simtrans_sync(receipt_numbers_text: str) -> dict[str, Any]:
         "created_at": _now(),
         "updated_at": _now(),
     }
+    await _LOCAL_TASKS.astart(task_id, task)
     asyncio.create_task(_run_local_sync(task_id, receipt_numbers_text))
-    return _LOCAL_TASKS[task_id]
+    return task
 
 
 def _status_from_celery(task_id: str) -> dict[str, Any] | None:
@@ -125,11 +125,13 @@ def _status_from_celery(task_id: str) -> dict[str, Any] | None:
     return None
 
 
-def get_simtrans_sync_status(task_id: str) -> dict[str, Any]:
-    if task_id in _LOCAL_TASKS:
-        return _LOCAL_TASKS[task_id]
+async def get_simtrans_sync_status(task_id: str) -> dict[str, Any]:
+    local_task = await _LOCAL_TASKS.aget(task_id)
+    if local_task:
+        return local_task
 
-    celery_status = _status_from_celery(task_id)
+    # 读取 Celery 结果后端为阻塞调用
+    celery_status = await asyncio.to_thread(_status_from_celery, task_id)
     if celery_status:
         return celery_status
 
@@ -5,6 +5,8 @@ import aiomysql
 
 from app.services.db_pool import db_pool
 from app.settings.config import settings
+from app.utils.batch_lookup import chunked
+from app.utils.cache import AsyncTTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,22 @@ async def _get_conn_id() -> int:
 class UserService:
     """OA用户信息服务"""
 
+    def __init__(self):
+        # 按 UserCenterUserId 缓存人员信息（内勤、未删除）与姓名（不过滤），两者查询口径不同分开缓存
+        self._user_cache = AsyncTTLCache(
+            "oa_user",
+            maxsize=settings.USER_CACHE_MAXSIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+            negative_ttl=settings.USER_CACHE_NEGATIVE_TTL_SECONDS,
+        )
+        self._name_cache = AsyncTTLCache(
+            "oa_user_name",
+            maxsize=settings.USER_CACHE_MAXSIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+            negative_ttl=settings.USER_CACHE_NEGATIVE_TTL_SECONDS,
+        )
+        self._search_cache = AsyncTTLCache("oa_user_search", maxsize=256, ttl=settings.USER_CACHE_SEARCH_TTL_SECONDS)
+
     async def _ensure_pool(self) -> None:
         """确保连接池已注册"""
         pool = db_pool.get_pool(await _get_conn_id())
@@ -43,8 +61,28 @@ class UserService:
             params=conn["params"],
         )
 
+    async def _get_pool(self) -> aiomysql.Pool:
+        await self._ensure_pool()
+        pool = db_pool.get_pool(await _get_conn_id())
+        if pool is None:
+            raise ValueError("OA连接池不存在")
+        if not isinstance(pool, aiomysql.Pool):
+            raise ValueError("不支持的连接池类型")
+        return pool
+
+    def cache_stats(self) -> list[dict]:
+        """各缓存的命中统计"""
+        return [self._user_cache.stats(), self._name_cache.stats(), self._search_cache.stats()]
+
+    def _user_row(self, row) -> dict:
+        return {
+            "user_name": str(row[0]) if row[0] is not None else "",
+            "code": str(row[1]) if row[1] is not None else "",
+            "user_center_user_id": str(row[2]) if row[2] is not None else "",
+        }
+
     async def search_users(self, keyword: str, limit: int = 20) -> list[dict]:
-        """根据关键字模糊查询 OA 内勤人员
+        """根据关键字模糊查询 OA 内勤人员（结果短时缓存，并回填按 UserCenterUserId 的用户缓存）
 
         Args:
             keyword: 姓名/编码/UserCenterUserId 任意字段
@@ -53,17 +91,12 @@ class UserService:
         Returns:
             [{user_center_user_id, user_name, code}, ...]
         """
-        await self._ensure_pool()
-        pool = db_pool.get_pool(await _get_conn_id())
-        if pool is None:
-            raise ValueError("OA连接池不存在")
-
-        results: list[dict] = []
         keyword = (keyword or "").strip()
         if not keyword:
-            return results
+            return []
 
-        if isinstance(pool, aiomysql.Pool):
+        async def load() -> list[dict]:
+            pool = await self._get_pool()
             async with pool.acquire() as conn, conn.cursor() as cur:
                 sql = """
                         SELECT UserName, Code, UserCenterUserId
@@ -77,39 +110,38 @@ class UserService:
                 like_kw = f"%{keyword}%"
                 await cur.execute(sql, (like_kw, like_kw, like_kw, limit))
                 rows = await cur.fetchall()
-                for row in rows:
-                    results.append({
-                        "user_name": str(row[0]) if row[0] is not None else "",
-                        "code": str(row[1]) if row[1] is not None else "",
-                        "user_center_user_id": str(row[2]) if row[2] is not None else "",
-                    })
-        else:
-            raise ValueError("不支持的连接池类型")
+            users = [self._user_row(row) for row in rows]
+            for user in users:
+                if user["user_center_user_id"]:
+                    self._user_cache.set(user["user_center_user_id"], user)
+            return users
 
-        return results
+        results = await self._search_cache.get_or_load((keyword, limit), load)
+        return [dict(user) for user in results]
 
     async def batch_get_by_user_center_ids(self, user_center_user_ids: list[str]) -> dict[str, dict]:
         """根据多个 UserCenterUserId 批量查询 OA 人员信息
 
+        先读缓存，未命中的 Id 合并为一次查询；查无此人的 Id 会短时负缓存。
+
         Args:
             user_center_user_ids: UserCenterUserId 列表
 
         Returns:
             {user_center_user_id: {user_name, code, user_center_user_id}, ...}
         """
-        await self._ensure_pool()
-        pool = db_pool.get_pool(await _get_conn_id())
-        if pool is None:
-            raise ValueError("OA连接池不存在")
-
-        result: dict[str, dict] = {}
         ids = [str(i).strip() for i in (user_center_user_ids or []) if i and str(i).strip()]
         if not ids:
-            return result
+            return {}
+        cached = await self._user_cache.get_many(ids, self._load_users)
+        return {ucu_id: dict(user) for ucu_id, user in cached.items()}
 
-        if isinstance(pool, aiomysql.Pool):
-            async with pool.acquire() as conn, conn.cursor() as cur:
-                placeholders = ",".join(["%s"] * len(ids))
+    async def _load_users(self, ids: list[str]) -> dict[str, dict]:
+        pool = await self._get_pool()
+        result: dict[str, dict] = {}
+        async with pool.acquire() as conn, conn.cursor() as cur:
+            for chunk in chunked(ids):
+                placeholders = ",".join(["%s"] * len(chunk))
                 sql = f"""
                         SELECT UserName, Code, UserCenterUserId
                         FROM membership_userbaseinfo
@@ -117,51 +149,37 @@ class UserService:
                           AND UserType <> 'DT0000000501'
                           AND UserCenterUserId IN ({placeholders})
                     """
-                await cur.execute(sql, tuple(ids))
-                rows = await cur.fetchall()
-                for row in rows:
-                    ucu_id = str(row[2]) if row[2] is not None else ""
-                    if ucu_id:
-                        result[ucu_id] = {
-                            "user_name": str(row[0]) if row[0] is not None else "",
-                            "code": str(row[1]) if row[1] is not None else "",
-                            "user_center_user_id": ucu_id,
-                        }
-        else:
-            raise ValueError("不支持的连接池类型")
-
+                await cur.execute(sql, tuple(chunk))
+                for row in await cur.fetchall():
+                    user = self._user_row(row)
+                    if user["user_center_user_id"]:
+                        result[user["user_center_user_id"]] = user
         return result
 
     async def get_user_names_by_user_center_ids(self, user_center_ids: list[str]) -> dict[str, str]:
-        """根据UserCenterUserId批量获取用户姓名，返回 {user_center_user_id: user_name}"""
-        await self._ensure_pool()
-        pool = db_pool.get_pool(await _get_conn_id())
-        if pool is None:
-            raise ValueError("OA连接池不存在")
-
-        result: dict[str, str] = {}
-        valid_ids = list(set(uid for uid in user_center_ids if uid))
+        """根据UserCenterUserId批量获取用户姓名，返回 {user_center_user_id: user_name}（带缓存）"""
+        valid_ids = [uid for uid in user_center_ids if uid]
         if not valid_ids:
-            return result
+            return {}
+        return await self._name_cache.get_many(valid_ids, self._load_user_names)
 
-        if isinstance(pool, aiomysql.Pool):
-            async with pool.acquire() as conn, conn.cursor() as cur:
-                placeholders = ",".join(["%s"] * len(valid_ids))
+    async def _load_user_names(self, ids: list[str]) -> dict[str, str]:
+        pool = await self._get_pool()
+        result: dict[str, str] = {}
+        async with pool.acquire() as conn, conn.cursor() as cur:
+            for chunk in chunked(ids):
+                placeholders = ",".join(["%s"] * len(chunk))
                 sql = f"""
                         SELECT UserCenterUserId, UserName
                         FROM membership_userbaseinfo
                         WHERE UserCenterUserId IN ({placeholders})
                     """
-                await cur.execute(sql, valid_ids)
-                rows = await cur.fetchall()
-                for row in rows:
+                await cur.execute(sql, list(chunk))
+                for row in await cur.fetchall():
                     uid = str(row[0]) if row[0] is not None else ""
                     name = str(row[1]) if row[1] is not None else ""
                     if uid:
                         result[uid] = name
-        else:
-            raise ValueError("不支持的连接池类型")
-
         return result
 
     async def get_local_user_display_names(self, user_ids: list[str]) -> dict[str, str]:
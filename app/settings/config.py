@@ -33,6 +33,10 @@ class Settings:
     def APP_DESCRIPTION(self) -> str:
         return self._config.app.description
 
+    @property
+    def SERVER_WORKERS(self) -> int:
+        return self._config.server.workers
+
     @property
     def CORS_ORIGINS(self) -> list:
         return self._config.cors.origins
@@ -101,6 +105,130 @@ class Settings:
     def REDIS_URL(self) -> str:
         return self._config.redis.url
 
+    @property
+    def PROGRESS_STORE_BACKEND(self) -> str:
+        return self._config.progress_store.backend
+
+    @property
+    def PROGRESS_STORE_TTL_SECONDS(self) -> int:
+        return self._config.progress_store.ttl_seconds
+
+    @property
+    def PROGRESS_STORE_FILE_DIR(self) -> str:
+        return self._config.progress_store.file_dir
+
+    @property
+    def CPU_POOL_MAX_WORKERS(self) -> int:
+        return self._config.cpu_pool.max_workers
+
+    @property
+    def CPU_POOL_MAX_QUEUE(self) -> int:
+        return self._config.cpu_pool.max_queue
+
+    @property
+    def PASSWORD_HASH_POOL_SIZE(self) -> int:
+        return self._config.password_hash.pool_size
+
+    @property
+    def SIMTRANS_SYNC_STRATEGY(self) -> str:
+        return self._config.simtrans.sync_strategy
+
+    @property
+    def FCC_RELATION_CONCURRENCY(self) -> int:
+        return self._config.fcc_relation.concurrency
+
+    @property
+    def FCC_RELATION_STALE_SECONDS(self) -> int:
+        return self._config.fcc_relation.stale_seconds
+
+    @property
+    def USER_CACHE_MAXSIZE(self) -> int:
+        return self._config.user_cache.maxsize
+
+    @property
+    def USER_CACHE_TTL_SECONDS(self) -> int:
+        return self._config.user_cache.ttl_seconds
+
+    @property
+    def USER_CACHE_NEGATIVE_TTL_SECONDS(self) -> int:
+        return self._config.user_cache.negative_ttl_seconds
+
+    @property
+    def USER_CACHE_SEARCH_TTL_SECONDS(self) -> int:
+        return self._config.user_cache.search_ttl_seconds
+
+    @property
+    def AUDIT_LOG_BATCH_SIZE(self) -> int:
+        return self._config.audit_log.batch_size
+
+    @property
+    def AUDIT_LOG_FLUSH_INTERVAL_MS(self) -> int:
+        return self._config.audit_log.flush_interval_ms
+
+    @property
+    def AUDIT_LOG_MAX_QUEUE(self) -> int:
+        return self._config.audit_log.max_queue
+
+    @property
+    def AUDIT_LOG_OVERFLOW(self) -> str:
+        return self._config.audit_log.overflow
+
+    @property
+    def AUDIT_LOG_SHUTDOWN_TIMEOUT(self) -> float:
+        return self._config.audit_log.shutdown_timeout
+
+    @property
+    def AI_LOG_BATCH_SIZE(self) -> int:
+        return self._config.ai_log.batch_size
+
+    @property
+    def AI_LOG_FLUSH_INTERVAL_MS(self) -> int:
+        return self._config.ai_log.flush_interval_ms
+
+    @property
+    def AI_LOG_MAX_QUEUE(self) -> int:
+        return self._config.ai_log.max_queue
+
+    @property
+    def AI_LOG_PUT_TIMEOUT_MS(self) -> int:
+        return self._config.ai_log.put_timeout_ms
+
+    @property
+    def AI_LOG_SHUTDOWN_TIMEOUT(self) -> float:
+        return self._config.ai_log.shutdown_timeout
+
+    @property
+    def AUTH_CACHE_MAXSIZE(self) -> int:
+        return self._config.auth_cache.maxsize
+
+    @property
+    def AUTH_CACHE_USER_TTL_SECONDS(self) -> int:
+        return self._config.auth_cache.user_ttl_seconds
+
+    @property
+    def AUTH_CACHE_PERMISSION_TTL_SECONDS(self) -> int:
+        return self._config.auth_cache.permission_ttl_seconds
+
+    @property
+    def AUTH_CACHE_VERSION_CHECK_SECONDS(self) -> float:
+        return self._config.auth_cache.version_check_seconds
+
+    @property
+    def AI_TOKEN_CACHE_MAXSIZE(self) -> int:
+        return self._config.ai_token.maxsize
+
+    @property
+    def AI_TOKEN_CACHE_TTL_SECONDS(self) -> int:
+        return self._config.ai_token.cache_ttl_seconds
+
+    @property
+    def AI_TOKEN_NEGATIVE_TTL_SECONDS(self) -> int:
+        return self._config.ai_token.negative_ttl_seconds
+
+    @property
+    def AI_TOKEN_LAST_USED_FLUSH_SECONDS(self) -> float:
+        return self._config.ai_token.last_used_flush_seconds
+
     @property
     def CELERY_ENABLED(self) -> bool:
         return self._config.celery.enabled
@@ -174,3 +174,17 @@ def sync_simtrans_task(self, receipt_numbers_text: str):
             raise
 
     return run_async_with_tortoise(runner)
+
+
+@celery_app.task(
+    name="dbadmin.fcc.relation",
+    bind=True,
+    ignore_result=False,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def execute_fcc_relation_task(self, task_id: str, relations: list[dict]):
+    from app.services.fcc_relation_service import fcc_relation_service
+
+    # 任务状态与已完成关系记录在 ProgressStore，重新投递时自动跳过已完成部分
+    return run_async_with_tortoise(fcc_relation_service.execute_relation_task, task_id, relations)
@@ -1,9 +1,9 @@
 import json
 import re
+from collections.abc import Mapping
 from typing import Any
 
 from fastapi import Request
-from starlette.responses import Response
 
 from app.models.admin import AuditLog
 
@@ -34,13 +34,13 @@ def should_skip_request_body(request: Request) -> bool:
     return bool(SKIP_REQUEST_BODY_PATH_RE.search(request.url.path))
 
 
-def should_skip_response_body(request: Request, response: Response) -> bool:
+def should_skip_response_body(request: Request, headers: Mapping[str, str]) -> bool:
     if SKIP_RESPONSE_BODY_PATH_RE.search(request.url.path):
         return True
-    content_disposition = response.headers.get("content-disposition", "")
+    content_disposition = headers.get("content-disposition", "")
     if "attachment" in content_disposition.lower():
         return True
-    content_type = response.headers.get("content-type", "")
+    content_type = headers.get("content-type", "")
     if content_type and BINARY_RESPONSE_CONTENT_TYPE_RE.search(content_type):
         return True
     return False
@@ -68,6 +68,29 @@ def truncate_body_text(text: str) -> str:
     return text[:MAX_AUDIT_BODY_LEN] + f"...(truncated, total {len(text)} chars)"
 
 
+def decode_captured_body(data: bytes, total: int) -> str:
+    """
+    解码流式截取的前 MAX_AUDIT_BODY_LEN 字节，total 为实际总字节数
+
+    截断位置可能落在多字节字符中间，丢弃尾部不完整字符后再解码；非 UTF-8 内容返回空串
+    """
+    if not data:
+        return ""
+    truncated = total > len(data)
+    # UTF-8 单字符最多 4 字节，截断时最多需要回退 3 字节
+    for cut in range(4 if truncated else 1):
+        try:
+            text = data[:len(data) - cut].decode("utf-8")
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        return ""
+    if truncated:
+        return text + f"...(truncated, total {total} bytes)"
+    return text
+
+
 async def create_operation_audit_log(
     *,
     user_id: int,
@@ -0,0 +1,55 @@
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import Any
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+def chunked(items: Sequence[Any], size: int = LOOKUP_CHUNK_SIZE) -> Iterator[Sequence[Any]]:
+    """按固定大小切分序列"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def normalize_no(value: Any) -> str:
+    """与数据库默认排序规则保持一致的比较键：忽略大小写与尾部空格"""
+    return str(value).rstrip().lower()
+
+
+async def resolve_in_batches(
+    cur,
+    sql: str,
+    keys: Iterable[str],
+    row_keys: Callable[[Any], Iterable[Any]],
+    chunk_size: int = LOOKUP_CHUNK_SIZE,
+    marker: str = "%s",
+) -> dict[str, list[Any]]:
+    """
+    分块批量解析一组标识，返回 每个去重后的标识 -> 命中行列表（未命中为空列表）
+
+    - sql 中的每个 {placeholders} 都会替换为本块的 IN 占位列表，参数按出现次数重复
+    - row_keys 返回一行可被哪些标识命中（如 Id 与编码），用于在内存中把结果行归并回输入
+    - marker 为驱动的参数占位符，MySQL 为 %s，ODBC（SQL Server）为 ?
+    """
+    distinct = list(dict.fromkeys(k for k in keys if k))
+    matches: dict[str, list[Any]] = {k: [] for k in distinct}
+    lookup: dict[str, list[str]] = {}
+    for k in distinct:
+        lookup.setdefault(normalize_no(k), []).append(k)
+
+    repeat = sql.count("{placeholders}")
+    for chunk in chunked(distinct, chunk_size):
+        placeholders = ", ".join([marker] * len(chunk))
+        # 同一行可能被不同块中的标识命中，只归并到本块的标识，避免重复
+        in_chunk = set(chunk)
+        await cur.execute(sql.format(placeholders=placeholders), tuple(chunk) * repeat)
+        for row in await cur.fetchall():
+            hit: list[str] = []
+            for value in row_keys(row):
+                if value is None:
+                    continue
+                for k in lookup.get(normalize_no(value), ()):
+                    if k in in_chunk and k not in hit:
+                        hit.append(k)
+            for k in hit:
+                matches[k].append(row)
+    return matches
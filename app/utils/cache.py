@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from typing import Any, TypeVar
+
+_M = TypeVar("_M")
+
+# 负缓存占位：记录"查过但不存在"，避免反复回源
+_NEGATIVE = object()
+
+
+class AsyncTTLCache:
+    """
+    进程内 LRU + TTL 异步缓存
+
+    - 超过 maxsize 时淘汰最久未使用的条目，条目过期后视为未命中
+    - get_many 把所有未命中的键合并为一次 loader 调用（批量回源）
+    - loader 未返回的键按 negative_ttl 记为负缓存（negative_ttl 为 0 时不缓存）
+    - 并发请求同一个未命中的键时只回源一次（single-flight），其余请求等待同一结果
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300, negative_ttl: float = 0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _lookup(self, key: Hashable) -> tuple[float, Any] | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存（负缓存与未命中均返回 default，不计入统计）"""
+        item = self._lookup(key)
+        if item is None or item[1] is _NEGATIVE:
+            return default
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def set_negative(self, key: Hashable) -> None:
+        if self.negative_ttl > 0:
+            self.set(key, _NEGATIVE, self.negative_ttl)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """单键读取，未命中时调用 loader；loader 返回 None 视为不存在"""
+
+        async def load_one(keys: list[Hashable]) -> dict[Hashable, Any]:
+            value = await loader()
+            return {} if value is None else {keys[0]: value}
+
+        return (await self.get_many([key], load_one)).get(key)
+
+    async def get_many(
+        self,
+        keys: Iterable[Hashable],
+        loader: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+    ) -> dict[Hashable, Any]:
+        """批量读取，返回命中的 {key: value}；不存在的键不出现在结果中"""
+        result: dict[Hashable, Any] = {}
+        waiting: dict[Hashable, asyncio.Future] = {}
+        missing: list[Hashable] = []
+        for key in dict.fromkeys(keys):
+            item = self._lookup(key)
+            if item is not None:
+                self.hits += 1
+                if item[1] is not _NEGATIVE:
+                    result[key] = item[1]
+            elif key in self._inflight:
+                self.hits += 1
+                waiting[key] = self._inflight[key]
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._inflight.update(futures)
+            self.loads += 1
+            try:
+                loaded = await loader(missing)
+            except BaseException as exc:
+                for fut in futures.values():
+                    if isinstance(exc, Exception):
+                        fut.set_exception(exc)
+                        # 没有其他等待者时避免 "exception was never retrieved" 告警
+                        fut.exception()
+                    else:
+                        fut.cancel()
+                raise
+            else:
+                for key, fut in futures.items():
+                    if key in loaded:
+                        self.set(key, loaded[key])
+                        result[key] = loaded[key]
+                        fut.set_result(loaded[key])
+                    else:
+                        self.set_negative(key)
+                        fut.set_result(_NEGATIVE)
+            finally:
+                for key, fut in futures.items():
+                    if self._inflight.get(key) is fut:
+                        del self._inflight[key]
+
+        for key, fut in waiting.items():
+            value = await fut
+            if value is not _NEGATIVE:
+                result[key] = value
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def model_from_row(model: type[_M], row: dict[str, Any]) -> _M:
+    """
+    由缓存的字段值（QuerySet.values() 的结果）构造模型实例
+
+    走模型的公开构造器完成字段类型转换，并显式标记为已落库，之后 save() 按主键更新而不是插入
+    """
+    obj = model(**row)
+    obj._saved_in_db = True
+    return obj
@@ -1,8 +1,17 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib import pwd
 from passlib.context import CryptContext
 
+from app.settings.config import settings
+
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -14,3 +23,34 @@ def get_password_hash(password: str) -> str:
 
 def generate_password() -> str:
     return pwd.genword()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_POOL_SIZE,
+                thread_name_prefix="password-hash",
+            )
+        return _executor
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在线程池中校验密码（argon2 单次耗时数十毫秒，不能在事件循环中同步执行）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在线程池中计算密码哈希"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), get_password_hash, password)
+
+
+def shutdown_password_pool():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,78 @@
+import os
+from typing import Any
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadSizeError(ValueError):
+    """上传文件为空或超过大小限制。"""
+
+
+def _size_limit_message(max_size: int, size: int | None = None) -> str:
+    limit_mb = max_size / 1024 / 1024
+    if size is None:
+        return f"文件大小超过限制（最大{limit_mb:.0f}MB）"
+    return f"文件大小超过限制（最大{limit_mb:.0f}MB），当前文件大小: {size / 1024 / 1024:.2f}MB"
+
+
+async def save_upload_file(
+    file: UploadFile,
+    dest_path: str,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> dict[str, Any]:
+    """
+    分块把上传文件写入目标路径，内存占用与文件大小无关
+
+    - 已知文件大小时先行校验，超限直接拒绝
+    - 写入过程中累计大小，一旦超限立即中止并删除半成品
+
+    返回: {"path": 目标路径, "size": 字节数}
+    """
+    if file.size is not None and file.size > max_size:
+        raise UploadSizeError(_size_limit_message(max_size, file.size))
+
+    size = 0
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    try:
+        with open(dest_path, "wb") as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadSizeError(_size_limit_message(max_size))
+                f.write(chunk)
+        if size == 0:
+            raise UploadSizeError("文件内容为空")
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    return {"path": dest_path, "size": size}
+
+
+async def read_upload_limited(
+    file: UploadFile,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> bytes:
+    """分块读取上传文件到内存，超过大小限制时立即中止（用于必须整体处理的小文件）"""
+    if file.size is not None and file.size > max_size:
+        raise UploadSizeError(_size_limit_message(max_size, file.size))
+
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise UploadSizeError(_size_limit_message(max_size))
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -0,0 +1,19 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "imptask" ADD COLUMN "temp_table_name" VARCHAR(64);
+        ALTER TABLE "imptask" ADD COLUMN "row_count" BIGINT;
+        ALTER TABLE "imptask" ADD COLUMN "columns_meta" JSONB;
+        CREATE INDEX "idx_imptask_temp_ta_3f9c1a" ON "imptask" ("temp_table_name");
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_imptask_temp_ta_3f9c1a";
+        ALTER TABLE "imptask" DROP COLUMN "temp_table_name";
+        ALTER TABLE "imptask" DROP COLUMN "row_count";
+        ALTER TABLE "imptask" DROP COLUMN "columns_meta";
+    """
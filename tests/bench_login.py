@@ -0,0 +1,124 @@
+"""
+登录吞吐基准（httpx + ASGITransport，SQLite 内存库）
+
+并发登录持续 duration 秒，同时每 10ms 探测一个轻量 JSON 接口，
+输出登录 RPS 以及探测接口在登录压力下的 P50/P99 延迟。
+分别测量 inline（事件循环内同步校验 argon2，改造前行为）与 threadpool（线程池校验）两种模式。
+
+用法：
+    python tests/bench_login.py --duration 5 --logins 16
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from tortoise.context import TortoiseContext
+
+from app.controllers import user as user_module
+from app.controllers.user import user_controller
+from app.models.admin import User
+from app.schemas.login import CredentialsSchema
+from app.utils import password
+
+PROBE_INTERVAL = 0.01
+
+
+async def _inline_verify(plain_password: str, hashed_password: str) -> bool:
+    return password.verify_password(plain_password, hashed_password)
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login(credentials: CredentialsSchema):
+        user, error = await user_controller.authenticate(credentials)
+        return {"ok": user is not None, "error": error}
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    return app
+
+
+async def _run_mode(app: FastAPI, duration: float, logins: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop_at = time.perf_counter() + duration
+        login_count = 0
+        ping_latencies: list[float] = []
+
+        async def login_worker():
+            nonlocal login_count
+            while time.perf_counter() < stop_at:
+                response = await client.post("/login", json={"username": "bench", "password": "bench-password"})
+                assert response.json()["ok"]
+                login_count += 1
+
+        async def prober():
+            # 按固定节奏发起探测，延迟从计划发起时刻算起，事件循环被阻塞的时间也会计入
+            scheduled = time.perf_counter()
+            while scheduled < stop_at:
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - scheduled)
+                scheduled += PROBE_INTERVAL
+
+        start = time.perf_counter()
+        await asyncio.gather(prober(), *(login_worker() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+
+    ping_latencies.sort()
+    return {
+        "login_rps": login_count / elapsed,
+        "ping_count": len(ping_latencies),
+        "ping_p50_ms": ping_latencies[len(ping_latencies) // 2] * 1000 if ping_latencies else 0.0,
+        "ping_p99_ms": ping_latencies[min(len(ping_latencies) - 1, int(len(ping_latencies) * 0.99))] * 1000
+        if ping_latencies
+        else 0.0,
+        "ping_mean_ms": statistics.fmean(ping_latencies) * 1000 if ping_latencies else 0.0,
+    }
+
+
+async def main(duration: float, logins: int):
+    async with TortoiseContext() as ctx:
+        await ctx.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]})
+        await ctx.generate_schemas()
+        await User.create(
+            username="bench",
+            email="bench@example.com",
+            password=password.get_password_hash("bench-password"),
+        )
+
+        app = _build_app()
+        results = {}
+        threaded = user_module.verify_password_async
+        user_module.verify_password_async = _inline_verify
+        results["inline"] = await _run_mode(app, duration, logins)
+        user_module.verify_password_async = threaded
+        results["threadpool"] = await _run_mode(app, duration, logins)
+
+    print(f"duration={duration}s concurrent_logins={logins} pool_size={password.settings.PASSWORD_HASH_POOL_SIZE}")
+    print(f"{'mode':<12}{'login/s':>10}{'pings':>8}{'ping p50(ms)':>14}{'ping p99(ms)':>14}{'ping mean(ms)':>15}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<12}{r['login_rps']:>10.1f}{r['ping_count']:>8}"
+            f"{r['ping_p50_ms']:>14.1f}{r['ping_p99_ms']:>14.1f}{r['ping_mean_ms']:>15.1f}"
+        )
+    password.shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="登录吞吐基准")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--logins", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.duration, args.logins))
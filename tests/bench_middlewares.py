@@ -0,0 +1,146 @@
+"""
+中间件开销基准（httpx + ASGITransport，进程内调用，不经过网络）
+
+对小 JSON 接口分别测量：无中间件、BaseHTTPMiddleware 空实现（改造前的框架开销参照）、
+各业务中间件单独挂载、完整中间件栈，输出平均/P50/P99 延迟、相对无中间件的附加延迟与吞吐。
+
+用法：
+    python tests/bench_middlewares.py --requests 5000 --concurrency 16
+
+把本脚本复制到改造前的提交（如 e139219）上运行即可得到 before 数据：该提交中还没有
+app.services.audit_writer，app.core.auditlog 也无法导入，对应的打桩与场景会自动跳过。
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core import middlewares
+from app.core.middlewares import BackGroundTaskMiddleware, HttpAuditLogMiddleware
+
+# 以下模块在改造前的提交中不存在或无法导入
+try:
+    from app.core.auditlog import AuditLogMiddleware
+except Exception:
+    AuditLogMiddleware = None
+try:
+    from app.services.audit_writer import audit_writer
+except ImportError:
+    audit_writer = None
+
+AUDIT_KWARGS = {"methods": ["GET", "POST", "PUT", "DELETE"], "exclude_paths": ["/docs", "/openapi.json"]}
+
+
+class PassThroughMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def _disable_persistence():
+    # 只测中间件本身，审计记录不落库
+    if audit_writer is not None:
+        audit_writer.submit = lambda data, model=None: True
+    if hasattr(middlewares, "AuditLog"):
+
+        async def create(**kwargs):
+            return None
+
+        middlewares.AuditLog.create = create
+
+
+def _build_app(stack: list[Middleware]) -> FastAPI:
+    app = FastAPI(middleware=stack)
+
+    @app.get("/ping", summary="ping")
+    async def ping():
+        return {"code": 200, "msg": "OK", "data": {"pong": True}}
+
+    @app.post("/items", summary="create item")
+    async def create_item(item: dict):
+        return {"code": 200, "msg": "OK", "data": item}
+
+    return app
+
+
+SCENARIOS: dict[str, list[Middleware]] = {
+    "bare": [],
+    "BaseHTTPMiddleware(passthrough)": [Middleware(PassThroughMiddleware)],
+    "BackGroundTaskMiddleware": [Middleware(BackGroundTaskMiddleware)],
+    "HttpAuditLogMiddleware": [Middleware(HttpAuditLogMiddleware, **AUDIT_KWARGS)],
+    "stack(BgTask+HttpAudit)": [
+        Middleware(BackGroundTaskMiddleware),
+        Middleware(HttpAuditLogMiddleware, **AUDIT_KWARGS),
+    ],
+}
+if AuditLogMiddleware is not None:
+    SCENARIOS["AuditLogMiddleware"] = [Middleware(AuditLogMiddleware)]
+
+
+async def _run_scenario(app: FastAPI, total: int, concurrency: int, warmup: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i: int) -> float:
+            start = time.perf_counter()
+            if i % 2:
+                response = await client.post("/items", json={"id": i, "name": "bench"})
+            else:
+                response = await client.get("/ping")
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        for i in range(warmup):
+            await one(i)
+
+        latencies: list[float] = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(i: int):
+            async with semaphore:
+                latencies.append(await one(i))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+        "rps": total / elapsed,
+    }
+
+
+async def main(total: int, concurrency: int, warmup: int):
+    _disable_persistence()
+    results = {}
+    for name, stack in SCENARIOS.items():
+        results[name] = await _run_scenario(_build_app(stack), total, concurrency, warmup)
+
+    bare = results["bare"]["mean_us"]
+    print(f"requests={total} concurrency={concurrency}")
+    print(f"{'scenario':<34}{'mean(us)':>10}{'p50(us)':>10}{'p99(us)':>10}{'added(us)':>11}{'req/s':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<34}{r['mean_us']:>10.1f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}"
+            f"{r['mean_us'] - bare:>11.1f}{r['rps']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="中间件开销基准")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.warmup))
@@ -0,0 +1,103 @@
+"""
+Tests for buffered AiToolCallLog / AiLlmCallLog persistence
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tortoise.context import TortoiseContext
+
+from aiagent.llm import service
+from aiagent.models.ai_llm_call_log import AiLlmCallLog
+from aiagent.models.ai_tool_call_log import AiToolCallLog
+from app.services.audit_writer import AuditLogWriter
+
+
+async def _with_db(body):
+    async with TortoiseContext() as ctx:
+        await ctx.init(db_url="sqlite://:memory:", modules={"models": ["app.models", "aiagent.models"]})
+        await ctx.generate_schemas()
+        return await body()
+
+
+def test_shared_writer_groups_models_into_bulk_inserts():
+    writer = AuditLogWriter(batch_size=10, flush_interval_ms=1000, max_queue=100, name="AI调用日志", time_field="timestamp")
+
+    async def body():
+        for i in range(3):
+            await writer.put({"tool_name": f"t{i}", "status": "success", "tool_input": {"i": i}}, model=AiToolCallLog)
+            await writer.put({"provider": "openai", "model_name": "m", "status": "success"}, model=AiLlmCallLog)
+        queued = await AiToolCallLog.all().count()
+        await writer.stop()
+        tools = await AiToolCallLog.all().order_by("id").values("tool_name", "tool_input", "timestamp")
+        return queued, tools, await AiLlmCallLog.all().count(), writer.stats()
+
+    queued, tools, llm_count, stats = asyncio.run(_with_db(body))
+    assert queued == 0
+    assert [t["tool_name"] for t in tools] == ["t0", "t1", "t2"]
+    assert tools[2]["tool_input"] == {"i": 2} and all(t["timestamp"] for t in tools)
+    assert llm_count == 3
+    assert stats["written"] == 6 and stats["batches"] == 1
+
+
+def test_put_waits_for_space_and_never_drops_kept_records():
+    writer = AuditLogWriter(
+        batch_size=10, flush_interval_ms=1000, max_queue=1, name="AI调用日志", time_field="timestamp", put_timeout=0.05
+    )
+
+    async def stalled():
+        await asyncio.Event().wait()
+
+    # 后台任务不消费队列，模拟写入跟不上
+    writer._run = stalled
+
+    async def body():
+        assert await writer.put({"tool_name": "read1", "status": "success"}, model=AiToolCallLog)
+        dropped = await writer.put({"tool_name": "read2", "status": "success"}, model=AiToolCallLog)
+        kept = asyncio.create_task(
+            writer.put({"tool_name": "write", "status": "success", "is_write_op": True}, model=AiToolCallLog, keep=True)
+        )
+        await asyncio.sleep(0.1)
+        waiting = not kept.done()
+        writer._queue.get_nowait()
+        accepted = await asyncio.wait_for(kept, 1)
+        await writer.stop()
+        return dropped, waiting, accepted, await AiToolCallLog.all().values_list("tool_name", flat=True)
+
+    dropped, waiting, accepted, names = asyncio.run(_with_db(body))
+    assert dropped is False and writer.stats()["dropped"] == 1
+    assert waiting and accepted
+    assert names == ["write"]
+
+
+class _FailingClient:
+    config_id = None
+    provider = "openai"
+    model_name = "m"
+    base_url = "http://llm"
+
+    async def ask_stream(self, system_prompt, messages):
+        yield {"type": "text", "delta": "partial"}
+        raise RuntimeError("boom")
+
+
+def test_llm_stream_error_logged_through_writer(monkeypatch):
+    writer = AuditLogWriter(batch_size=10, flush_interval_ms=1000, max_queue=100, name="AI调用日志", time_field="timestamp")
+    monkeypatch.setattr(service, "ai_log_writer", writer)
+
+    async def get_client():
+        return _FailingClient()
+
+    monkeypatch.setattr(service.LLMClient, "get", get_client)
+
+    async def body():
+        chunks = [c async for c in service.llm_ask_stream("sys", "hi", "s1", ai_token=SimpleNamespace(id=None))]
+        await writer.stop()
+        return chunks, await AiLlmCallLog.all().values("session_id", "status", "error_message")
+
+    chunks, logs = asyncio.run(_with_db(body))
+    assert chunks[-1]["delta"].startswith("\n\n[生成失败：boom")
+    assert logs == [{"session_id": "s1", "status": "error", "error_message": "boom"}]
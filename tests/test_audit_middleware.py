@@ -0,0 +1,144 @@
+"""
+Tests for HttpAuditLogMiddleware: pass-through streaming with capped body capture
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.core import middlewares
+from app.core.middlewares import HttpAuditLogMiddleware
+from app.utils.audit_log import MAX_AUDIT_BODY_LEN, decode_captured_body
+
+
+def _app(monkeypatch):
+    submitted: list[dict] = []
+    monkeypatch.setattr(middlewares.audit_writer, "submit", submitted.append)
+    app = FastAPI()
+
+    @app.post("/echo", summary="回显")
+    async def echo(request: Request):
+        body = await request.body()
+        return {"size": len(body)}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(4):
+                yield b"x" * MAX_AUDIT_BODY_LEN
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/download")
+    async def download():
+        return StreamingResponse(iter([b"PK\x03\x04"]), media_type="application/zip")
+
+    app.add_middleware(HttpAuditLogMiddleware, methods=["GET", "POST"], exclude_paths=["/docs", "/openapi.json"])
+    return app, submitted
+
+
+def _request(app, method, url, **kwargs):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+
+    return asyncio.run(main())
+
+
+def test_request_and_response_bodies_are_captured(monkeypatch):
+    app, submitted = _app(monkeypatch)
+
+    response = _request(app, "POST", "/echo", content=b'{"a": 1}')
+
+    assert response.json() == {"size": 8}
+    [log] = submitted
+    assert log["request_body"] == '{"a": 1}'
+    assert log["response_body"] == '{"size":8}'
+    assert log["status"] == 200 and log["summary"] == "回显" and log["user_id"] == 0
+
+
+def test_large_bodies_pass_through_but_capture_is_capped(monkeypatch):
+    app, submitted = _app(monkeypatch)
+    payload = "中" * MAX_AUDIT_BODY_LEN
+
+    _request(app, "POST", "/echo", content=payload.encode())
+    response = _request(app, "GET", "/stream")
+
+    assert len(response.content) == 4 * MAX_AUDIT_BODY_LEN
+    request_log, stream_log = submitted
+    request_text = request_log["request_body"]
+    assert request_text.endswith(f"...(truncated, total {3 * MAX_AUDIT_BODY_LEN} bytes)")
+    assert set(request_text.split("...")[0]) == {"中"}
+    assert stream_log["response_body"].startswith("x" * MAX_AUDIT_BODY_LEN + "...(truncated")
+
+
+def test_binary_and_excluded_responses(monkeypatch):
+    app, submitted = _app(monkeypatch)
+
+    assert _request(app, "GET", "/download").content == b"PK\x03\x04"
+    _request(app, "GET", "/openapi.json")
+
+    [log] = submitted
+    assert log["path"] == "/download" and log["response_body"] == ""
+
+
+def test_decode_captured_body_trims_partial_character():
+    data = "ab中".encode()
+    assert decode_captured_body(data[:-1], total=len(data)) == "ab...(truncated, total 5 bytes)"
+    assert decode_captured_body(b"\xff\xfe", total=2) == ""
+
+
+def test_first_chunk_is_forwarded_before_stream_finishes(monkeypatch):
+    monkeypatch.setattr(middlewares.audit_writer, "submit", lambda data: None)
+
+    async def main():
+        release = asyncio.Event()
+        sent: list[dict] = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"first", "more_body": True})
+            await release.wait()
+            await send({"type": "http.response.body", "body": b"last"})
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/stream", "headers": [], "query_string": b""}
+        middleware = HttpAuditLogMiddleware(app, methods=["GET"], exclude_paths=[])
+        task = asyncio.create_task(middleware(scope, receive, send))
+        await asyncio.sleep(0.01)
+        first_seen = [m.get("body") for m in sent if m["type"] == "http.response.body"]
+        release.set()
+        await task
+        return first_seen
+
+    assert asyncio.run(main()) == [b"first"]
+
+
+def test_background_tasks_run_after_response():
+    from app.core.bgtask import BgTasks
+    from app.core.middlewares import BackGroundTaskMiddleware
+
+    events: list[str] = []
+    app = FastAPI()
+
+    @app.get("/job")
+    async def job():
+        await BgTasks.add_task(events.append, "task")
+        events.append("handler")
+        return {}
+
+    app.add_middleware(BackGroundTaskMiddleware)
+
+    assert _request(app, "GET", "/job").status_code == 200
+    assert events == ["handler", "task"]
@@ -0,0 +1,120 @@
+"""
+Tests for AuditLogWriter: batching, overflow policy and shutdown flush
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import audit_writer as audit_writer_module
+from app.services.audit_writer import AuditLogWriter
+
+
+class FakeAuditLog:
+    batches: list[list[dict]] = []
+    delay = 0.0
+    fail = False
+
+    def __init__(self, **kwargs):
+        self.data = kwargs
+
+    @classmethod
+    async def bulk_create(cls, objs):
+        await asyncio.sleep(cls.delay)
+        if cls.fail:
+            raise RuntimeError("db down")
+        cls.batches.append([obj.data for obj in objs])
+
+
+def _patch(monkeypatch, delay=0.0, fail=False):
+    FakeAuditLog.batches = []
+    FakeAuditLog.delay = delay
+    FakeAuditLog.fail = fail
+    monkeypatch.setattr(audit_writer_module, "AuditLog", FakeAuditLog)
+
+
+def test_batches_by_size_and_interval(monkeypatch):
+    _patch(monkeypatch)
+    writer = AuditLogWriter(batch_size=3, flush_interval_ms=20, max_queue=100)
+
+    async def main():
+        for i in range(7):
+            writer.submit({"path": f"/p{i}"})
+        await asyncio.sleep(0.1)
+        stats = writer.stats()
+        await writer.stop()
+        return stats
+
+    stats = asyncio.run(main())
+    assert [len(b) for b in FakeAuditLog.batches] == [3, 3, 1]
+    assert [d["path"] for b in FakeAuditLog.batches for d in b] == [f"/p{i}" for i in range(7)]
+    assert all("created_at" in d for b in FakeAuditLog.batches for d in b)
+    assert stats["written"] == 7 and stats["batches"] == 3 and stats["queue_size"] == 0
+
+
+def test_submit_does_not_wait_for_db(monkeypatch):
+    _patch(monkeypatch, delay=0.2)
+    writer = AuditLogWriter(batch_size=10, flush_interval_ms=10, max_queue=100)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        writer.submit({"path": "/a"})
+        elapsed = loop.time() - start
+        await writer.stop()
+        return elapsed
+
+    assert asyncio.run(main()) < 0.05
+    assert FakeAuditLog.batches == [[FakeAuditLog.batches[0][0]]]
+
+
+def test_overflow_policies(monkeypatch):
+    _patch(monkeypatch)
+
+    async def fill(writer):
+        writer.start()
+        # 不让出事件循环，后台任务无法消费
+        accepted = [writer.submit({"path": f"/p{i}"}) for i in range(5)]
+        await writer.stop()
+        return accepted
+
+    oldest = AuditLogWriter(batch_size=10, flush_interval_ms=10, max_queue=3, overflow="drop_oldest")
+    assert asyncio.run(fill(oldest)) == [True] * 5
+    assert [d["path"] for d in FakeAuditLog.batches[-1]] == ["/p2", "/p3", "/p4"]
+    assert oldest.stats()["dropped"] == 2
+
+    newest = AuditLogWriter(batch_size=10, flush_interval_ms=10, max_queue=3, overflow="drop_new")
+    assert asyncio.run(fill(newest)) == [True, True, True, False, False]
+    assert [d["path"] for d in FakeAuditLog.batches[-1]] == ["/p0", "/p1", "/p2"]
+    assert newest.stats()["dropped"] == 2
+
+
+def test_stop_waits_for_inflight_batch_and_flushes_rest(monkeypatch):
+    _patch(monkeypatch, delay=0.05)
+    writer = AuditLogWriter(batch_size=2, flush_interval_ms=1000, max_queue=100)
+
+    async def main():
+        writer.submit({"path": "/a"})
+        writer.submit({"path": "/b"})
+        await asyncio.sleep(0.01)
+        # 第一批写入中，后续记录仍在队列
+        writer.submit({"path": "/c"})
+        await writer.stop(timeout=1)
+
+    asyncio.run(main())
+    assert [[d["path"] for d in b] for b in FakeAuditLog.batches] == [["/a", "/b"], ["/c"]]
+    assert writer.stats()["written"] == 3 and not writer.running
+
+
+def test_failed_batch_is_counted(monkeypatch):
+    _patch(monkeypatch, fail=True)
+    writer = AuditLogWriter(batch_size=5, flush_interval_ms=10, max_queue=100)
+
+    async def main():
+        writer.submit({"path": "/a"})
+        writer.submit({"path": "/b"})
+        await writer.stop()
+
+    asyncio.run(main())
+    assert writer.stats()["failed"] == 2 and writer.stats()["written"] == 0
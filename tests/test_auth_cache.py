@@ -0,0 +1,142 @@
+"""
+Tests for cached authentication: user identity cache, versioned invalidation and per-request reuse
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import jwt
+from fastapi import FastAPI
+from tortoise.context import TortoiseContext
+
+from app.core import middlewares
+from app.core.dependency import DependAuth
+from app.core.middlewares import HttpAuditLogMiddleware
+from app.models.admin import User
+from app.services import auth_cache
+from app.services.cache_version import SharedVersion
+from app.services.progress_store import MemoryProgressBackend, ProgressStore
+from app.settings import settings
+
+
+def _memory_version(monkeypatch, backend=None):
+    store = ProgressStore("test", backend=backend or MemoryProgressBackend())
+    version = SharedVersion("auth", check_interval=0, store=store)
+    monkeypatch.setattr(auth_cache, "auth_version", version)
+    auth_cache._user_cache.clear()
+    return version
+
+
+async def _with_db(body):
+    # 独立上下文，退出后不影响其他用例的全局 Tortoise 状态
+    async with TortoiseContext() as ctx:
+        await ctx.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]})
+        await ctx.generate_schemas()
+        return await body(await User.create(username="alice", email="a@example.com", password="x"))
+
+
+def test_user_is_cached_until_invalidated(monkeypatch):
+    _memory_version(monkeypatch)
+
+    async def body(user):
+        first = await auth_cache.get_auth_user(user.id)
+        await User.filter(id=user.id).update(username="bob")
+        cached = await auth_cache.get_auth_user(user.id)
+        await auth_cache.invalidate_auth_cache()
+        fresh = await auth_cache.get_auth_user(user.id)
+        return first, cached, fresh
+
+    first, cached, fresh = asyncio.run(_with_db(body))
+    assert first.username == cached.username == "alice"
+    assert first is not cached
+    assert fresh.username == "bob"
+
+
+def test_version_bump_is_seen_by_other_workers():
+    backend = MemoryProgressBackend()
+    worker_a = SharedVersion("auth", check_interval=0, store=ProgressStore("test", backend=backend))
+    worker_b = SharedVersion("auth", check_interval=0, store=ProgressStore("test", backend=backend))
+    lagging = SharedVersion("auth", check_interval=3600, store=ProgressStore("test", backend=backend))
+
+    async def body():
+        before = await lagging.current()
+        assert await worker_b.current() == await worker_a.current() is None
+        bumped = await worker_a.bump()
+        assert await worker_b.current() == bumped
+        assert await lagging.current() == before
+
+    asyncio.run(body())
+
+
+class _SlowBackend(MemoryProgressBackend):
+    blocking = True
+
+    def __init__(self, release):
+        super().__init__()
+        self.release = release
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        self.release.wait(5)
+        return super().get(key)
+
+
+def test_hung_version_store_does_not_block_requests():
+    release = threading.Event()
+    backend = _SlowBackend(release)
+    version = SharedVersion("auth", check_interval=3600, store=ProgressStore("test", backend=backend))
+
+    async def body():
+        pending = asyncio.create_task(version.current())
+        await asyncio.sleep(0.05)
+        # 读取挂起期间：其他请求直接使用本地版本，事件循环仍可调度
+        others = await asyncio.wait_for(asyncio.gather(*(version.current() for _ in range(3))), timeout=1)
+        bumped = await version.bump()
+        release.set()
+        await pending
+        return others, bumped, await version.current()
+
+    others, bumped, after = asyncio.run(body())
+    assert others == [None, None, None]
+    assert backend.reads == 1
+    # 挂起的旧读取返回后不覆盖本进程刚 bump 的版本
+    assert after == bumped
+
+
+def test_request_resolves_identity_once(monkeypatch):
+    _memory_version(monkeypatch)
+    submitted: list[dict] = []
+    monkeypatch.setattr(middlewares.audit_writer, "submit", submitted.append)
+    loads = []
+    original = auth_cache.get_auth_user
+
+    async def counting(user_id):
+        loads.append(user_id)
+        return await original(user_id)
+
+    monkeypatch.setattr("app.core.dependency.get_auth_user", counting)
+
+    app = FastAPI()
+
+    @app.get("/me", dependencies=[DependAuth])
+    async def me():
+        return {}
+
+    app.add_middleware(HttpAuditLogMiddleware, methods=["GET"], exclude_paths=[])
+
+    async def body(user):
+        token = jwt.encode({"user_id": user.id}, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for _ in range(2):
+                assert (await client.get("/me", headers={"token": token})).status_code == 200
+
+    asyncio.run(_with_db(body))
+    # 每个请求只解析一次（审计中间件复用接口依赖的结果）
+    assert len(loads) == 2
+    assert [log["username"] for log in submitted] == ["alice", "alice"]
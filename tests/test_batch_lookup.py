@@ -0,0 +1,54 @@
+"""
+Tests for batch_lookup - chunked IN-list identifier resolution
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.batch_lookup import chunked, resolve_in_batches
+
+
+class FakeCursor:
+    """tb_workorderinfo: (Id, AppCode)，一个编码可对应多条工单"""
+
+    rows = [(101, "WO-A"), (102, "WO-A"), (103, "WO-B"), (104, None)]
+
+    def __init__(self):
+        self.calls = []
+        self.result = []
+
+    async def execute(self, sql, args):
+        self.calls.append((sql, args))
+        n = len(args) // 2
+        ids, codes = {str(a) for a in args[:n]}, {a.lower() for a in args[n:]}
+        self.result = [r for r in self.rows if str(r[0]) in ids or (r[1] or "").lower() in codes]
+
+    async def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+
+SQL = "SELECT Id, AppCode FROM tb_workorderinfo WHERE Id IN ({placeholders}) OR AppCode IN ({placeholders})"
+
+
+def test_chunked():
+    assert list(chunked([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+
+def test_resolve_merges_rows_back_to_inputs():
+    cur = FakeCursor()
+    inputs = ["WO-A", "103", "wo-b", "missing", "", "WO-A"]
+
+    matches = asyncio.run(resolve_in_batches(cur, SQL, inputs, lambda r: r, chunk_size=2))
+
+    assert [r[0] for r in matches["WO-A"]] == [101, 102]
+    assert [r[0] for r in matches["103"]] == [103]
+    assert [r[0] for r in matches["wo-b"]] == [103]
+    assert matches["missing"] == []
+    assert "" not in matches
+    # 去重后 4 个标识，每块 2 个：两次往返，占位符按出现次数展开
+    assert len(cur.calls) == 2
+    sql, args = cur.calls[0]
+    assert sql.count("%s") == 4 and args == ("WO-A", "103", "WO-A", "103")
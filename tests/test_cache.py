@@ -0,0 +1,103 @@
+"""
+Tests for AsyncTTLCache - LRU/TTL eviction, batched misses, negative caching, single-flight
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils import cache as cache_module
+from app.utils.cache import AsyncTTLCache
+
+
+class Loader:
+    def __init__(self, data, delay=0.0):
+        self.data = data
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, keys):
+        self.calls.append(list(keys))
+        await asyncio.sleep(self.delay)
+        return {k: self.data[k] for k in keys if k in self.data}
+
+
+def test_batch_misses_load_once_and_negative_cache():
+    cache = AsyncTTLCache("t", ttl=60, negative_ttl=60)
+    loader = Loader({"a": 1, "b": 2})
+
+    async def run():
+        first = await cache.get_many(["a", "b", "x", "a"], loader)
+        second = await cache.get_many(["a", "b", "x"], loader)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"a": 1, "b": 2}
+    assert loader.calls == [["a", "b", "x"]]
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 3
+
+
+def test_negative_ttl_zero_does_not_cache_absent_keys():
+    cache = AsyncTTLCache("t", ttl=60)
+    loader = Loader({})
+
+    async def run():
+        await cache.get_many(["x"], loader)
+        await cache.get_many(["x"], loader)
+
+    asyncio.run(run())
+    assert len(loader.calls) == 2
+
+
+def test_ttl_expiry_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = AsyncTTLCache("t", maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # b 最久未使用被淘汰
+    assert cache.get("b") is None and cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None and cache.get("c") is None
+
+
+def test_concurrent_identical_lookups_single_flight():
+    cache = AsyncTTLCache("t", ttl=60)
+    loader = Loader({"a": 1, "b": 2}, delay=0.02)
+
+    async def run():
+        return await asyncio.gather(
+            cache.get_many(["a"], loader),
+            cache.get_many(["a", "b"], loader),
+            cache.get_or_load("a", lambda: loader(["a"])),
+        )
+
+    results = asyncio.run(run())
+    assert results[0] == {"a": 1} and results[1] == {"a": 1, "b": 2}
+    assert loader.calls == [["a"], ["b"]]
+
+
+def test_loader_error_propagates_to_waiters_and_is_not_cached():
+    cache = AsyncTTLCache("t", ttl=60)
+
+    async def failing(keys):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def run():
+        return await asyncio.gather(
+            cache.get_many(["a"], failing),
+            cache.get_many(["a"], failing),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert asyncio.run(cache.get_many(["a"], Loader({"a": 1}))) == {"a": 1}
+    with pytest.raises(RuntimeError):
+        asyncio.run(AsyncTTLCache("t").get_many(["a"], failing))
@@ -0,0 +1,117 @@
+"""
+Tests for cached per-user connection authorization
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from tortoise.context import TortoiseContext
+
+from app.controllers.role import role_controller
+from app.controllers.user import user_controller
+from app.models.admin import Role, User
+from app.models.conn import DBConnection
+from app.schemas.roles import RoleUpdate
+from app.services import auth_cache, conn_permission_service
+from app.services.cache_version import SharedVersion
+from app.services.progress_store import MemoryProgressBackend, ProgressStore
+
+
+@pytest.fixture(autouse=True)
+def memory_versions(monkeypatch):
+    store = ProgressStore("test", backend=MemoryProgressBackend())
+    monkeypatch.setattr(auth_cache, "auth_version", SharedVersion("auth", check_interval=0, store=store))
+    monkeypatch.setattr(
+        conn_permission_service,
+        "conn_permission_version",
+        SharedVersion("conn_permission", check_interval=0, store=store),
+    )
+    conn_permission_service._authz_cache.clear()
+
+
+@pytest.fixture
+def load_counter(monkeypatch):
+    loads = []
+    original = conn_permission_service._load_authorization
+
+    async def counting(user):
+        loads.append(user.id)
+        return await original(user)
+
+    monkeypatch.setattr(conn_permission_service, "_load_authorization", counting)
+    return loads
+
+
+async def _fresh_user(user_id):
+    # 模拟每个请求重新认证得到的新 user 对象
+    return await User.get(id=user_id)
+
+
+async def _with_db(body):
+    async with TortoiseContext() as ctx:
+        await ctx.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]})
+        await ctx.generate_schemas()
+        user = await User.create(username="alice", email="a@example.com", password="x")
+        role = await Role.create(name="运维")
+        await user.roles.add(role)
+        conns = [
+            await DBConnection.create(
+                name=f"conn{i}", alias=f"c{i}", db_type="mysql", host="h", port=3306,
+                username="u", password="p", database="d",
+            )
+            for i in range(2)
+        ]
+        await user.conn_permissions.add(conns[0])
+        return await body(user, role, conns)
+
+
+def test_authorized_ids_cached_across_requests(load_counter):
+    async def body(user, role, conns):
+        results = []
+        for _ in range(3):
+            results.append(await conn_permission_service.get_authorized_conn_ids(await _fresh_user(user.id)))
+        return results, conns
+
+    results, conns = asyncio.run(_with_db(body))
+    assert results == [{conns[0].id}] * 3
+    assert len(load_counter) == 1
+
+
+def test_request_scoped_memo_on_user(load_counter):
+    async def body(user, role, conns):
+        current = await _fresh_user(user.id)
+        await conn_permission_service.ensure_conn_access(current, conns[0].id)
+        conn_permission_service._authz_cache.clear()
+        return await conn_permission_service.get_authorized_conn_ids(current), conns
+
+    ids, conns = asyncio.run(_with_db(body))
+    assert ids == {conns[0].id}
+    # 同一 user 对象上第二次解析不再访问缓存或数据库
+    assert len(load_counter) == 1
+
+
+def test_update_conn_permissions_invalidates():
+    async def body(user, role, conns):
+        before = await conn_permission_service.get_authorized_conn_ids(await _fresh_user(user.id))
+        await user_controller.update_conn_permissions(user, [conns[1].id])
+        after = await conn_permission_service.get_authorized_conn_ids(await _fresh_user(user.id))
+        return before, after, conns
+
+    before, after, conns = asyncio.run(_with_db(body))
+    assert before == {conns[0].id}
+    assert after == {conns[1].id}
+
+
+def test_role_rename_to_admin_lifts_restriction():
+    async def body(user, role, conns):
+        before = await conn_permission_service.get_authorized_conn_ids(await _fresh_user(user.id))
+        await role_controller.update(id=role.id, obj_in=RoleUpdate(id=role.id, name="admin", desc=""))
+        after = await conn_permission_service.get_authorized_conn_ids(await _fresh_user(user.id))
+        return before, after, conns
+
+    before, after, conns = asyncio.run(_with_db(body))
+    assert before == {conns[0].id}
+    assert after is None
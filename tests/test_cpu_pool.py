@@ -0,0 +1,52 @@
+"""
+Tests for cpu_pool - bounded process pool for CPU-bound work
+"""
+import asyncio
+import math
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.cpu_pool import CpuPoolBusyError, CpuTaskPool
+
+
+def test_runs_in_process_pool():
+    """Function result is returned from the worker process"""
+    pool = CpuTaskPool(max_workers=1, max_queue=1)
+    try:
+        result = asyncio.run(pool.run(math.factorial, 10))
+    finally:
+        pool.shutdown()
+    assert result == 3628800
+    assert pool.stats()["inflight"] == 0
+
+
+def test_rejects_when_queue_full():
+    """Submissions beyond workers + queue are rejected immediately"""
+    pool = CpuTaskPool(max_workers=0, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.create_task(pool.run(release.wait, 5))
+        second = asyncio.create_task(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(CpuPoolBusyError):
+            await pool.run(release.wait, 5)
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(run())
+    assert pool.stats()["inflight"] == 0
+
+
+def test_exception_propagates_and_releases_slot():
+    """Errors from the worker surface to the caller and free the slot"""
+    pool = CpuTaskPool(max_workers=0, max_queue=0)
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(int, "not-a-number"))
+    assert asyncio.run(pool.run(int, "42")) == 42
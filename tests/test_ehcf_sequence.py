@@ -0,0 +1,186 @@
+"""
+Tests for EhcfService order renumbering - batched sequence allocation and CASE updates
+"""
+import asyncio
+import re
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiomysql
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import ehcf_service as ehcf_module
+from app.services.ehcf_service import EhcfService
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    async def execute(self, sql, args=()):
+        self.result = self.db.handle(" ".join(sql.split()), list(args))
+
+    async def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield FakeCursor(self.db)
+
+    async def begin(self):
+        self.db.events.append("begin")
+
+    async def commit(self):
+        self.db.events.append("commit")
+
+    async def rollback(self):
+        self.db.events.append("rollback")
+
+
+class FakePool(aiomysql.Pool):
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConn(self.db)
+
+
+class FakeEhcf:
+    """按表保存 Id -> 明细编号，模拟 fn_nextval 与 CASE 批量更新"""
+
+    def __init__(self):
+        self.tables = {
+            "tb_workgoodsdetail": {1: "A", 2: "A", 3: "B"},
+            "tb_workgoodsdetail_other": {4: "B"},
+            "tb_workfixitemdetail": {5: None},
+            "tb_workfixgoodsinfo": {6: "F"},
+            "tb_workfixiteminfo": {},
+        }
+        self.goodsinfo = [["M1", "N1"], ["M1", "N1"], [None, None]]
+        self.seq = 0
+        self.order_no = 0
+        self.round_trips = 0
+        self.events = []
+        self.fail_allocation = False
+        self.repeat_allocation = False
+
+    def handle(self, sql, args):
+        self.round_trips += 1
+        if sql.startswith("SELECT fn_nextval"):
+            n = sql.count("SELECT 1")
+            rows = []
+            for i in range(n):
+                if not (self.repeat_allocation and i):
+                    self.seq += 1
+                row = [None if self.fail_allocation else self.seq]
+                if "fn_GetOrderNoByPrefix" in sql:
+                    self.order_no += 1
+                    row.append(f"NO{self.order_no}")
+                rows.append(tuple(row))
+            return rows
+        if sql.startswith("SELECT MallOrderId, OrderNo FROM tb_workgoodsinfo"):
+            return [tuple(r) for r in self.goodsinfo]
+        select = re.match(r"SELECT Id, \w+ FROM (\w+) WHERE WorkOrderId=%s", sql)
+        if select:
+            return list(self.tables[select.group(1)].items())
+        update = re.match(r"UPDATE (\w+) SET (.*) WHERE WorkOrderId=%s AND (.+?) IN", sql)
+        if update:
+            table, sets, key_expr = update.groups()
+            cols = re.findall(r"(\w+) = CASE", sets)
+            n = sets.count("WHEN") // len(cols)
+            pairs = [dict(zip(args[i * 2 * n:(i + 1) * 2 * n:2], args[i * 2 * n + 1:(i + 1) * 2 * n:2])) for i in range(len(cols))]
+            if table == "tb_workgoodsinfo":
+                # 与 MySQL 一致：按从左到右的顺序赋值，后一列的 CASE 键读取已更新的值
+                for row in self.goodsinfo:
+                    for i, col in enumerate(cols):
+                        key = row[0] or ""
+                        if key in pairs[i]:
+                            row[0 if col == "MallOrderId" else 1] = pairs[i][key]
+            else:
+                for row_id, new in pairs[0].items():
+                    self.tables[table][row_id] = new
+            return []
+        raise AssertionError(sql)
+
+
+def _service(db, monkeypatch):
+    service = EhcfService()
+
+    async def ensure():
+        pass
+
+    service._ensure_pool = ensure
+    monkeypatch.setattr(ehcf_module, "_ehcf_conn_id", 1)
+    monkeypatch.setattr(ehcf_module.db_pool, "get_pool", lambda _: FakePool(db))
+    return service
+
+
+def test_fix_order_detail_ids_batches_round_trips(monkeypatch):
+    """One allocation for all distinct values and one UPDATE per table, in a single transaction"""
+    db = FakeEhcf()
+    result = asyncio.run(_service(db, monkeypatch).fix_order_detail_ids("W1"))
+
+    assert result["success"] and result["updated_count"] == 5
+    assert db.seq == 3
+    goods = db.tables["tb_workgoodsdetail"]
+    assert goods[1] == goods[2] != goods[3] == db.tables["tb_workgoodsdetail_other"][4]
+    # 三次查询 + 一次取号 + 三次更新
+    assert db.round_trips == 7
+    assert db.events == ["begin", "commit"]
+
+
+def test_regenerate_order_ids_keeps_groups(monkeypatch):
+    db = FakeEhcf()
+    result = asyncio.run(_service(db, monkeypatch).regenerate_order_ids("W1"))
+
+    assert result["success"]
+    # 明细3个 + 检修商品1个 + 商品订单2个
+    assert db.seq == 6 and db.order_no == 2
+    assert db.goodsinfo[0] == db.goodsinfo[1]
+    assert db.goodsinfo[0][0] != db.goodsinfo[2][0]
+    assert {db.goodsinfo[0][1], db.goodsinfo[2][1]} == {"NO1", "NO2"}
+    assert db.tables["tb_workfixgoodsinfo"][6] not in (None, "F")
+    assert db.events == ["begin", "commit"]
+
+
+def test_allocation_failure_rolls_back(monkeypatch):
+    db = FakeEhcf()
+    db.fail_allocation = True
+    result = asyncio.run(_service(db, monkeypatch).fix_order_detail_ids("W1"))
+
+    assert result == {"success": False, "message": "生成OE编号失败"}
+    assert db.tables["tb_workgoodsdetail"][1] == "A"
+    assert db.events == ["begin", "rollback"]
+
+
+def test_allocation_is_chunked(monkeypatch):
+    db = FakeEhcf()
+    monkeypatch.setattr(ehcf_module, "ALLOCATE_CHUNK", 2)
+
+    async def body():
+        return await ehcf_module._allocate_sequence(FakeCursor(db), ("fn_nextval('x')",), 5)
+
+    values = asyncio.run(body())
+    assert values == [(str(i),) for i in range(1, 6)]
+    assert db.round_trips == 3
+
+
+def test_repeated_sequence_values_roll_back(monkeypatch):
+    """If the sequence function is evaluated once per statement instead of per row, nothing is written"""
+    db = FakeEhcf()
+    db.repeat_allocation = True
+    result = asyncio.run(_service(db, monkeypatch).fix_order_detail_ids("W1"))
+
+    assert result["success"] is False
+    assert db.tables["tb_workgoodsdetail"][1] == "A"
+    assert db.events == ["begin", "rollback"]
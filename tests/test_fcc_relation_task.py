@@ -0,0 +1,229 @@
+"""
+Tests for FccRelationService.execute_relation_task - bounded concurrency, per-session temp table, resume
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import aiomysql
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import fcc_relation_service as fcc_module
+from app.services.fcc_relation_service import FccRelationService
+from app.services.progress_store import MemoryProgressBackend, ProgressStore
+from app.settings.config import settings
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+        self.description = None
+        self.rowcount = 0
+
+    async def execute(self, sql, args=()):
+        await asyncio.sleep(0.01)
+        self.result = self.conn.db.handle(self.conn, " ".join(sql.split()), list(args), self)
+
+    async def executemany(self, sql, seq):
+        for args in seq:
+            await self.execute(sql, args)
+
+    async def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+        self.tmp = None
+        self.pending = []
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield FakeCursor(self)
+
+    async def commit(self):
+        self.db.committed.extend(self.pending)
+        self.pending = []
+
+    async def rollback(self):
+        self.pending = []
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+        self.active = 0
+        self.max_active = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            yield FakeConn(self.db)
+        finally:
+            self.active -= 1
+
+
+class FakeMysqlPool(FakePool, aiomysql.Pool):
+    pass
+
+
+class FakeFcc:
+    def __init__(self, codes, fail_tmp_table_after=None):
+        self.codes = codes
+        self.committed = []
+        self.tmp_tables = 0
+        self.fail_tmp_table_after = fail_tmp_table_after
+
+    def handle(self, conn, sql, args, cur):
+        if sql.startswith("SELECT TOP 0 * INTO #tm_wh_reconcinfo"):
+            if self.tmp_tables == self.fail_tmp_table_after:
+                raise RuntimeError("tempdb full")
+            self.tmp_tables += 1
+            conn.tmp = []
+        elif sql.startswith("IF OBJECT_ID"):
+            conn.tmp = None
+        elif sql.startswith("DELETE FROM #tm_wh_reconcinfo"):
+            conn.tmp.clear()
+        elif sql.startswith("INSERT INTO #tm_wh_reconcinfo"):
+            conn.tmp.append(args[1])
+        elif "FROM #tm_wh_reconcinfo A" in sql:
+            if "1 AS ApplicationType" not in sql or args[0] not in self.codes:
+                return []
+            cur.description = [("CodeNumber",), ("ReconcNo",)]
+            # NOT EXISTS：已提交的关系不再作为候选
+            return [(args[0], no) for no in conn.tmp if no in args[1:] and (args[0], no) not in self.committed]
+        elif sql.startswith("SELECT DISTINCT ReconcNo FROM [dbo].[fms_costdetail_reconcinfo]"):
+            return [(no,) for code, no in self.committed if code == args[0] and no in args[1:]]
+        elif sql.startswith("INSERT INTO [dbo].[fms_costdetail_reconcinfo]"):
+            conn.pending.append(tuple(args))
+        else:
+            raise AssertionError(sql)
+        return []
+
+
+class FakeWms:
+    def __init__(self):
+        self.committed = []
+
+    def handle(self, conn, sql, args, cur):
+        if sql.startswith("SELECT a.Id AS ReconcId"):
+            return [(1, no, None, None, None, None, 0, None, None, None, 1) for no in args]
+        conn.pending.append(sql.split()[1])
+        return []
+
+
+def _service(monkeypatch, fcc, wms, concurrency=3):
+    service = FccRelationService()
+    service.tasks = ProgressStore("fcc_relation", backend=MemoryProgressBackend())
+    fcc_pool, wms_pool = FakePool(fcc), FakeMysqlPool(wms)
+    pools = {1: wms_pool, 2: fcc_pool}
+
+    async def ensure(*_):
+        pass
+
+    monkeypatch.setattr(fcc_module, "_wms_conn_id", 1)
+    monkeypatch.setattr(fcc_module, "_fcc_conn_id", 2)
+    monkeypatch.setattr(fcc_module.db_pool, "ensure_pool", ensure)
+    monkeypatch.setattr(fcc_module.db_pool, "get_pool", pools.get)
+    monkeypatch.setattr(type(settings), "FCC_RELATION_CONCURRENCY", property(lambda _: concurrency))
+    return service, fcc_pool
+
+
+RELATIONS = [
+    {"fcc_no": "J1", "wms_nos": ["ZD1", "ZD2"]},
+    {"fcc_no": "J2", "wms_nos": ["ZD3"]},
+    {"fcc_no": "J9", "wms_nos": ["ZD4"]},
+    {"fcc_no": "J3", "wms_nos": ["ZD5"]},
+    {"fcc_no": "J4", "wms_nos": ["ZD2"]},
+]
+
+
+def test_relations_processed_concurrently_with_session_tables(monkeypatch):
+    fcc, wms = FakeFcc({"J1", "J2", "J3", "J4"}), FakeWms()
+    service, fcc_pool = _service(monkeypatch, fcc, wms)
+    service.tasks.start("t1", {"task_id": "t1", "status": "pending", "backend": "local"})
+
+    asyncio.run(service.execute_relation_task("t1", RELATIONS))
+
+    task = service.tasks.get("t1")
+    assert task["status"] == "completed"
+    assert task["result"]["success_count"] == 5
+    assert [item["fcc_no"] for item in task["result"]["failed_items"]] == ["J9"]
+    assert task["done"] == [0, 1, 3, 4]
+    # 三路并发，每路一个会话临时表；关系写入只包含本关系的对账单
+    assert fcc_pool.max_active == 3 and fcc.tmp_tables == 3
+    assert sorted(fcc.committed) == [("J1", "ZD1"), ("J1", "ZD2"), ("J2", "ZD3"), ("J3", "ZD5"), ("J4", "ZD2")]
+    assert wms.committed.count("tb_owinginfo") == 4
+
+
+def test_redelivered_task_skips_done_relations(monkeypatch):
+    fcc, wms = FakeFcc({"J1", "J2", "J3", "J4"}), FakeWms()
+    service, _ = _service(monkeypatch, fcc, wms)
+    service.tasks.start("t2", {"task_id": "t2", "status": "processing", "backend": "celery", "done": [0, 1, 3]})
+
+    asyncio.run(service.execute_relation_task("t2", RELATIONS))
+
+    task = service.tasks.get("t2")
+    assert sorted(fcc.committed) == [("J4", "ZD2")]
+    assert task["result"]["success_count"] == 5
+    assert task["progress"]["processed"] == 6
+
+
+def test_stale_local_task_reported_as_failed(monkeypatch):
+    service, _ = _service(monkeypatch, FakeFcc(set()), FakeWms())
+    old = (datetime.now() - timedelta(seconds=settings.FCC_RELATION_STALE_SECONDS + 5)).isoformat()
+    service.tasks.start("t3", {
+        "task_id": "t3", "status": "processing", "backend": "local",
+        "progress": {"success": 2}, "created_at": old, "updated_at": old,
+    })
+    service.tasks.start("t4", {
+        "task_id": "t4", "status": "processing", "backend": "local",
+        "created_at": old, "updated_at": datetime.now().isoformat(),
+    })
+
+    stale = asyncio.run(service.query_task_status("t3"))
+    assert stale["status"] == "failed" and stale["result"]["success_count"] == 2
+    assert asyncio.run(service.query_task_status("t4"))["status"] == "processing"
+
+
+def test_relation_committed_before_done_marker_is_not_duplicated(monkeypatch):
+    fcc, wms = FakeFcc({"J1", "J2", "J3", "J4"}), FakeWms()
+    # 上次执行 J4 已在 FCC 提交，但完成标记未保存即中断
+    fcc.committed.append(("J4", "ZD2"))
+    service, _ = _service(monkeypatch, fcc, wms)
+    service.tasks.start("t5", {"task_id": "t5", "status": "processing", "backend": "celery", "done": [0, 1, 3]})
+
+    asyncio.run(service.execute_relation_task("t5", RELATIONS))
+
+    task = service.tasks.get("t5")
+    assert fcc.committed == [("J4", "ZD2")]
+    assert task["status"] == "completed" and task["done"] == [0, 1, 3, 4]
+    # 仓储侧更新照常补做
+    assert wms.committed == ["tb_owinginfo", "tb_reconcinfo"]
+
+
+def test_worker_failure_cancels_siblings_and_reports_partial_progress(monkeypatch):
+    fcc, wms = FakeFcc({"J1", "J2", "J3", "J4"}, fail_tmp_table_after=1), FakeWms()
+    service, fcc_pool = _service(monkeypatch, fcc, wms, concurrency=2)
+    service.tasks.start("t6", {"task_id": "t6", "status": "pending", "backend": "local"})
+
+    async def main():
+        await service.execute_relation_task("t6", RELATIONS)
+        # 任务结束后没有仍在写库的协程
+        await asyncio.sleep(0.1)
+        return len(fcc.committed)
+
+    committed = asyncio.run(main())
+    task = service.tasks.get("t6")
+    assert task["status"] == "failed"
+    assert task["result"]["failed_items"][-1]["reason"] == "tempdb full"
+    assert committed == len(fcc.committed) and fcc_pool.active == 0
+    assert task["result"]["success_count"] == sum(len(RELATIONS[i]["wms_nos"]) for i in task["done"])
@@ -0,0 +1,116 @@
+"""
+Tests for FccRelationService.validate_codenumber - set-based validation on both databases
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiomysql
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import fcc_relation_service as fcc_module
+from app.services.fcc_relation_service import FccRelationService
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    async def execute(self, sql, args=()):
+        shared = self.db.shared
+        self.db.queries += 1
+        shared.active += 1
+        shared.max_active = max(shared.max_active, shared.active)
+        await asyncio.sleep(0.01)
+        shared.active -= 1
+        self.result = self.db.handle(" ".join(sql.split()), list(args))
+
+    async def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield FakeCursor(self.db)
+
+
+class FakeMysqlPool(FakePool, aiomysql.Pool):
+    pass
+
+
+class Shared:
+    """两个库共享的并发计数"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+
+class FakeFcc:
+    def __init__(self, shared, codes, relations):
+        self.shared = shared
+        self.codes = codes
+        self.relations = relations
+        self.queries = 0
+
+    def handle(self, sql, args):
+        if "fms_costdetail_reconcinfo" in sql:
+            pairs = list(zip(args[::2], args[1::2]))
+            return [p for p in pairs if p in self.relations]
+        n = len(args) // 3
+        return [(c,) for c in args[:n] if c in self.codes]
+
+
+class FakeWms(FakeFcc):
+    def __init__(self, shared, reconc, not_full):
+        super().__init__(shared, reconc, ())
+        self.not_full = not_full
+
+    def handle(self, sql, args):
+        if "tb_reconcdetail" in sql:
+            return [(no,) for no in args if no in self.not_full]
+        return [(no, self.codes[no]) for no in args if no in self.codes]
+
+
+def test_validate_codenumber_batched_and_concurrent(monkeypatch):
+    shared = Shared()
+    fcc = FakeFcc(shared, codes={"J1", "J2"}, relations={("J1", "ZD2")})
+    wms = FakeWms(shared, reconc={"ZD1": 0, "ZD2": 1, "ZD3": 0}, not_full={"ZD3"})
+    pools = {1: FakeMysqlPool(wms), 2: FakePool(fcc)}
+
+    async def ensure(*_):
+        pass
+
+    monkeypatch.setattr(fcc_module, "_wms_conn_id", 1)
+    monkeypatch.setattr(fcc_module, "_fcc_conn_id", 2)
+    monkeypatch.setattr(fcc_module.db_pool, "ensure_pool", ensure)
+    monkeypatch.setattr(fcc_module.db_pool, "get_pool", pools.get)
+
+    relations = [
+        {"fcc_no": "J1", "wms_nos": ["ZD1", "ZD2"]},
+        {"fcc_no": "J9", "wms_nos": ["ZD3", "ZD9"]},
+        {"fcc_no": "J2", "wms_nos": ["ZD1"]},
+    ]
+    result = asyncio.run(FccRelationService().validate_codenumber(relations))
+
+    assert result["not_found_fcc"] == ["J9"]
+    assert result["not_found_wms"] == ["ZD9"]
+    assert result["paid_wms"] == ["ZD2"]
+    assert result["not_full_reconc_wms"] == ["ZD3"]
+    assert result["existing_relations"] == [{"fcc_no": "J1", "wms_no": "ZD2"}]
+    assert not result["valid"]
+    # 每侧两条批量查询，且两侧并发执行
+    assert fcc.queries == 2 and wms.queries == 2
+    assert shared.max_active == 2
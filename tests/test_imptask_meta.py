@@ -0,0 +1,81 @@
+"""
+Tests for import task generation metadata (table name, row count, columns)
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import excelimp_service
+from app.services.excelimp_service import generate_sql_file_from_excel, read_sql_file_meta
+from app.services.progress_store import MemoryProgressBackend, ProgressStore
+
+
+def _write_excel(path: Path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["name", "age"])
+    ws.append(["alice", 30])
+    ws.append(["bob", 41])
+    wb.save(path)
+
+
+def test_generate_returns_metadata(tmp_path):
+    """Generation result carries the metadata persisted on ImpTask"""
+    excel = tmp_path / "a.xlsx"
+    _write_excel(excel)
+
+    meta = generate_sql_file_from_excel(str(excel), "a.xlsx", "mysql", str(tmp_path / "a.sql"))
+
+    assert meta["table_name"].startswith("tmp")
+    assert meta["row_count"] == 2
+    assert [c["column"] for c in meta["columns_meta"]] == ["name", "age"]
+    assert all(c["field"] and c["type"] for c in meta["columns_meta"])
+
+
+def test_read_sql_file_meta_matches_generation(tmp_path):
+    """Backfill parser recovers table name and fields from the SQL header only"""
+    excel = tmp_path / "a.xlsx"
+    _write_excel(excel)
+
+    for db_type in ("mysql", "postgresql"):
+        sql_path = tmp_path / f"{db_type}.sql"
+        meta = generate_sql_file_from_excel(str(excel), "a.xlsx", db_type, str(sql_path))
+        parsed = read_sql_file_meta(str(sql_path))
+
+        assert parsed["table_name"] == meta["table_name"]
+        assert [(c["field"], c["type"]) for c in parsed["columns_meta"]] == [
+            (c["field"], c["type"]) for c in meta["columns_meta"]
+        ]
+
+
+def test_read_sql_file_meta_without_create_table(tmp_path):
+    sql_path = tmp_path / "x.sql"
+    sql_path.write_text("SELECT 1;\n", encoding="utf-8")
+    assert read_sql_file_meta(str(sql_path)) is None
+
+
+def test_execute_failure_flushes_throttled_progress(tmp_path, monkeypatch):
+    """The failed record reports the last executed statement, not the last throttled report"""
+    store = ProgressStore("excelimp", backend=MemoryProgressBackend())
+    monkeypatch.setattr(excelimp_service, "_PROGRESS", store)
+    sql_file = tmp_path / "a.sql"
+    sql_file.write_text("SELECT 1;", encoding="utf-8")
+    store.start("s1", {"stage": "done", "sql_file_path": str(sql_file)})
+
+    async def execute(conn_id, sql_text, progress_cb):
+        await progress_cb(1, 100)
+        await progress_cb(2, 100)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(excelimp_service, "execute_sql_on_connection", execute)
+    with pytest.raises(RuntimeError):
+        asyncio.run(excelimp_service.execute_sql_file_task("s1", 1))
+
+    progress = store.get("s1")
+    assert progress["execute_status"] == "failed"
+    assert progress["execute_done"] == 2
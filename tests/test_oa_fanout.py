@@ -0,0 +1,157 @@
+"""
+Tests for OAPositiveTimeService - concurrent table fan-out and chunked transactional updates
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+
+import aiomysql
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import oa_service as oa_module
+from app.services.oa_service import OAPositiveTimeService
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+        self.rowcount = 0
+        self.description = [("Id",), ("Code",), ("PositiveTime",)]
+
+    async def execute(self, sql, args=()):
+        self.db.active += 1
+        self.db.max_active = max(self.db.max_active, self.db.active)
+        await asyncio.sleep(0.01)
+        self.db.active -= 1
+        self.db.statements.append((sql, len(args)))
+        self.result, self.rowcount = self.db.handle(sql, list(args))
+
+    async def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def cursor(self, *_):
+        yield FakeCursor(self.db)
+
+    async def begin(self):
+        self.db.events.append("begin")
+
+    async def commit(self):
+        self.db.events.append("commit")
+
+    async def rollback(self):
+        self.db.events.append("rollback")
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConn(self.db)
+
+
+class FakeMysqlPool(FakePool, aiomysql.Pool):
+    pass
+
+
+class FakeDb:
+    def __init__(self, codes):
+        self.codes = codes
+        self.active = 0
+        self.max_active = 0
+        self.statements = []
+        self.events = []
+        self.fail_updates = False
+
+    def handle(self, sql, args):
+        if sql.startswith("UPDATE"):
+            if self.fail_updates:
+                raise RuntimeError("deadlock")
+            return [], len(args) - 1
+        if "membership_userbaseinfo" in sql and "Code IN" in sql:
+            return [{"Id": f"U{c}", "Code": c, "PositiveTime": None} for c in args if c in self.codes], 0
+        if sql.startswith("SELECT Id, Code, PositiveTime FROM MemberShip_UserBaseInfo"):
+            return [(f"F{c}", c, None) for c in args if c in self.codes], 0
+        return [{"user_id": uid, "positive_time": None} for uid in args], 0
+
+
+def _service(monkeypatch, oa, fcc):
+    service = OAPositiveTimeService()
+    pools = {1: FakeMysqlPool(oa), 2: FakePool(fcc)}
+
+    async def conn_id(alias, _):
+        return 1 if alias == oa_module.OA_CONN_ALIAS else 2
+
+    async def ensure(*_):
+        pass
+
+    service._get_conn_id = conn_id
+    monkeypatch.setattr(oa_module.db_pool, "ensure_pool", ensure)
+    monkeypatch.setattr(oa_module.db_pool, "get_pool", pools.get)
+    monkeypatch.setattr(oa_module, "OA_CHUNK_SIZE", 100)
+    monkeypatch.setattr(oa_module, "FCC_CHUNK_SIZE", 150)
+    return service
+
+
+def test_validate_fans_out_table_reads(monkeypatch):
+    codes = [f"E{i:04d}" for i in range(250)]
+    oa, fcc = FakeDb(set(codes[:-1])), FakeDb(set(codes))
+    result = asyncio.run(_service(monkeypatch, oa, fcc).validate_positive_time(codes))
+
+    assert result["not_found_codes"] == [codes[-1]]
+    tables = {row["table"] for row in result["rows"] if row["source"] == "OA"}
+    assert len(tables) == 4
+    # 四张OA表在独立连接上并发读取
+    assert oa.max_active >= 4
+    assert all(n <= 100 for _, n in oa.statements)
+    assert all(n <= 150 for _, n in fcc.statements)
+
+
+def test_update_chunks_in_one_transaction_per_database(monkeypatch):
+    codes = [f"E{i:04d}" for i in range(250)]
+    oa, fcc = FakeDb(set(codes)), FakeDb(set(codes))
+    service = _service(monkeypatch, oa, fcc)
+
+    result = asyncio.run(service.update_positive_time(codes, datetime(2026, 1, 1)))
+
+    assert result["oa_affected"] == {
+        "check_userbaseinfo": 250,
+        "check_userinfobyday": 250,
+        "membership_userbaseinfo": 250,
+        "membership_positiveconfirm": 250,
+    }
+    assert result["fcc_affected"] == 250
+    assert oa.events == ["begin", "commit"]
+    assert fcc.events == ["commit"]
+    updates = [sql for sql, _ in oa.statements if sql.startswith("UPDATE")]
+    assert len(updates) == 4 * 3
+    assert len([sql for sql, _ in fcc.statements if sql.startswith("UPDATE")]) == 2
+
+
+def test_update_reports_both_outcomes_when_one_side_fails(monkeypatch):
+    codes = [f"E{i:04d}" for i in range(10)]
+    oa, fcc = FakeDb(set(codes)), FakeDb(set(codes))
+    fcc.fail_updates = True
+    service = _service(monkeypatch, oa, fcc)
+
+    with pytest.raises(ValueError) as exc:
+        asyncio.run(service.update_entry_time(codes, datetime(2026, 1, 1)))
+
+    message = str(exc.value)
+    assert "OA库已提交（影响 30 行）" in message
+    assert "FCC库更新失败（已回滚）: deadlock" in message
+    assert oa.events == ["begin", "commit"]
+    assert fcc.events == ["rollback"]
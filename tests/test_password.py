@@ -0,0 +1,44 @@
+"""
+Tests for executor-backed password hashing helpers
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.password import get_password_hash_async, shutdown_password_pool, verify_password_async
+
+
+def test_async_hash_and_verify_round_trip():
+    async def main():
+        hashed = await get_password_hash_async("s3cret")
+        return await verify_password_async("s3cret", hashed), await verify_password_async("wrong", hashed)
+
+    try:
+        assert asyncio.run(main()) == (True, False)
+    finally:
+        shutdown_password_pool()
+
+
+def test_event_loop_keeps_running_during_verification():
+    async def main():
+        hashed = await get_password_hash_async("s3cret")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*(verify_password_async("s3cret", hashed) for _ in range(3)))
+        task.cancel()
+        return ticks
+
+    try:
+        # 同步校验时 ticker 在整个校验期间无法运行
+        assert asyncio.run(main()) > 5
+    finally:
+        shutdown_password_pool()
@@ -0,0 +1,112 @@
+"""
+Tests for precomputed permission sets used by PermissionControl.has_permission
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi import HTTPException
+from tortoise.context import TortoiseContext
+
+from app.controllers.role import role_controller
+from app.core.dependency import PermissionControl
+from app.models.admin import Api, Menu, MenuApi, Role, User
+from app.services import auth_cache
+from app.services.cache_version import SharedVersion
+from app.services.progress_store import MemoryProgressBackend, ProgressStore
+
+
+@pytest.fixture(autouse=True)
+def memory_versions(monkeypatch):
+    store = ProgressStore("test", backend=MemoryProgressBackend())
+    monkeypatch.setattr(auth_cache, "auth_version", SharedVersion("auth", check_interval=0, store=store))
+    monkeypatch.setattr(auth_cache, "permission_version", SharedVersion("permission", check_interval=0, store=store))
+    for cache in (auth_cache._user_cache, auth_cache._user_roles_cache, auth_cache._permission_cache):
+        cache.clear()
+
+
+def _request(method, path):
+    return SimpleNamespace(method=method, url=SimpleNamespace(path=path))
+
+
+async def _check(user, method, path):
+    try:
+        await PermissionControl.has_permission(_request(method, path), user)
+        return "ok"
+    except HTTPException as exc:
+        return exc.detail
+
+
+async def _with_db(body):
+    async with TortoiseContext() as ctx:
+        await ctx.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]})
+        await ctx.generate_schemas()
+        user = await User.create(username="alice", email="a@example.com", password="x")
+        role = await Role.create(name="运维")
+        await user.roles.add(role)
+        menu = await Menu.create(name="订单", path="/order", component="/order")
+        listed = await Api.create(method="GET", path="/api/v1/order/list", summary="列表", tags="订单")
+        await Api.create(method="POST", path="/api/v1/order/delete", summary="删除", tags="订单")
+        await MenuApi.create(menu=menu, api=listed)
+        return await body(user, role, menu)
+
+
+def test_permission_checks_use_compiled_sets(monkeypatch):
+    loads = []
+    original = auth_cache._load_permission_map
+
+    async def counting():
+        loads.append(1)
+        return await original()
+
+    monkeypatch.setattr(auth_cache, "_load_permission_map", counting)
+
+    async def body(user, role, menu):
+        results = [await _check(user, "GET", "/api/v1/order/list")]
+        await role_controller.update_roles(role, [menu.id])
+        results.append(await _check(user, "GET", "/api/v1/order/list"))
+        for _ in range(3):
+            results.append(await _check(user, "POST", "/api/v1/order/delete"))
+        results.append(await _check(user, "GET", "/api/v1/unknown"))
+        return results
+
+    results = asyncio.run(_with_db(body))
+    assert results[0] == "User has no menu permissions. Please assign menus to user's roles."
+    assert results[1] == "ok"
+    assert results[2].startswith("Permission denied: POST /api/v1/order/delete")
+    assert results[-1].startswith("API not found in database")
+    # 首次加载 + 角色授权变更后重新加载一次，其余请求全部命中缓存
+    assert len(loads) == 2
+
+
+def test_menu_api_change_seen_after_invalidation():
+    async def body(user, role, menu):
+        await role.menus.add(menu)
+        before = await _check(user, "POST", "/api/v1/order/delete")
+        api = await Api.get(path="/api/v1/order/delete")
+        await MenuApi.create(menu=menu, api=api)
+        stale = await _check(user, "POST", "/api/v1/order/delete")
+        await auth_cache.invalidate_permission_cache()
+        after = await _check(user, "POST", "/api/v1/order/delete")
+        return before, stale, after
+
+    before, stale, after = asyncio.run(_with_db(body))
+    assert before.startswith("Permission denied") and stale == before
+    assert after == "ok"
+
+
+def test_user_without_role_and_superuser():
+    async def body(user, role, menu):
+        await user.roles.clear()
+        await auth_cache.invalidate_auth_cache()
+        no_role = await _check(user, "GET", "/api/v1/order/list")
+        user.is_superuser = True
+        return no_role, await _check(user, "GET", "/api/v1/anything")
+
+    no_role, superuser = asyncio.run(_with_db(body))
+    assert no_role == "The user is not bound to a role"
+    assert superuser == "ok"
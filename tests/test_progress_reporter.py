@@ -0,0 +1,105 @@
+"""
+Tests for progress_reporter - throttled progress callbacks
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.progress_reporter import ThrottledProgressReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reports_are_coalesced():
+    """1000 statements within one second only produce step-based reports"""
+    clock = FakeClock()
+    reports = []
+
+    async def on_report(done, total):
+        reports.append((done, total))
+
+    reporter = ThrottledProgressReporter(on_report, min_interval=1.0, percent_step=10, clock=clock)
+
+    async def run():
+        for i in range(1, 1001):
+            await reporter(i, 1000, "INSERT")
+
+    asyncio.run(run())
+
+    assert len(reports) <= 12
+    assert reports[0] == (1, 1000)
+    assert reports[-1] == (1000, 1000)
+
+
+def test_time_interval_triggers_report():
+    """Elapsed interval triggers a report even without a percent step"""
+    clock = FakeClock()
+    reports = []
+
+    async def on_report(done, total):
+        reports.append(done)
+
+    reporter = ThrottledProgressReporter(on_report, min_interval=1.0, percent_step=100, clock=clock)
+
+    async def run():
+        await reporter(1, 1000)
+        await reporter(2, 1000)
+        clock.now = 1.5
+        await reporter(3, 1000)
+
+    asyncio.run(run())
+    assert reports == [1, 3]
+
+
+def test_stop_check_is_throttled_and_propagates():
+    """Stop flag is checked at most once per interval and its exception aborts the run"""
+    clock = FakeClock()
+    checks = []
+
+    async def on_report(done, total):
+        pass
+
+    async def stop_check():
+        checks.append(clock.now)
+        if clock.now >= 5:
+            raise RuntimeError("stopped")
+
+    reporter = ThrottledProgressReporter(on_report, stop_check=stop_check, stop_check_interval=2.0, clock=clock)
+
+    async def run():
+        for i in range(1, 100):
+            clock.now = i * 0.1
+            await reporter(i, 100)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert len(checks) == 4
+
+
+def test_flush_reports_pending_progress():
+    """flush writes the last coalesced update"""
+    reports = []
+
+    async def on_report(done, total):
+        reports.append(done)
+
+    reporter = ThrottledProgressReporter(on_report, min_interval=60, percent_step=50, clock=FakeClock())
+
+    async def run():
+        await reporter(1, 100)
+        await reporter(7, 100)
+        await reporter.flush()
+        await reporter.flush()
+
+    asyncio.run(run())
+    assert reports == [1, 7]
@@ -0,0 +1,106 @@
+"""
+Tests for progress_store - in-memory and file backends, namespaced store
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.progress_store import FileProgressBackend, MemoryProgressBackend, ProgressStore
+
+
+def test_start_update_get():
+    """Partial updates merge into the record started with start()"""
+    store = ProgressStore("test", ttl=60, backend=MemoryProgressBackend())
+    store.start("k1", {"stage": "parsing", "message": "开始"})
+    store.update("k1", stage="done", row_count=10)
+
+    data = store.get("k1")
+    assert data == {"stage": "done", "message": "开始", "row_count": 10}
+
+
+def test_start_replaces_previous_record():
+    """start() discards fields left over from an earlier run with the same key"""
+    store = ProgressStore("test", ttl=60, backend=MemoryProgressBackend())
+    store.start("k1", {"stage": "done", "execute_status": "success"})
+    store.start("k1", {"stage": "parsing"})
+    assert store.get("k1") == {"stage": "parsing"}
+
+
+def test_namespaces_are_isolated():
+    """Same key under different namespaces does not collide"""
+    backend = MemoryProgressBackend()
+    a = ProgressStore("a", ttl=60, backend=backend)
+    b = ProgressStore("b", ttl=60, backend=backend)
+    a.start("k", {"v": 1})
+    assert b.get("k") is None
+    assert a.exists("k")
+
+
+def test_expired_records_are_dropped():
+    """Records disappear after their TTL and are purged on later writes"""
+    backend = MemoryProgressBackend()
+    store = ProgressStore("test", ttl=1, backend=backend)
+    store.start("old", {"v": 1})
+    expires_at, data = backend._data["dbadmin:progress:test:old"]
+    backend._data["dbadmin:progress:test:old"] = (time.time() - 1, data)
+
+    assert store.get("old") is None
+
+    backend._data["dbadmin:progress:test:old"] = (time.time() - 1, data)
+    backend._last_purge_at = 0
+    store.start("new", {"v": 2})
+    assert "dbadmin:progress:test:old" not in backend._data
+
+
+def test_get_returns_copy():
+    """Mutating a returned record does not change the stored one"""
+    store = ProgressStore("test", ttl=60, backend=MemoryProgressBackend())
+    store.start("k", {"v": 1})
+    data = store.get("k")
+    data["v"] = 2
+    assert store.get("k") == {"v": 1}
+
+
+def test_file_backend_shared_between_instances(tmp_path):
+    """Two backends on the same directory (e.g. web process and worker) see each other's writes"""
+    writer = ProgressStore("test", ttl=60, backend=FileProgressBackend(str(tmp_path)))
+    reader = ProgressStore("test", ttl=60, backend=FileProgressBackend(str(tmp_path)))
+    writer.start("k1", {"stage": "parsing", "message": "开始"})
+    reader.update("k1", stage="done")
+
+    assert writer.get("k1") == {"stage": "done", "message": "开始"}
+    reader.delete("k1")
+    assert writer.get("k1") is None
+
+
+def test_file_backend_expires_records(tmp_path):
+    """Expired files read as missing and are purged on later writes"""
+    backend = FileProgressBackend(str(tmp_path))
+    store = ProgressStore("test", ttl=60, backend=backend)
+    store.start("old", {"v": 1})
+    path = Path(backend._path("dbadmin:progress:test:old"))
+    path.write_text(json.dumps({"expires_at": time.time() - 1, "data": {"v": 1}}), encoding="utf-8")
+
+    assert store.get("old") is None
+
+    backend._last_purge_at = 0
+    store.start("new", {"v": 2})
+    assert not path.exists()
+
+
+def test_async_api_runs_blocking_backend_in_thread(tmp_path):
+    """a* methods give the same results as the sync API"""
+    store = ProgressStore("test", ttl=60, backend=FileProgressBackend(str(tmp_path)))
+
+    async def body():
+        await store.astart("k", {"stage": "parsing"})
+        await store.aupdate("k", current=3)
+        data = await store.aget("k")
+        await store.adelete("k")
+        return data, await store.aget("k")
+
+    assert asyncio.run(body()) == ({"stage": "parsing", "current": 3}, None)
@@ -0,0 +1,64 @@
+"""
+Tests for RouteIndex: (method, path) -> (tags, summary) resolution for audit logs
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import APIRouter, FastAPI
+
+from app.core.route_index import RouteIndex
+
+
+def _app():
+    inner = APIRouter()
+
+    @inner.get("/items/{item_id}", summary="查看条目", tags=["条目"])
+    async def get_item(item_id: int):
+        return {}
+
+    @inner.get("/items/latest", summary="最新条目")
+    async def latest_item():
+        return {}
+
+    @inner.post("/items", summary="新建条目")
+    async def create_item():
+        return {}
+
+    outer = APIRouter()
+    outer.include_router(inner, prefix="/v1", tags=["模块"])
+    app = FastAPI()
+    app.include_router(outer, prefix="/api")
+    return app
+
+
+def test_resolves_nested_router_routes():
+    app = _app()
+    index = RouteIndex()
+
+    assert index.match("POST", "/api/v1/items", app.routes) == (("模块",), "新建条目")
+    assert index.match("GET", "/api/v1/items/42") == (("模块", "条目"), "查看条目")
+    assert index.match("DELETE", "/api/v1/items/42") is None
+    assert index.match("GET", "/unknown") is None
+
+
+def test_static_path_shadowed_by_earlier_param_route():
+    """Dispatch order wins: /items/latest is served by the earlier /items/{item_id} route"""
+    index = RouteIndex()
+    index.build(_app().routes)
+
+    assert ("GET", "/api/v1/items/latest") not in index._static
+    assert index.match("GET", "/api/v1/items/latest") == (("模块", "条目"), "查看条目")
+
+
+def test_param_lookups_are_cached_and_bounded():
+    index = RouteIndex(lru_size=2)
+    index.build(_app().routes)
+
+    for item_id in (1, 2, 3, 3):
+        index.match("GET", f"/api/v1/items/{item_id}")
+    assert list(index._lru) == [("GET", "/api/v1/items/2"), ("GET", "/api/v1/items/3")]
+
+    index.build(_app().routes)
+    assert not index._lru
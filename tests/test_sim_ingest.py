@@ -0,0 +1,143 @@
+"""
+Tests for SIM-ICCID streaming ingest (chunked parse, per-chunk commit, cleanup on failure)
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiomysql
+import openpyxl
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import sim_service as sim_module
+from app.services.sim_service import SIMService, iter_sim_iccid_file, sim_upload_extension
+
+
+def _write_csv(path: Path, count: int, header: str = "SimNumber,ICCID"):
+    lines = [header] + [f"{1380000000 + i},8986{i:016d}" for i in range(count)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_csv_yields_bounded_chunks(tmp_path):
+    path = tmp_path / "a.csv"
+    _write_csv(path, 12)
+
+    chunks = list(iter_sim_iccid_file(str(path), "a.csv", chunk_size=5))
+
+    assert [len(c) for c in chunks] == [5, 5, 2]
+    assert chunks[0][0] == ("1380000000", "89860000000000000000")
+
+
+def test_xlsx_yields_chunks_and_skips_blank_rows(tmp_path):
+    path = tmp_path / "a.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["SimNumber", "ICCID"])
+    ws.append(["1", "A"])
+    ws.append([None, None])
+    ws.append(["2", "B"])
+    wb.save(path)
+
+    assert list(iter_sim_iccid_file(str(path), "a.xlsx", chunk_size=10)) == [[("1", "A"), ("2", "B")]]
+
+
+def test_bad_header_rejected(tmp_path):
+    path = tmp_path / "a.csv"
+    _write_csv(path, 1, header="Sim,ICCID")
+    with pytest.raises(ValueError):
+        list(iter_sim_iccid_file(str(path), "a.csv"))
+
+
+def test_upload_extension_checked_by_name():
+    assert sim_upload_extension("cards.XLSX") == "xlsx"
+    assert sim_upload_extension("cards.v2.csv") == "csv"
+    assert sim_upload_extension("cards.xls") is None
+    assert sim_upload_extension("cards") is None
+
+
+class FakeCursor:
+    def __init__(self, log, fail_after):
+        self.log = log
+        self.fail_after = fail_after
+
+    async def executemany(self, sql, rows):
+        if self.fail_after is not None and len(self.log["batches"]) >= self.fail_after:
+            raise RuntimeError("db down")
+        self.log["batches"].append(len(rows))
+
+    async def execute(self, sql, args=()):
+        self.log["statements"].append(sql)
+
+
+class FakePool(aiomysql.Pool):
+    def __init__(self, fail_after=None):
+        self.log = {"batches": [], "commits": 0, "statements": []}
+        self.fail_after = fail_after
+
+    @asynccontextmanager
+    async def acquire(self):
+        pool = self
+
+        class Conn:
+            @asynccontextmanager
+            async def cursor(self):
+                yield FakeCursor(pool.log, pool.fail_after)
+
+            async def commit(self):
+                pool.log["commits"] += 1
+
+            async def rollback(self):
+                pass
+
+        yield Conn()
+
+
+def _service(monkeypatch, pool):
+    async def conn_id():
+        return 1
+
+    async def ensure_pool(self):
+        return None
+
+    monkeypatch.setattr(sim_module, "_get_sim_conn_id", conn_id)
+    monkeypatch.setattr(sim_module.db_pool, "get_pool", lambda _id: pool)
+    monkeypatch.setattr(SIMService, "_ensure_pool", ensure_pool)
+    return SIMService()
+
+
+def test_upload_commits_per_chunk_and_removes_file(tmp_path, monkeypatch):
+    path = tmp_path / "a.csv"
+    _write_csv(path, 10)
+    pool = FakePool()
+    service = _service(monkeypatch, pool)
+    monkeypatch.setattr(
+        sim_module, "iter_sim_iccid_file",
+        lambda fp, fn: iter_sim_iccid_file(fp, fn, chunk_size=4),
+    )
+
+    asyncio.run(service.upload_excel(str(path), "a.csv", stamp="s1"))
+
+    assert pool.log["batches"] == [4, 4, 2]
+    assert pool.log["commits"] == 3
+    assert not path.exists()
+    assert asyncio.run(service.get_progress("s1"))["current"] == 10
+
+
+def test_upload_failure_cleans_partial_rows(tmp_path, monkeypatch):
+    path = tmp_path / "a.csv"
+    _write_csv(path, 10)
+    pool = FakePool(fail_after=1)
+    service = _service(monkeypatch, pool)
+    monkeypatch.setattr(
+        sim_module, "iter_sim_iccid_file",
+        lambda fp, fn: iter_sim_iccid_file(fp, fn, chunk_size=4),
+    )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.upload_excel(str(path), "a.csv", stamp="s2"))
+
+    assert any(sql.startswith("DELETE FROM tm_simiccidimp") for sql in pool.log["statements"])
+    assert not path.exists()
@@ -0,0 +1,249 @@
+"""
+Tests for SIMTransService sync: receipt precheck and _execute_sync pipeline
+"""
+import asyncio
+import re
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.simtrans import BATCH_SIZE, SIMTransService
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+        self.rowcount = 0
+
+    async def execute(self, sql, args=()):
+        self.result = await self.db.handle(sql, args)
+        self.rowcount = self.db.last_rowcount
+
+    async def executemany(self, sql, seq):
+        for args in seq:
+            await self.execute(sql, args)
+
+    async def fetchone(self):
+        return self.result.pop(0) if self.result else None
+
+    async def fetchall(self):
+        rows, self.result = self.result, []
+        return rows
+
+    async def fetchmany(self, size):
+        rows, self.result = self.result[:size], self.result[size:]
+        return rows
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def cursor(self, *_):
+        yield FakeCursor(self.db)
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        self.db.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+        self.active = 0
+        self.max_active = 0
+        self.acquires = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquires += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            yield FakeConn(self.db)
+        finally:
+            self.active -= 1
+
+
+class FakeWms:
+    def __init__(self, rows):
+        self.rows = rows
+        self.commits = 0
+        self.last_rowcount = 0
+
+    async def handle(self, sql, args):
+        if "SELECT DISTINCT a.MaterialNo" in sql:
+            return [(mn,) for mn in dict.fromkeys(r["MaterialNo"] for r in self.rows)]
+        # 按卡号分页：参数为 入库单号..., 卡号...
+        return [r for r in self.rows if r["MaterialNo"] in args]
+
+
+class FakeReceipts:
+    def __init__(self, installed):
+        self.installed = installed
+        self.queries = 0
+        self.last_rowcount = 0
+
+    async def handle(self, sql, args):
+        self.queries += 1
+        return [
+            {"InStockNo": rn, "installed_count": self.installed.get(rn, 0)}
+            for rn in args if rn in self.installed
+        ]
+
+
+class FakeSim:
+    def __init__(self, existing_siminfo=()):
+        self.tables = {t: set() for t in ("siminfo", "simstatus", "simwarehouse", "simfollowinfo", "simdatauseinfo")}
+        self.tables["siminfo"].update(existing_siminfo)
+        self.seq = 0
+        self.commits = 0
+        self.last_rowcount = 0
+        self.stage = None
+        self.statements = []
+
+    def _staged_insert(self, table):
+        # 模拟 INSERT ... SELECT FROM 临时表 [JOIN 依赖表] LEFT JOIN 目标表 WHERE 目标 IS NULL
+        depends = {"siminfo": None, "simfollowinfo": "simstatus"}.get(table, "siminfo")
+        rows = [
+            mn for mn in self.stage
+            if mn not in self.tables[table] and (depends is None or mn in self.tables[depends])
+        ]
+        self.tables[table].update(rows)
+        return len(rows)
+
+    async def handle(self, sql, args):
+        await asyncio.sleep(0)
+        self.statements.append(sql.split()[0].upper())
+        self.last_rowcount = 0
+        if "CREATE TEMPORARY TABLE" in sql:
+            self.stage = []
+            return []
+        if "DROP TEMPORARY TABLE" in sql:
+            self.stage = None
+            return []
+        if sql.startswith("DELETE FROM tmp_simtrans_stage"):
+            self.stage.clear()
+            return []
+        if sql.startswith("INSERT INTO tmp_simtrans_stage"):
+            # 普通 INSERT：主键重复即报错
+            if args[0] in self.stage:
+                raise ValueError(f"Duplicate entry '{args[0]}' for key 'PRIMARY'")
+            self.stage.append(args[0])
+            return []
+        staged = re.search(r"INSERT INTO tb_(\w+).*FROM tmp_simtrans_stage", sql, re.S)
+        if staged:
+            self.last_rowcount = self._staged_insert(staged.group(1))
+            return []
+        if "fn_nextval" in sql:
+            self.seq += 1
+            return [{"nid": self.seq}]
+        insert = re.search(r"INSERT INTO tb_(\w+)", sql)
+        if insert:
+            self.tables[insert.group(1)].add(args[1])
+            return []
+        if "WHERE SimNumber = %s" in sql:
+            return [{"Id": 1, "SIMLifeCycle": 1, "SIMStatus": 0, "SIMMarkStatus": 0}]
+        probe = re.search(r"FROM tb_(sim\w+) WHERE \w+ IN", sql)
+        if probe:
+            table = self.tables[probe.group(1)]
+            return [{"SimNumber": mn, "Id": 99, "SIMSupplierID": None} for mn in args if mn in table]
+        return []
+
+
+def _rows(material_nos):
+    return [
+        {"MaterialNo": mn, "StockLocationId": "WH1", "AuditTime": datetime(2026, 1, 1), "SupplierId": None}
+        for mn in material_nos
+    ]
+
+
+def _run(service, wms, sim, strategy="probe"):
+    wms_pool, sim_pool = FakePool(wms), FakePool(sim)
+
+    async def ensure_wms():
+        return 1, wms_pool
+
+    async def ensure_sim():
+        return 2, sim_pool
+
+    service._ensure_wms_pool = ensure_wms
+    service._ensure_sim_pool = ensure_sim
+    result = asyncio.run(service._execute_sync(["R1"], strategy=strategy))
+    return result, sim_pool, wms_pool
+
+
+def test_sync_writes_each_card_once_across_chunks():
+    """Cards with several source rows are written once; WMS pages are read on short-lived connections"""
+    material_nos = [f"{i:013d}" for i in range(BATCH_SIZE + 500)]
+    material_nos.append(material_nos[0])
+    material_nos.append(material_nos[BATCH_SIZE + 1])
+    wms, sim = FakeWms(_rows(material_nos)), FakeSim(existing_siminfo={material_nos[5]})
+
+    result, sim_pool, wms_pool = _run(SIMTransService(), wms, sim)
+
+    distinct = len(set(material_nos))
+    assert result["inserted_by_table"]["tb_siminfo"] == distinct - 1
+    assert result["inserted_by_table"]["tb_simstatus"] == distinct
+    assert result["inserted_by_table"]["tb_simdatauseinfo"] == distinct
+    assert sim.commits == 2
+    # 卡号一次 + 每页一次，每次用完即归还
+    assert wms_pool.acquires == 3 and wms_pool.max_active == 1
+    # 写入连接 + 五个并发存在性查询
+    assert sim_pool.max_active >= 6
+
+
+def test_sync_skips_when_source_empty():
+    result, _, _ = _run(SIMTransService(), FakeWms([]), FakeSim())
+    assert result == {"total_inserted": 0, "sim_card_count": 0, "inserted_by_table": {}}
+
+
+def test_staged_sync_filters_server_side():
+    """Staging strategy issues set-based statements per chunk instead of per-row inserts and probes"""
+    material_nos = [f"{i:013d}" for i in range(BATCH_SIZE + 500)]
+    material_nos.append(material_nos[0])
+    # 同一批次内的重复卡号在写入临时表前去重
+    material_nos.append(material_nos[BATCH_SIZE + 1])
+    wms, sim = FakeWms(_rows(material_nos)), FakeSim(existing_siminfo={material_nos[5]})
+
+    result, _, _ = _run(SIMTransService(), wms, sim, strategy="staging")
+
+    distinct = len(set(material_nos))
+    assert result["inserted_by_table"]["tb_siminfo"] == distinct - 1
+    assert result["inserted_by_table"]["tb_simstatus"] == distinct
+    assert result["inserted_by_table"]["tb_simfollowinfo"] == distinct
+    assert sim.commits == 2
+    assert sim.stage is None
+    # 无逐行序列取值与存在性探查，仅剩供应商仓库的一次查询
+    assert sim.seq == 0
+    assert sim.statements.count("SELECT") == 1
+
+
+def test_precheck_one_round_trip_per_chunk():
+    """Existence and installed counts come back from one chunked IN query per BATCH_SIZE receipts"""
+    receipts = [f"RK{i:05d}" for i in range(BATCH_SIZE + 1000)]
+    installed = {rn: 0 for rn in receipts[:-2]}
+    installed[receipts[0]] = 3
+    db = FakeReceipts(installed)
+    service = SIMTransService()
+
+    async def ensure_wms():
+        return 1, FakePool(db)
+
+    service._ensure_wms_pool = ensure_wms
+    validation, installed_check = asyncio.run(service.precheck_receipts(receipts + ["", receipts[1]]))
+
+    assert db.queries == 2
+    assert validation["not_exists"] == receipts[-2:]
+    assert validation["exists_count"] == len(receipts) - 2 + 1
+    assert installed_check == {"has_installed": True, "installed_count": 3}
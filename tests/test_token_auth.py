@@ -0,0 +1,119 @@
+"""
+Tests for cached MCP token verification and batched last_used_at updates
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi import HTTPException
+from tortoise.context import TortoiseContext
+
+from aiagent.models.ai_token import AiToken
+from aiagent.security import token_auth
+from aiagent.security.token_usage import TokenUsageRecorder
+from app.services.cache_version import SharedVersion
+from app.services.progress_store import MemoryProgressBackend, ProgressStore
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    store = ProgressStore("test", backend=MemoryProgressBackend())
+    monkeypatch.setattr(token_auth, "token_version", SharedVersion("ai_token", check_interval=0, store=store))
+    monkeypatch.setattr(token_auth, "token_usage", TokenUsageRecorder(flush_seconds=3600))
+    token_auth._token_cache.clear()
+
+
+async def _with_db(body):
+    async with TortoiseContext() as ctx:
+        await ctx.init(db_url="sqlite://:memory:", modules={"models": ["app.models", "aiagent.models"]})
+        await ctx.generate_schemas()
+        token = await AiToken.create(name="agent", token="sk-test", allow_tools=["run_sql"])
+        try:
+            return await body(token)
+        finally:
+            await token_auth.token_usage.stop()
+
+
+def test_verify_token_served_from_cache(monkeypatch):
+    loads = []
+    original = AiToken.filter
+
+    def counting(*args, **kwargs):
+        loads.append(kwargs)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(AiToken, "filter", counting)
+
+    async def body(token):
+        first = await token_auth.verify_token("sk-test")
+        first.allow_tools.append("mutated")
+        second = await token_auth.verify_token("sk-test")
+        return first, second
+
+    first, second = asyncio.run(_with_db(body))
+    assert first.id == second.id and first is not second
+    assert second.allow_tools == ["run_sql"]
+    # 校验本身只查一次库，last_used_at 不在调用路径上更新
+    assert len(loads) == 1
+
+
+def test_disable_token_seen_after_invalidation():
+    async def body(token):
+        await token_auth.verify_token("sk-test")
+        await AiToken.filter(id=token.id).update(enabled=False)
+        stale = await token_auth.verify_token("sk-test")
+        await token_auth.invalidate_token_cache()
+        with pytest.raises(HTTPException) as exc:
+            await token_auth.verify_token("sk-test")
+        return stale, exc.value
+
+    stale, error = asyncio.run(_with_db(body))
+    assert stale.enabled
+    assert error.status_code == 401
+
+
+def test_unknown_token_negative_cached(monkeypatch):
+    async def body(token):
+        errors = []
+        for _ in range(2):
+            try:
+                await token_auth.verify_token("sk-unknown")
+            except HTTPException as exc:
+                errors.append(exc.status_code)
+        return errors
+
+    assert asyncio.run(_with_db(body)) == [401, 401]
+    assert token_auth._token_cache.stats()["hits"] >= 1
+
+
+def test_last_used_at_written_in_batch_on_stop():
+    async def body(token):
+        for _ in range(5):
+            await token_auth.verify_token("sk-test")
+        before = (await AiToken.get(id=token.id)).last_used_at
+        recorder = token_auth.token_usage
+        await recorder.stop()
+        after = (await AiToken.get(id=token.id)).last_used_at
+        return before, after, recorder.stats()
+
+    before, after, stats = asyncio.run(_with_db(body))
+    assert before is None
+    assert after is not None and after.replace(tzinfo=None) <= datetime.now()
+    assert stats["touched"] == 5 and stats["written"] == 1
+
+
+def test_recorder_flushes_periodically():
+    async def body(token):
+        recorder = TokenUsageRecorder(flush_seconds=0.05)
+        recorder.touch(token.id)
+        await asyncio.sleep(0.2)
+        written = recorder.written
+        await recorder.stop()
+        return written, (await AiToken.get(id=token.id)).last_used_at
+
+    written, last_used_at = asyncio.run(_with_db(body))
+    assert written == 1 and last_used_at is not None
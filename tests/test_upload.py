@@ -0,0 +1,83 @@
+"""
+Tests for upload helpers - chunked upload persistence with size limits
+"""
+import asyncio
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from starlette.datastructures import UploadFile
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.upload import UploadSizeError, read_upload_limited, save_upload_file
+
+
+class CountingFile(BytesIO):
+    """BytesIO that records the largest single read"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.max_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.max_read = max(self.max_read, len(chunk))
+        return chunk
+
+
+def _upload(data: bytes, size: int | None = None) -> UploadFile:
+    return UploadFile(file=CountingFile(data), filename="a.xlsx", size=size)
+
+
+def test_save_streams_in_chunks(tmp_path):
+    """File is written chunk by chunk with size counted on the fly"""
+    data = b"x" * 10_000 + b"y" * 5_000
+    upload = _upload(data)
+    dest = tmp_path / "sub" / "a.xlsx"
+
+    saved = asyncio.run(save_upload_file(upload, str(dest), max_size=100_000, chunk_size=4096))
+
+    assert dest.read_bytes() == data
+    assert saved == {"path": str(dest), "size": len(data)}
+    assert upload.file.max_read <= 4096
+
+
+def test_save_aborts_when_stream_exceeds_limit(tmp_path):
+    """Unknown-size uploads are cut off once the limit is crossed and the partial file removed"""
+    upload = _upload(b"x" * 50_000)
+    dest = tmp_path / "a.xlsx"
+
+    with pytest.raises(UploadSizeError):
+        asyncio.run(save_upload_file(upload, str(dest), max_size=10_000, chunk_size=4096))
+
+    assert not dest.exists()
+    assert upload.file.tell() <= 10_000 + 4096
+
+
+def test_save_rejects_declared_size_before_reading(tmp_path):
+    """Declared size over the limit is rejected without consuming the body"""
+    upload = _upload(b"x" * 50_000, size=50_000)
+    dest = tmp_path / "a.xlsx"
+
+    with pytest.raises(UploadSizeError):
+        asyncio.run(save_upload_file(upload, str(dest), max_size=10_000))
+
+    assert upload.file.tell() == 0
+    assert not dest.exists()
+
+
+def test_save_rejects_empty_file(tmp_path):
+    dest = tmp_path / "a.xlsx"
+    with pytest.raises(UploadSizeError):
+        asyncio.run(save_upload_file(_upload(b""), str(dest), max_size=10_000))
+    assert not dest.exists()
+
+
+def test_read_limited():
+    data = b"abc" * 1000
+    assert asyncio.run(read_upload_limited(_upload(data), max_size=10_000, chunk_size=512)) == data
+    with pytest.raises(UploadSizeError):
+        asyncio.run(read_upload_limited(_upload(data), max_size=1_000, chunk_size=512))
+    assert asyncio.run(read_upload_limited(_upload(b""), max_size=1_000)) == b""
@@ -0,0 +1,96 @@
+"""
+Tests for UserService OA lookups served through the TTL cache
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiomysql
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import user_service as user_module
+from app.services.user_service import UserService
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    async def execute(self, sql, args=()):
+        self.db.queries.append(list(args))
+        if "LIKE" in sql:
+            self.result = [(name, code, uid) for uid, (name, code) in self.db.users.items()][: args[-1]]
+        elif "SELECT UserCenterUserId, UserName" in sql:
+            self.result = [(uid, self.db.users[uid][0]) for uid in args if uid in self.db.users]
+        else:
+            self.result = [(*self.db.users[uid], uid) for uid in args if uid in self.db.users]
+
+    async def fetchall(self):
+        return self.result
+
+
+class FakePool(aiomysql.Pool):
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield FakeCursor(self.db)
+
+
+class FakeOa:
+    def __init__(self):
+        self.users = {"U1": ("张三", "E001"), "U2": ("李四", "E002")}
+        self.queries = []
+
+
+def _service(monkeypatch, db):
+    service = UserService()
+
+    async def ensure():
+        pass
+
+    service._ensure_pool = ensure
+    monkeypatch.setattr(user_module, "_user_conn_id", 1)
+    monkeypatch.setattr(user_module.db_pool, "get_pool", lambda _: FakePool(db))
+    return service
+
+
+def test_batch_lookup_hits_cache_after_first_call(monkeypatch):
+    db = FakeOa()
+    service = _service(monkeypatch, db)
+
+    async def run():
+        first = await service.batch_get_by_user_center_ids(["U1", "U9"])
+        second = await service.batch_get_by_user_center_ids(["U1", "U2", "U9"])
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert set(first) == {"U1"} and set(second) == {"U1", "U2"}
+    # 第二次只为未缓存的 U2 回源，U9 命中负缓存
+    assert db.queries == [["U1", "U9"], ["U2"]]
+    stats = service.cache_stats()[0]
+    assert stats["hits"] == 2 and stats["misses"] == 3
+
+
+def test_search_primes_user_cache(monkeypatch):
+    db = FakeOa()
+    service = _service(monkeypatch, db)
+
+    async def run():
+        found = await service.search_users("E00")
+        again = await service.search_users("E00")
+        users = await service.batch_get_by_user_center_ids(["U1", "U2"])
+        return found, again, users
+
+    found, again, users = asyncio.run(run())
+    assert found == again and len(found) == 2
+    assert users["U2"]["code"] == "E002"
+    assert len(db.queries) == 1
@@ -98,6 +98,7 @@ export default {
       headers: { 'Content-Type': 'multipart/form-data' },
     }),
   getExcelProgress: (params) => request.get('/tool/excelimp/progress', { params }),
+  downloadExcelSql: (params) => request.get('/tool/excelimp/download', { params, responseType: 'blob' }),
   // tool - formatter
   formatSql: (data) => request.post('/tool/formatter/format', data),
   // tool - passwordgen